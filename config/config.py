@@ -27,4 +27,92 @@ class Config:
     }
     
     # 定时任务配置
-    SCHEDULE_TIME = "17:00"
\ No newline at end of file
+    SCHEDULE_TIME = "17:00"
+    
+    # 增量同步配置（无水位线的新合约向前补齐的天数）
+    SYNC_LOOKBACK_DAYS = int(os.getenv('SYNC_LOOKBACK_DAYS', 30))
+    
+    # 并发获取配置（线程数，所有线程共享同一接口配额）
+    FETCH_WORKERS = int(os.getenv('FETCH_WORKERS', 4))
+
+    # Tushare接口配额（每分钟调用次数）
+    # total 为所有接口合计，其余为各接口单独预算（默认与合计相同，可按需收紧）
+    TUSHARE_QUOTA = {
+        'total': int(os.getenv('TUSHARE_QUOTA_TOTAL', 180)),
+        'fut_daily': int(os.getenv('TUSHARE_QUOTA_FUT_DAILY', 180)),
+        'fut_holding': int(os.getenv('TUSHARE_QUOTA_FUT_HOLDING', 180)),
+        'fut_basic': int(os.getenv('TUSHARE_QUOTA_FUT_BASIC', 180)),
+        'fut_mapping': int(os.getenv('TUSHARE_QUOTA_FUT_MAPPING', 180)),
+    }
+
+    # Tushare接口响应缓存
+    TUSHARE_CACHE = {
+        'enabled': os.getenv('TUSHARE_CACHE_ENABLED', '1') == '1',
+        'dir': os.getenv('TUSHARE_CACHE_DIR', 'cache/tushare'),
+        'max_bytes': int(os.getenv('TUSHARE_CACHE_MAX_MB', 512)) * 1024 * 1024,
+        'today_ttl': int(os.getenv('TUSHARE_CACHE_TODAY_TTL', 600)),  # 涉及当天数据的缓存有效期（秒）
+        'endpoint_ttl': {  # 不含日期参数的接口缓存有效期（秒）
+            'fut_basic': 12 * 3600,
+        }
+    }
+
+    # 历史回补按合约分块的天数（fut_daily 单次最多返回2000行，单个合约一年约250行）
+    BACKFILL_CHUNK_DAYS = int(os.getenv('BACKFILL_CHUNK_DAYS', 365))
+
+    # 交易日历配置
+    TRADE_CAL = {
+        'exchange': os.getenv('TRADE_CAL_EXCHANGE', 'SHFE'),  # 各期货交易所休市安排相同，默认取上期所日历
+        'start_date': os.getenv('TRADE_CAL_START', '20100101'),
+        'close_hour': 15,  # 收盘后（该小时及以后）当天视为最后交易日
+        'refresh_interval': 12 * 3600,  # 增量刷新的最短间隔（秒）
+    }
+
+    # 数据库连接池
+    DB_POOL = {
+        'size': int(os.getenv('DB_POOL_SIZE', 5)),  # 常驻连接数
+        'max_overflow': int(os.getenv('DB_POOL_MAX_OVERFLOW', 10)),  # 繁忙时额外允许的连接数
+        'max_lifetime': int(os.getenv('DB_POOL_MAX_LIFETIME', 3600)),  # 连接最长使用时间（秒）
+        'timeout': int(os.getenv('DB_POOL_TIMEOUT', 30)),  # 等待可用连接的最长时间（秒）
+    }
+
+    # 数据库批量写入每批行数
+    DB_BATCH_SIZE = int(os.getenv('DB_BATCH_SIZE', 1000))
+
+    # 合约表影子表切换时，新表行数至少为旧表的比例（低于该比例视为接口数据不完整，放弃切换）
+    BASIC_SWAP_MIN_RATIO = float(os.getenv('BASIC_SWAP_MIN_RATIO', 0.5))
+
+    # 大批量写入使用 LOAD DATA LOCAL INFILE（服务器未开启 local_infile 时自动退回批量 INSERT）
+    DB_LOCAL_INFILE = os.getenv('DB_LOCAL_INFILE', '1') == '1'
+
+    # 连接器模式：默认纯Python实现；设置 DB_USE_PURE=0 使用 C 扩展（需安装 mysql-connector-python 的 C 扩展）
+    DB_USE_PURE = os.getenv('DB_USE_PURE', '1') == '1'
+
+    # 热点查询和批量写入使用服务端预处理语句（prepared statement）
+    DB_PREPARED = os.getenv('DB_PREPARED', '0') == '1'
+    # 每个连接缓存的预处理语句数量
+    DB_PREPARED_CACHE = int(os.getenv('DB_PREPARED_CACHE', 64))
+
+    # 写后缓冲：缓冲行数达到 max_rows 或最早一行等待超过 max_delay 秒时合并为一个事务写入；
+    # 后台写入跟不上、缓冲超过 max_rows × max_pending 行时 write() 阻塞（背压）
+    BUFFERED_WRITER = {
+        'max_rows': int(os.getenv('BUFFERED_WRITER_MAX_ROWS', 5000)),
+        'max_delay': float(os.getenv('BUFFERED_WRITER_MAX_DELAY', 2.0)),
+        'max_pending': int(os.getenv('BUFFERED_WRITER_MAX_PENDING', 4)),
+    }
+
+    # 主力连续行情增量更新时重新检查的天数（补上个别品种因行情缺失而落后的交易日）
+    CONTINUOUS_LOOKBACK_DAYS = int(os.getenv('CONTINUOUS_LOOKBACK_DAYS', 30))
+
+    # 交易所、品种、合约列表等元数据的进程内缓存时间（秒），0 表示不缓存
+    METADATA_CACHE_TTL = int(os.getenv('METADATA_CACHE_TTL', 300))
+
+    # 按月分区的维护：预建未来月份的分区，过期分区删除或归档（保留月数为 0 表示不清理）
+    PARTITION = {
+        'months_ahead': int(os.getenv('PARTITION_MONTHS_AHEAD', 3)),
+        'archive': os.getenv('PARTITION_ARCHIVE', '1') == '1',  # 过期分区交换到归档表后再删除
+        'retention_months': {
+            'futures_daily_quotes': int(os.getenv('QUOTES_RETENTION_MONTHS', 0)),
+            'futures_holding_rank': int(os.getenv('HOLDING_RETENTION_MONTHS', 0)),
+            'tbPriceData': int(os.getenv('PRICE_DATA_RETENTION_MONTHS', 0)),
+        },
+    }
@@ -0,0 +1,263 @@
+"""
+写后缓冲（write-behind）
+按目标表缓冲待写入的行，缓冲行数达到 max_rows 或最早一行等待超过 max_delay 秒时，
+由后台线程把所有表的缓冲合并为一组，在一个事务中写入并提交一次（group commit），
+代替逐合约、逐品种各自提交，大幅减少服务器端的提交和刷盘次数。
+后台写入跟不上、缓冲行数超过高水位（max_rows × max_pending）时 write() 阻塞等待（背压），缓冲不会无限增长。
+flush() 在调用线程中同步写入剩余数据，用于阶段结束时确认数据已落库；
+后台写入失败时，下一次 write()/flush() 向调用方抛出 FlushError，tags 为失败的那组数据的标签。
+"""
+import logging
+import threading
+import time
+import pandas as pd
+from config.config import Config
+from utils.exceptions import DatabaseError
+from utils.stage_stats import StageStats
+from . import converters
+from .db_manager import DatabaseManager, QueryBuilder
+
+class FlushError(DatabaseError):
+    """缓冲数据写入失败（整组回滚），tags 为该组数据携带的标签"""
+    def __init__(self, message, tags=None):
+        super().__init__(message)
+        self.tags = tags or []
+
+class BufferTarget:
+    """
+    缓冲写入的目标表
+    prepare(df): 可选，写入前整理数据；after_write(db, cursor, df): 可选，在同一事务中执行（如推进水位线）
+    """
+    def __init__(self, table, fields, key_fields, prepare=None, after_write=None):
+        self.table = table
+        self.fields = fields
+        self.key_fields = key_fields
+        self.prepare = prepare
+        self.after_write = after_write
+
+def _main_contract_frame(df):
+    frame = df.copy()
+    frame['trade_date'] = converters.to_date_string(frame['trade_date'])
+    for field in ['vol', 'amount', 'oi']:
+        frame[field] = converters.to_numeric(frame[field]).fillna(0.0)
+    return frame
+
+TARGETS = [
+    BufferTarget(
+        'futures_daily_quotes',
+        DatabaseManager.QUOTE_FIELDS,
+        ['ts_code', 'trade_date'],
+        prepare=converters.quote_frame,
+        after_write=lambda db, cursor, df: db._update_watermarks(cursor, df)
+    ),
+    BufferTarget(
+        'futures_main_contract',
+        ['trade_date', 'exchange', 'fut_code', 'ts_code', 'vol', 'amount', 'oi'],
+        ['trade_date', 'exchange', 'fut_code'],
+        prepare=_main_contract_frame
+    ),
+]
+
+class BufferedWriter:
+    """
+    按表缓冲、按组提交的写入器
+    write(table, data, tag): data 为 DataFrame 或字典列表；threaded=False 时在 write() 中同步写入
+    fetch_stats / write_stats 记录获取阶段（含背压等待）和写入阶段的吞吐
+    """
+    def __init__(self, db=None, targets=None, max_rows=None, max_delay=None, max_pending=None,
+                 threaded=True, name='缓冲写入'):
+        self.db = db or DatabaseManager()
+        self.targets = {target.table: target for target in (targets or TARGETS)}
+        self.max_rows = max_rows or Config.BUFFERED_WRITER['max_rows']
+        self.max_delay = max_delay or Config.BUFFERED_WRITER['max_delay']
+        self.high_water = self.max_rows * (max_pending or Config.BUFFERED_WRITER['max_pending'])
+        self.threaded = threaded
+        self.name = name
+
+        self.buffers = {table: [] for table in self.targets}  # 表名 -> [(数据, 标签)]
+        self.buffered_rows = 0
+        self.first_buffered = None
+        self.condition = threading.Condition()
+        self.flush_lock = threading.Lock()
+        self.errors = []
+        self.stats = {'groups': 0, 'rows': 0, 'failed_groups': 0, 'flush_time': 0.0}
+        self.fetch_stats = StageStats('获取阶段')
+        self.write_stats = StageStats('写入阶段')
+        self._thread = None
+        self._stopped = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # 出现异常时仍写入已缓冲的数据，但不覆盖原异常
+        self.close(raise_errors=exc_type is None)
+
+    def start(self):
+        """启动后台写入线程"""
+        if not self.db.ensure_connected():
+            raise DatabaseError("无法建立数据库连接")
+        if self.threaded and self._thread is None:
+            self._stopped = False
+            self._thread = threading.Thread(target=self._flush_loop, name="buffered-writer", daemon=True)
+            self._thread.start()
+
+    def write(self, table, data, tag=None, fetch_elapsed=0.0):
+        """
+        缓冲一批数据（本批总会被缓冲）；之前的后台写入失败时抛出 FlushError
+        缓冲超过高水位时等待后台线程取走数据后再放入
+        """
+        if table not in self.targets:
+            raise ValueError(f"未登记的缓冲写入表: {table}")
+        rows = len(data) if data is not None else 0
+        if rows == 0:
+            self._raise_pending()
+            return
+        self.fetch_stats.record(rows, fetch_elapsed)
+
+        start = time.time()
+        with self.condition:
+            while (self.threaded and self.buffered_rows >= self.high_water
+                   and self._thread is not None and self._thread.is_alive()):
+                self.condition.notify()
+                self.condition.wait(0.5)
+            self.buffers[table].append((data, tag))
+            self.buffered_rows += rows
+            if self.first_buffered is None:
+                self.first_buffered = time.time()
+            due = self._due()
+            if due and self.threaded:
+                self.condition.notify()
+        self.fetch_stats.record_blocked(time.time() - start)
+
+        if due and not self.threaded:
+            self._flush_group()
+        self._raise_pending()
+
+    def flush(self):
+        """同步写入所有已缓冲的数据（阶段结束时调用），失败时抛出 FlushError"""
+        self._flush_group()
+        self._raise_pending()
+
+    def close(self, raise_errors=True):
+        """停止后台线程并写入剩余数据"""
+        if self._thread is not None:
+            with self.condition:
+                self._stopped = True
+                self.condition.notify()
+            self._thread.join()
+            self._thread = None
+        try:
+            self._flush_group()
+            self._raise_pending()
+        except FlushError:
+            if raise_errors:
+                raise
+        finally:
+            self._log_summary()
+
+    def _due(self):
+        """是否达到写入条件（调用方持有锁）"""
+        if self.buffered_rows == 0:
+            return False
+        return (
+            self.buffered_rows >= self.max_rows
+            or time.time() - self.first_buffered >= self.max_delay
+        )
+
+    def _raise_pending(self):
+        """抛出后台写入时记录的错误（合并所有失败组的标签）"""
+        with self.condition:
+            errors, self.errors = self.errors, []
+        if errors:
+            tags = [tag for error in errors for tag in error.tags]
+            raise FlushError('; '.join(error.message for error in errors), tags)
+
+    def _take(self):
+        """取出当前全部缓冲"""
+        with self.condition:
+            group = {table: items for table, items in self.buffers.items() if items}
+            self.buffers = {table: [] for table in self.targets}
+            self.buffered_rows = 0
+            self.first_buffered = None
+            # 唤醒因背压等待的 write()
+            self.condition.notify_all()
+        return group
+
+    def _flush_group(self, raise_errors=True):
+        """把当前缓冲作为一组写入；raise_errors 为 False 时（后台线程）记录错误留给调用方"""
+        with self.flush_lock:
+            group = self._take()
+            if not group:
+                return 0
+            start = time.time()
+            try:
+                rows = self._write_group(group)
+            except Exception as e:
+                self.stats['failed_groups'] += 1
+                pending = sum(len(data) for items in group.values() for data, _ in items)
+                self.write_stats.record(pending, time.time() - start, error=True)
+                tags = [tag for items in group.values() for _, tag in items if tag is not None]
+                error = FlushError(f"{self.name}失败: {str(e)}", tags)
+                logging.error(error.message)
+                if raise_errors:
+                    raise error
+                with self.condition:
+                    self.errors.append(error)
+                return 0
+            self.stats['groups'] += 1
+            self.stats['rows'] += rows
+            self.stats['flush_time'] += time.time() - start
+            self.write_stats.record(rows, time.time() - start)
+            return rows
+
+    def _write_group(self, group):
+        """一个事务写入一组数据（每张表去重后分批多行 upsert），返回写入的行数"""
+        batch_size = Config.DB_BATCH_SIZE
+        written = 0
+        with self.db.transaction() as cursor:
+            for table, items in group.items():
+                target = self.targets[table]
+                df = pd.concat(
+                    [data if isinstance(data, pd.DataFrame) else pd.DataFrame(data) for data, _ in items],
+                    ignore_index=True
+                )
+                df = df.drop_duplicates(subset=target.key_fields, keep='last')
+                frame = target.prepare(df) if target.prepare else df
+                rows = converters.to_params(frame, target.fields)
+                for start in range(0, len(rows), batch_size):
+                    batch = rows[start:start + batch_size]
+                    query = QueryBuilder.build_upsert(table, target.fields, target.key_fields, rows=len(batch))
+                    cursor.execute(query, [value for row in batch for value in row])
+                if target.after_write:
+                    target.after_write(self.db, cursor, df)
+                written += len(rows)
+        return written
+
+    def _flush_loop(self):
+        """后台线程：等待达到写入条件后按组写入，结束时归还本线程的连接"""
+        try:
+            while True:
+                with self.condition:
+                    while not self._stopped and not self._due():
+                        timeout = None
+                        if self.first_buffered is not None:
+                            timeout = max(0.0, self.first_buffered + self.max_delay - time.time())
+                        self.condition.wait(timeout)
+                    if self._stopped:
+                        break
+                self._flush_group(raise_errors=False)
+        finally:
+            self.db.release()
+
+    def _log_summary(self):
+        stats = self.stats
+        summary = (
+            f"{self.name}: {stats['groups']} 次提交, {stats['rows']} 行, "
+            f"失败 {stats['failed_groups']} 组, 写入耗时 {stats['flush_time']:.2f} 秒\n"
+            f"  {self.fetch_stats}\n"
+            f"  {self.write_stats}"
+        )
+        print(summary)
+        logging.info(summary)
@@ -0,0 +1,181 @@
+import logging
+import time
+from threading import Condition, Lock
+import mysql.connector
+from config.config import Config
+from utils.exceptions import DatabaseError
+
+class ConnectionPool:
+    """
+    进程内共享的 MySQL 连接池
+    size: 常驻连接数；max_overflow: 繁忙时允许额外创建的连接数（归还时关闭）
+    max_lifetime: 连接最长使用时间（秒），超过后在归还或取出时重建
+    取出连接时做健康检查（ping），失效的连接直接丢弃并新建
+    """
+    _instance = None
+    _instance_lock = Lock()
+
+    @classmethod
+    def instance(cls):
+        """获取进程内唯一实例，数据库配置或连接器模式变化时重建连接池"""
+        config = dict(Config.DB_CONFIG)
+        with cls._instance_lock:
+            if cls._instance is not None and (
+                cls._instance.config != config or cls._instance.use_pure != Config.DB_USE_PURE
+            ):
+                cls._instance.close_all()
+                cls._instance = None
+            if cls._instance is None:
+                cls._instance = cls(config)
+            return cls._instance
+
+    def __init__(self, config, size=None, max_overflow=None, max_lifetime=None, timeout=None):
+        pool_config = Config.DB_POOL
+        self.config = config
+        self.use_pure = Config.DB_USE_PURE
+        self.size = size or pool_config['size']
+        self.max_overflow = max_overflow if max_overflow is not None else pool_config['max_overflow']
+        self.max_lifetime = max_lifetime or pool_config['max_lifetime']
+        self.timeout = timeout or pool_config['timeout']
+
+        self.idle = []          # [(连接, 创建时间)]
+        self.created = {}       # id(连接) -> 创建时间（所有未关闭的连接）
+        self.condition = Condition()
+        self.closed = False
+        self.stats = {'created': 0, 'reused': 0, 'discarded': 0, 'waits': 0}
+        logging.info(
+            f"初始化数据库连接池: {self.size} 个常驻连接, 最多额外 {self.max_overflow} 个, "
+            f"连接最长使用 {self.max_lifetime} 秒, {'纯Python' if self.use_pure else 'C扩展'}连接器"
+        )
+
+    def _create(self):
+        """新建连接"""
+        connection = mysql.connector.connect(
+            host=str(self.config['host']),
+            user=str(self.config['user']),
+            password=str(self.config['password']),
+            port=int(self.config['port']),
+            database=str(self.config['database']),
+            connect_timeout=10,
+            charset='utf8mb4',
+            use_pure=self.use_pure,  # 默认纯Python实现，可切换为 C 扩展
+            autocommit=True,  # 自动提交模式
+            allow_local_infile=Config.DB_LOCAL_INFILE  # 大批量写入使用 LOAD DATA LOCAL INFILE
+        )
+        return connection
+
+    def _expired(self, connection):
+        created = self.created.get(id(connection), 0)
+        return time.time() - created > self.max_lifetime
+
+    @staticmethod
+    def _healthy(connection):
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, connection):
+        """关闭并移除连接（调用方持有锁）"""
+        self.created.pop(id(connection), None)
+        self.stats['discarded'] += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def acquire(self, timeout=None):
+        """取出一个可用连接，连接数已满时等待，超时抛出 DatabaseError"""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.time() + timeout
+
+        while True:
+            connection = None
+            placeholder = None
+            with self.condition:
+                while True:
+                    if self.idle:
+                        connection, _ = self.idle.pop()
+                        break
+                    if len(self.created) < self.size + self.max_overflow:
+                        # 先占位，在锁外建立连接，避免阻塞其他线程归还连接
+                        placeholder = object()
+                        self.created[id(placeholder)] = time.time()
+                        break
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise DatabaseError(f"获取数据库连接超时（{timeout} 秒），连接池已满")
+                    self.stats['waits'] += 1
+                    self.condition.wait(remaining)
+
+            if connection is not None:
+                # 健康检查在锁外进行，失效或过期的连接丢弃后重新获取
+                if self._expired(connection) or not self._healthy(connection):
+                    with self.condition:
+                        self._discard(connection)
+                    continue
+                with self.condition:
+                    self.stats['reused'] += 1
+                return connection
+
+            try:
+                connection = self._create()
+            except Exception:
+                with self.condition:
+                    self.created.pop(id(placeholder), None)
+                    self.condition.notify()
+                raise
+
+            with self.condition:
+                self.created.pop(id(placeholder), None)
+                self.created[id(connection)] = time.time()
+                self.stats['created'] += 1
+            return connection
+
+    def release(self, connection):
+        """归还连接：未提交的事务回滚，超出常驻数量或已过期的连接关闭"""
+        if connection is None:
+            return
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        except Exception:
+            pass
+
+        with self.condition:
+            if id(connection) not in self.created:
+                return
+            if self.closed or len(self.idle) >= self.size or self._expired(connection):
+                self._discard(connection)
+            else:
+                self.idle.append((connection, time.time()))
+            self.condition.notify()
+
+    def close_all(self):
+        """关闭所有空闲连接（已取出的连接在归还时关闭）"""
+        with self.condition:
+            self.closed = True
+            for connection, _ in self.idle:
+                self._discard(connection)
+            self.idle = []
+            self.condition.notify_all()
+
+    def get_status(self):
+        """获取连接池状态"""
+        with self.condition:
+            return dict(
+                self.stats,
+                size=self.size,
+                max_overflow=self.max_overflow,
+                open=len(self.created),
+                idle=len(self.idle),
+                in_use=len(self.created) - len(self.idle)
+            )
+
+    def __str__(self):
+        status = self.get_status()
+        return (
+            f"ConnectionPool(使用中: {status['in_use']}, 空闲: {status['idle']}, "
+            f"新建: {status['created']}, 复用: {status['reused']}, 丢弃: {status['discarded']})"
+        )
@@ -0,0 +1,95 @@
+"""
+主力连续行情
+futures_continuous_quotes 按品种逐日保存当天主力合约的原始行情，并在换月日记录换月价差：
+adj_factor 为截至当天各次换月比例（新合约收盘价 / 旧合约收盘价）的累乘，
+adj_offset 为截至当天各次换月差值（新合约收盘价 - 旧合约收盘价）的累加。
+两列只随新的交易日向后追加，历史行不需要改写；读取时以品种最新一行为基准换算后复权价格:
+    比例后复权 = 原始价格 * 最新 adj_factor / 当天 adj_factor
+    差值后复权 = 原始价格 + 最新 adj_offset - 当天 adj_offset
+"""
+import logging
+import pandas as pd
+
+CONTINUOUS_TABLE = 'futures_continuous_quotes'
+
+CONTINUOUS_FIELDS = ['exchange', 'fut_code', 'trade_date', 'ts_code', 'open', 'high', 'low', 'close',
+                     'vol', 'amount', 'oi', 'is_roll', 'adj_factor', 'adj_offset']
+
+CONTINUOUS_KEY_FIELDS = ['exchange', 'fut_code', 'trade_date']
+
+PRICE_FIELDS = ['open', 'high', 'low', 'close']
+
+ADJUST_MODES = (None, 'none', 'ratio', 'diff')
+
+def stitch(rows, anchors, load_closes):
+    """
+    拼接新交易日的主力连续行情
+    rows: 新的主力合约行情（exchange, fut_code, trade_date, ts_code, open, high, low, close, pre_close, vol, amount, oi）
+    anchors: 各品种已保存的最后一行（exchange, fut_code, trade_date, ts_code, close, adj_factor, adj_offset），
+             只拼接晚于该行的交易日
+    load_closes(pairs): 按 [(ts_code, trade_date)]（trade_date 为 Timestamp）返回 {(ts_code, trade_date): 收盘价}，
+                        用于取换月日旧合约的收盘价
+    返回 CONTINUOUS_FIELDS 列的 DataFrame
+    """
+    if rows.empty:
+        return pd.DataFrame(columns=CONTINUOUS_FIELDS)
+
+    keys = ['exchange', 'fut_code']
+    anchors = anchors.rename(columns={
+        'trade_date': 'anchor_date', 'ts_code': 'anchor_ts_code', 'close': 'anchor_close',
+        'adj_factor': 'anchor_factor', 'adj_offset': 'anchor_offset',
+    })
+    df = rows.merge(anchors, on=keys, how='left')
+    df['trade_date'] = pd.to_datetime(df['trade_date'])
+    df['anchor_date'] = pd.to_datetime(df['anchor_date'])
+    df = df[df['anchor_date'].isna() | (df['trade_date'] > df['anchor_date'])]
+    df = df.sort_values(keys + ['trade_date']).reset_index(drop=True)
+    if df.empty:
+        return pd.DataFrame(columns=CONTINUOUS_FIELDS)
+    for field in PRICE_FIELDS + ['pre_close', 'vol', 'amount', 'oi', 'anchor_close', 'anchor_factor', 'anchor_offset']:
+        df[field] = pd.to_numeric(df[field], errors='coerce')
+
+    # 前一交易日的主力合约及其收盘价（每个品种的第一行取已保存的最后一行）
+    groups = df.groupby(keys, sort=False)
+    first = groups.cumcount() == 0
+    df['prev_ts_code'] = groups['ts_code'].shift(1).where(~first, df['anchor_ts_code'])
+    df['prev_close'] = groups['close'].shift(1).where(~first, df['anchor_close'])
+    df['is_roll'] = (df['prev_ts_code'].notna() & (df['ts_code'] != df['prev_ts_code'])).astype(int)
+
+    # 换月价差优先用换月日新旧合约的收盘价；旧合约当天无行情时用新合约昨收与旧合约前一日收盘价
+    rolls = df[df['is_roll'] == 1]
+    closes = load_closes(list(zip(rolls['prev_ts_code'], rolls['trade_date']))) if not rolls.empty else {}
+    old_close = pd.Series(
+        [closes.get((ts_code, trade_date)) for ts_code, trade_date in zip(df['prev_ts_code'], df['trade_date'])],
+        index=df.index, dtype=float
+    )
+    same_day = old_close.notna() & (old_close > 0)
+    new_price = df['close'].where(same_day, df['pre_close'])
+    old_price = old_close.where(same_day, df['prev_close'])
+    valid = (df['is_roll'] == 1) & new_price.gt(0) & old_price.gt(0)
+
+    missing = df[(df['is_roll'] == 1) & ~valid]
+    for row in missing.itertuples(index=False):
+        logging.warning(f"{row.exchange} {row.fut_code} {row.trade_date} 换月 {row.prev_ts_code} -> {row.ts_code} 缺少价格，不调整")
+
+    ratio = (new_price / old_price).where(valid, 1.0)
+    gap = (new_price - old_price).where(valid, 0.0)
+    by = [df[key] for key in keys]
+    df['adj_factor'] = ratio.groupby(by).cumprod() * df['anchor_factor'].fillna(1.0)
+    df['adj_offset'] = gap.groupby(by).cumsum() + df['anchor_offset'].fillna(0.0)
+    df['trade_date'] = df['trade_date'].dt.date
+    return df[CONTINUOUS_FIELDS]
+
+def adjust_prices(df, latest_factor, latest_offset, adjust=None):
+    """按品种最新一行的累计调整值把原始价格换算为后复权价格（adjust 为 None/'none' 时返回原始价格）"""
+    if adjust not in ADJUST_MODES:
+        raise ValueError(f"不支持的复权方式: {adjust}（可选 none、ratio、diff）")
+    if adjust in (None, 'none') or df.empty:
+        return df
+    df = df.copy()
+    for field in PRICE_FIELDS:
+        if adjust == 'ratio':
+            df[field] = df[field] * (latest_factor / df['adj_factor'])
+        else:
+            df[field] = df[field] + (latest_offset - df['adj_offset'])
+    return df
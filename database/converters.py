@@ -0,0 +1,94 @@
+"""DataFrame 到数据库参数的整列转换（避免逐行逐字段的 Python 处理）"""
+import re
+import numpy as np
+import pandas as pd
+
+_TYPE_PATTERN = re.compile(r'^(\w+)(?:\((\d+)(?:,\s*\d+)?\))?', re.IGNORECASE)
+
+def parse_field_types(describe_rows):
+    """
+    解析 DESCRIBE 结果为 {字段: (类型, 长度)}
+    例如 varchar(20) -> ('VARCHAR', 20)，decimal(20,4) -> ('DECIMAL', 20)，date -> ('DATE', None)
+    """
+    field_types = {}
+    for row in describe_rows:
+        field, type_info = row[0], row[1]
+        if isinstance(type_info, bytes):
+            type_info = type_info.decode('utf-8')
+        match = _TYPE_PATTERN.match(str(type_info))
+        if not match:
+            continue
+        length = int(match.group(2)) if match.group(2) else None
+        field_types[field] = (match.group(1).upper(), length)
+    return field_types
+
+def to_numeric(values):
+    """整列转换为浮点数，无法转换的值为 NaN"""
+    return pd.to_numeric(values, errors='coerce').astype(float)
+
+def to_string(values, max_length=None, fill=None):
+    """整列转换为字符串并截断到 max_length，缺失值为 fill"""
+    result = values.astype(object).where(values.notna(), None)
+    mask = result.notna()
+    text = result[mask].astype(str)
+    if max_length:
+        text = text.str.slice(0, max_length)
+    result = result.astype(object)
+    result[mask] = text
+    if fill is not None:
+        result[~mask] = fill
+    return result
+
+def to_date_string(values, date_format='%Y-%m-%d'):
+    """整列转换为日期字符串，无法解析的值为 None"""
+    dates = pd.to_datetime(values, errors='coerce')
+    return dates.dt.strftime(date_format).astype(object).where(dates.notna(), None)
+
+def change_rate(close, pre_close):
+    """涨跌幅(%)：(close - pre_close) / pre_close * 100，昨收缺失或为0时为 NaN"""
+    close = to_numeric(close)
+    pre_close = to_numeric(pre_close)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = (close - pre_close) / pre_close * 100
+    return rate.where(pre_close.notna() & (pre_close != 0))
+
+def quote_frame(df):
+    """整理行情数据：合约代码截断到20位，数值列转浮点，计算涨跌幅"""
+    frame = pd.DataFrame(index=df.index)
+    frame['ts_code'] = to_string(df['ts_code'], 20)
+    frame['trade_date'] = df['trade_date']
+    for field in ['open', 'high', 'low', 'close', 'pre_close']:
+        frame[field] = to_numeric(df[field])
+    frame['change_rate'] = change_rate(frame['close'], frame['pre_close'])
+    for field in ['vol', 'amount', 'oi']:
+        frame[field] = to_numeric(df[field])
+    return frame
+
+def convert_frame(df, field_types, date_format='%Y%m%d', string_fill=''):
+    """
+    按表结构整列转换 DataFrame，只保留表中存在的字段
+    VARCHAR/CHAR 转字符串并截断到字段长度（缺失值为 string_fill），DECIMAL/INT/FLOAT 转数值，
+    DATE/DATETIME 按 date_format 格式化，其他类型转字符串
+    """
+    frame = pd.DataFrame(index=df.index)
+    for field in df.columns:
+        if field not in field_types:
+            continue
+        field_type, length = field_types[field]
+        values = df[field]
+        if field_type in ('VARCHAR', 'CHAR'):
+            frame[field] = to_string(values, length, fill=string_fill)
+        elif field_type in ('DECIMAL', 'INT', 'BIGINT', 'TINYINT', 'SMALLINT', 'FLOAT', 'DOUBLE'):
+            frame[field] = to_numeric(values)
+        elif field_type in ('DATE', 'DATETIME', 'TIMESTAMP'):
+            frame[field] = to_date_string(values, date_format)
+        else:
+            frame[field] = to_string(values)
+    return frame
+
+def to_params(frame, fields=None):
+    """转换为可直接传给 cursor.execute/executemany 的参数元组列表（NaN 转为 None）"""
+    if fields is not None:
+        frame = frame.reindex(columns=fields)
+    values = frame.astype(object).where(frame.notna(), None)
+    return list(values.itertuples(index=False, name=None))
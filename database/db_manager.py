@@ -7,13 +7,40 @@ import time
 import traceback
 import sys
 import os
+import tempfile
+import csv
 from utils.decorators import error_handler
+from . import converters
+from . import migrations
+from . import continuous_series
+from .metadata_cache import MetadataCache
 from utils.exceptions import DatabaseError
 import contextlib
+import threading
+import weakref
+from collections import OrderedDict
+from functools import lru_cache, wraps
+from .connection_pool import ConnectionPool
+
+def _cached_statement(builder):
+    """按语句形状（表、字段、行数等参数）缓存生成的 SQL，列表参数转为元组作为缓存键"""
+    cached = lru_cache(maxsize=256)(builder)
+
+    def freeze(value):
+        return tuple(value) if isinstance(value, list) else value
+
+    @wraps(builder)
+    def wrapper(*args, **kwargs):
+        return cached(*[freeze(arg) for arg in args], **{key: freeze(value) for key, value in kwargs.items()})
+
+    wrapper.cache_info = cached.cache_info
+    wrapper.cache_clear = cached.cache_clear
+    return wrapper
 
 class QueryBuilder:
-    """SQL查询构建器"""
+    """SQL查询构建器（生成的语句按参数缓存）"""
     @staticmethod
+    @_cached_statement
     def build_select(table, fields='*', where=None):
         query = f"SELECT {fields} FROM {table}"
         if where:
@@ -21,11 +48,42 @@ class QueryBuilder:
         return query
     
     @staticmethod
+    @_cached_statement
     def build_insert(table, fields):
         placeholders = ', '.join(['%s'] * len(fields))
         return f"INSERT INTO {table} ({', '.join(fields)}) VALUES ({placeholders})"
     
     @staticmethod
+    @_cached_statement
+    def build_upsert(table, fields, key_fields, rows=1):
+        """多行 INSERT ... ON DUPLICATE KEY UPDATE（非主键字段按新值更新）"""
+        placeholders = '(' + ', '.join(['%s'] * len(fields)) + ')'
+        return (
+            f"INSERT INTO {table} ({', '.join(fields)}) VALUES "
+            + ', '.join([placeholders] * rows)
+            + f" ON DUPLICATE KEY UPDATE {QueryBuilder.build_update_clause(fields, key_fields)}"
+        )
+    
+    @staticmethod
+    @_cached_statement
+    def build_upsert_select(table, source, fields, key_fields):
+        """INSERT ... SELECT ... ON DUPLICATE KEY UPDATE（从另一张表整体合并）"""
+        columns = ', '.join(fields)
+        return (
+            f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {source} "
+            f"ON DUPLICATE KEY UPDATE {QueryBuilder.build_update_clause(fields, key_fields)}"
+        )
+    
+    @staticmethod
+    @_cached_statement
+    def build_update_clause(fields, key_fields):
+        """ON DUPLICATE KEY UPDATE 子句（非主键字段按新值更新）"""
+        return ', '.join(
+            f"{field} = VALUES({field})" for field in fields if field not in key_fields
+        )
+    
+    @staticmethod
+    @_cached_statement
     def build_update(table, fields, where):
         set_clause = ', '.join([f"{field} = %s" for field in fields])
         return f"UPDATE {table} SET {set_clause} WHERE {where}"
@@ -43,23 +101,143 @@ class ConnectionManager:
             self.connection.commit()
 
 class DatabaseManager:
+    # 服务器不允许 LOAD DATA LOCAL INFILE 时进程内不再尝试
+    _local_infile_disabled = False
+    
+    # 合约信息变化的监听函数，参数为受影响的 {(exchange, fut_code)}
+    _contract_listeners = []
+    
+    # 交易所、品种、合约列表、主力合约等元数据的进程内缓存（所有管理器共享）
+    metadata_cache = MetadataCache()
+    
+    # get_main_contracts_for_date 返回的字段
+    MAIN_CONTRACT_QUOTE_FIELDS = ['trade_date', 'exchange', 'fut_code', 'ts_code', 'open', 'high', 'low',
+                                  'close', 'pre_close', 'change_rate', 'vol', 'amount', 'oi']
+    
+    # 合约代码后缀 -> 交易所
+    SUFFIX_EXCHANGE = {'CFX': 'CFFEX', 'SHF': 'SHFE', 'DCE': 'DCE', 'ZCE': 'CZCE', 'INE': 'INE', 'GFE': 'GFEX'}
+    
+    # 服务器或客户端不允许 LOAD DATA LOCAL INFILE 时的错误码
+    LOCAL_INFILE_ERRORS = (1148, 2068, 3948)
+    
+    # 持仓排名字段
+    HOLDING_FIELDS = ['ts_code', 'trade_date', 'broker', 'exchange', 'vol', 'vol_chg',
+                      'long_hld', 'long_chg', 'short_hld', 'short_chg']
+    
     def __init__(self):
         self.config = Config.DB_CONFIG
-        self.connection = None
         self.max_retries = 3
         self.retry_delay = 1  # 重试延迟（秒）
         
+        # 每个线程从连接池取出各自的连接
+        self._local = threading.local()
+        self._connections = {}  # 线程对象的弱引用 -> (连接, 连接池)
+        self._connections_lock = threading.Lock()
+        self._active = False
+        
+    @property
+    def connection(self):
+        """当前线程的数据库连接；已连接过的管理器在其他线程首次使用时自动从连接池取出连接"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None and self._active:
+            try:
+                self._checkout()
+                connection = self._local.connection
+            except Exception as e:
+                logging.error(f"从连接池获取连接失败: {str(e)}")
+        return connection
+        
+    @connection.setter
+    def connection(self, value):
+        """设置当前线程的连接（置为 None 时把原连接归还连接池）"""
+        if value is None:
+            self.release()
+        else:
+            self._local.connection = value
+            
+    def _checkout(self):
+        """
+        为当前线程从连接池取出连接
+        按线程对象的弱引用登记（线程ID会被新线程复用），线程对象回收时自动归还连接
+        """
+        self._release_finished()
+        pool = ConnectionPool.instance()
+        connection = pool.acquire()
+        self._local.connection = connection
+        thread = threading.current_thread()
+        key = weakref.ref(thread)
+        with self._connections_lock:
+            previous = self._connections.get(key)
+            self._connections[key] = (connection, pool)
+        if previous is None:
+            weakref.finalize(thread, DatabaseManager._release_entry, self._connections, self._connections_lock, key)
+        elif previous[0] is not connection:
+            previous[1].release(previous[0])
+        return connection
+        
+    @staticmethod
+    def _release_entry(connections, lock, key):
+        """归还已登记的连接（线程结束后由 weakref.finalize 调用，不持有管理器本身）"""
+        with lock:
+            entry = connections.pop(key, None)
+        if entry is not None:
+            entry[1].release(entry[0])
+            
+    def _release_finished(self):
+        """归还已结束线程仍占用的连接（线程对象仍被引用、尚未回收的情况）"""
+        with self._connections_lock:
+            finished = []
+            for key in self._connections:
+                thread = key()
+                if thread is None or not thread.is_alive():
+                    finished.append(key)
+        for key in finished:
+            self._release_entry(self._connections, self._connections_lock, key)
+        
+    def release(self):
+        """把当前线程的连接归还连接池"""
+        connection = getattr(self._local, 'connection', None)
+        self._local.connection = None
+        with self._connections_lock:
+            entry = self._connections.pop(weakref.ref(threading.current_thread()), None)
+        if entry is not None:
+            entry[1].release(entry[0])
+        elif connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+                
+    def close(self):
+        """归还本管理器在所有线程中取出的连接"""
+        self._active = False
+        self._local.connection = None
+        with self._connections_lock:
+            entries = list(self._connections.values())
+            self._connections.clear()
+        for connection, pool in entries:
+            pool.release(connection)
+            
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+        
     def connect(self):
-        """连接数据库，带重试机制"""
+        """从连接池获取当前线程的连接，带重试机制"""
         retries = 0
         while retries < self.max_retries:
             try:
-                if self.connection:
+                connection = getattr(self._local, 'connection', None)
+                if connection:
                     try:
-                        if self.connection.is_connected():
+                        if connection.is_connected():
+                            self._active = True
                             return True
                     except:
-                        self.connection = None
+                        pass
+                    self.release()
                     
                 logging.info(f"尝试连接数据库 (尝试 {retries + 1}/{self.max_retries})")
                 
@@ -68,23 +246,16 @@ class DatabaseManager:
                     logging.error("数据库配置无效")
                     return False
                 
-                # 创新连接
-                self.connection = mysql.connector.connect(
-                    host=str(self.config['host']),
-                    user=str(self.config['user']),
-                    password=str(self.config['password']),
-                    port=int(self.config['port']),
-                    database=str(self.config['database']),
-                    connect_timeout=10,
-                    charset='utf8mb4',
-                    use_pure=True,  # 使用纯Python实现
-                    autocommit=True  # 自动提交模式
-                )
+                # 从连接池取出连接（取出时已做健康检查）
+                self._checkout()
                 
-                # 测试连接
-                with self.connection.cursor() as cursor:
-                    cursor.execute("SELECT 1")
-                    cursor.fetchone()
+                # 进程内首次连接时执行数据库结构迁移
+                try:
+                    migrations.ensure_schema(self._local.connection)
+                except Exception:
+                    self.release()
+                    raise
+                self._active = True
                     
                 logging.info("数据库连接成功")
                 return True
@@ -100,25 +271,19 @@ class DatabaseManager:
                 else:
                     logging.error(f"数据库连接错误: {error_msg}")
                 
-                if self.connection:
-                    try:
-                        self.connection.close()
-                    except:
-                        pass
-                self.connection = None
-                
+                self.release()
                 retries += 1
                 if retries < self.max_retries:
                     time.sleep(self.retry_delay)
                     
+            except DatabaseError as e:
+                # 连接池已满，等待超时
+                logging.error(str(e))
+                retries += 1
+                    
             except Exception as e:
                 logging.error(f"未预期的错误: {str(e)}\n{traceback.format_exc()}")
-                if self.connection:
-                    try:
-                        self.connection.close()
-                    except:
-                        pass
-                self.connection = None
+                self.release()
                 return False
                 
         logging.error("数据库连接失败，已达到最大重试次数")
@@ -170,6 +335,9 @@ class DatabaseManager:
         try:
             if not self.ensure_connected():
                 raise DatabaseError("无法建立数据库连接")
+            # 连接处于自动提交模式，需显式开启事务才能保证原子性
+            if not self.connection.in_transaction:
+                self.connection.start_transaction()
             cursor = self.connection.cursor()
             yield cursor
             self.connection.commit()
@@ -181,6 +349,33 @@ class DatabaseManager:
             if cursor:
                 cursor.close()
 
+    @contextlib.contextmanager
+    def _statement_cursor(self, query, cursor=None):
+        """
+        执行 query 使用的游标
+        开启 DB_PREPARED 时返回当前连接上缓存的预处理游标（同一语句在服务端只准备一次，
+        每个连接最多缓存 DB_PREPARED_CACHE 条，淘汰时释放）；否则返回 cursor，未提供时新建并在用完后关闭
+        """
+        if Config.DB_PREPARED:
+            connection = self.connection
+            statements = getattr(connection, '_statement_cache', None)
+            if statements is None:
+                statements = OrderedDict()
+                connection._statement_cache = statements
+            prepared = statements.pop(query, None)
+            if prepared is None:
+                prepared = connection.cursor(prepared=True)
+                while len(statements) >= Config.DB_PREPARED_CACHE:
+                    _, evicted = statements.popitem(last=False)
+                    evicted.close()
+            statements[query] = prepared
+            yield prepared
+        elif cursor is not None:
+            yield cursor
+        else:
+            with self.connection.cursor() as cursor:
+                yield cursor
+
     @error_handler(logger=logging)
     def execute_query(self, query, params=None):
         """执行查询"""
@@ -233,12 +428,15 @@ class DatabaseManager:
             return None
     
     def get_exchanges(self):
-        """获取所有交易所"""
+        """获取所有交易所（进程内缓存）"""
+        return self.metadata_cache.get(('exchanges',), self._query_exchanges)
+    
+    def _query_exchanges(self):
         try:
             if not self.ensure_connected():
                 return None
                 
-            today = datetime.now().strftime('%Y-%m-%d')
+            today = datetime.now().strftime('%Y%m%d')
             query = """
             SELECT DISTINCT exchange 
             FROM futures_basic 
@@ -257,8 +455,11 @@ class DatabaseManager:
             return None
     
     def get_future_codes(self, exchange):
-        """获取指定交易所的期货品种代码"""
-        today = datetime.now().strftime('%Y-%m-%d')
+        """获取指定交易所的期货品种代码（进程内缓存）"""
+        return self.metadata_cache.get(('future_codes', exchange), lambda: self._query_future_codes(exchange))
+    
+    def _query_future_codes(self, exchange):
+        today = datetime.now().strftime('%Y%m%d')
         query = """
         SELECT DISTINCT fut_code 
         FROM futures_basic 
@@ -274,8 +475,18 @@ class DatabaseManager:
             logging.error(f"获取期货品种代码失败: {str(e)}")
             return None
     
+    CONTRACT_FIELDS = [
+        'ts_code', 'symbol', 'exchange', 'name', 'fut_code', 'multiplier',
+        'trade_unit', 'per_unit', 'quote_unit', 'quote_unit_desc', 'd_mode_desc',
+        'list_date', 'delist_date', 'd_month', 'last_ddate', 'trade_time_desc'
+    ]
+
     def update_contracts(self, df):
-        """更新合约信息（先清空表，再插入新数据）"""
+        """
+        全量刷新合约信息（影子表切换）
+        数据先批量载入 futures_basic_new，校验行数后用一条 RENAME TABLE 原子替换 futures_basic，
+        刷新过程中读取方始终看到完整的旧表
+        """
         if df is None or df.empty:
             return False
             
@@ -287,135 +498,181 @@ class DatabaseManager:
                 logging.error(error_msg)
                 return False
                 
-            cursor = self.connection.cursor()
-            try:
-                # 获取表结构信息
-                cursor.execute("DESCRIBE futures_basic")
-                field_info = {row[0]: row[1] for row in cursor.fetchall()}
-                print("\n结构信息:")
-                for field, type_info in field_info.items():
-                    print(f"字段: {field}, 类型: {type_info}")
-                
-                # 打印数据框的列名和数据类型
-                print("\nDataFrame信息:")
-                print(df.dtypes)
-                print("\nDataFrame前几行数据:")
-                print(df.head())
-                
-                # 1. 先清空表
-                truncate_query = "TRUNCATE TABLE futures_basic"
-                print("清空期货合约表...")
-                cursor.execute(truncate_query)
-                
-                # 2. 插入新数据
-                insert_query = """
-                INSERT INTO futures_basic (
-                    ts_code, symbol, exchange, name, fut_code, multiplier,
-                    trade_unit, per_unit, quote_unit, quote_unit_desc, d_mode_desc,
-                    list_date, delist_date, d_month, last_ddate, trade_time_desc
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s,
-                    %s, %s, %s, %s, %s,
-                    %s, %s, %s, %s, %s
-                )
-                """
+            data, skip_count = self._prepare_contracts(df)
+            with self.connection.cursor() as cursor:
+                cursor.execute("SELECT COUNT(*) FROM futures_basic")
+                old_count = cursor.fetchone()[0]
                 
-                insert_count = 0
-                skip_count = 0
+            # 1. 载入影子表
+            with self.connection.cursor() as cursor:
+                cursor.execute("DROP TABLE IF EXISTS futures_basic_new")
+                cursor.execute("CREATE TABLE futures_basic_new LIKE futures_basic")
                 
-                for _, row in df.iterrows():
-                    try:
-                        # 准备插入数据，并检查字段长度
-                        data = {}
-                        for field, value in row.items():
-                            if field not in field_info:
-                                continue
-                            
-                            field_type = field_info[field].upper()
-                            
-                            # 处理字符串类型字段
-                            if 'VARCHAR' in field_type:
-                                max_length = int(field_type.split('(')[1].split(')')[0])
-                                str_value = str(value) if pd.notna(value) else ''
-                                if len(str_value) > max_length:
-                                    print(f"警告: 字段 {field} 的值超出长度限制 ({len(str_value)} > {max_length})")
-                                    str_value = str_value[:max_length]
-                                data[field] = str_value
-                                
-                            # 处理数值类型字段
-                            elif 'DECIMAL' in field_type or 'INT' in field_type:
-                                data[field] = float(value) if pd.notna(value) else None
-                                
-                            # 处理期类型字段
-                            elif 'DATE' in field_type:
-                                # 转换日期格式为 YYYYMMDD
-                                data[field] = pd.to_datetime(value).strftime('%Y%m%d') if pd.notna(value) else None
-                                
-                            else:
-                                data[field] = str(value) if pd.notna(value) else None
-                        
-                        # 检查必要字段是否为空
-                        if not data.get('ts_code') or not data.get('exchange'):
-                            print(f"跳过无效数据: ts_code={data.get('ts_code')}, exchange={data.get('exchange')}")
-                            skip_count += 1
-                            continue
+            if self._bulk_upsert('futures_basic_new', data, ['ts_code']) is None:
+                insert_query = QueryBuilder.build_insert('futures_basic_new', list(data.columns))
+                rows = converters.to_params(data)
+                batch_size = Config.DB_BATCH_SIZE
+                with self.transaction() as cursor:
+                    for start in range(0, len(rows), batch_size):
+                        cursor.executemany(insert_query, rows[start:start + batch_size])
                         
-                        # 按字段顺序准备数据
-                        insert_data = (
-                            data.get('ts_code'),
-                            data.get('symbol'),
-                            data.get('exchange'),
-                            data.get('name'),
-                            data.get('fut_code'),
-                            data.get('multiplier'),
-                            data.get('trade_unit'),
-                            data.get('per_unit'),
-                            data.get('quote_unit'),
-                            data.get('quote_unit_desc'),
-                            data.get('d_mode_desc'),
-                            data.get('list_date'),
-                            data.get('delist_date'),
-                            data.get('d_month'),
-                            data.get('last_ddate'),
-                            data.get('trade_time_desc')
-                        )
-                        
-                        cursor.execute(insert_query, insert_data)
-                        insert_count += 1
-                        
-                    except Exception as e:
-                        import sys
-                        exc_type, exc_obj, exc_tb = sys.exc_info()
-                        fname = os.path.split(exc_tb.tb_frame.f_code.co_filename)[1]
-                        error_msg = f"插入数据失败: {str(e)} (文件: {fname}, 行号: {exc_tb.tb_lineno})"
-                        print(error_msg)
-                        print(f"问题数据: {data}")
-                        skip_count += 1
-                        continue
-                        
-                self.connection.commit()
-                print(f"合约信息更新完成: 插入 {insert_count} 条记录，跳过 {skip_count} 条记录")
-                return True
+            # 2. 校验行数：必须与待写入的数据一致，且不能比旧表少太多（防止接口返回不完整）
+            with self.connection.cursor() as cursor:
+                cursor.execute("SELECT COUNT(*) FROM futures_basic_new")
+                new_count = cursor.fetchone()[0]
+            min_count = int(old_count * Config.BASIC_SWAP_MIN_RATIO)
+            if new_count != len(data) or new_count < min_count:
+                raise DatabaseError(
+                    f"影子表校验失败: 载入 {new_count} 行, 应为 {len(data)} 行, "
+                    f"旧表 {old_count} 行 (至少需要 {min_count} 行)"
+                )
                 
-            except Exception as e:
-                error_msg = f"新合约数据失败: {str(e)}"
-                print(error_msg)
-                logging.error(error_msg)
-                if self.connection:
-                    self.connection.rollback()
-                return False
-            finally:
-                if cursor:
-                    cursor.close()
+            # 3. 原子切换，删除旧表前记录受影响的品种
+            with self.connection.cursor() as cursor:
+                cursor.execute("DROP TABLE IF EXISTS futures_basic_old")
+                cursor.execute(
+                    "RENAME TABLE futures_basic TO futures_basic_old, "
+                    "futures_basic_new TO futures_basic"
+                )
+                cursor.execute(
+                    "SELECT DISTINCT exchange, fut_code FROM futures_basic_old "
+                    "UNION SELECT DISTINCT exchange, fut_code FROM futures_basic"
+                )
+                products = set(cursor.fetchall())
+                cursor.execute("DROP TABLE futures_basic_old")
+            self._notify_contracts_changed(products)
+                
+            print(f"合约信息更新完成: 写入 {new_count} 条记录 (原 {old_count} 条)，跳过 {skip_count} 条记录")
+            return True
                 
         except Exception as e:
             error_msg = f"更新合约数据失败: {str(e)}"
             print(error_msg)
-            logging.error(error_msg)
+            logging.error(f"{error_msg}\n{traceback.format_exc()}")
+            try:
+                with self.connection.cursor() as cursor:
+                    cursor.execute("DROP TABLE IF EXISTS futures_basic_new")
+            except Exception:
+                pass
             return False
     
+    def sync_contracts(self, df):
+        """
+        增量同步合约信息
+        按每个合约的内容哈希与库中数据比较，只在一个事务中写入新增、变化的合约并删除已不存在的合约，
+        未变化的合约不写入（update_time 保持不变）。
+        返回 {'inserted': [...], 'updated': [...], 'deleted': [...], 'unchanged': 数量}
+        """
+        if df is None or df.empty:
+            return None
+            
+        if not self.ensure_connected():
+            raise DatabaseError("无法建立数据库连接")
+            
+        data, skip_count = self._prepare_contracts(df)
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT ts_code, content_hash, exchange, fut_code FROM futures_basic")
+            stored = pd.DataFrame(
+                cursor.fetchall(),
+                columns=['ts_code', 'content_hash', 'exchange', 'fut_code']
+            ).set_index('ts_code')
+            
+        # 防止接口返回不完整时误删大量合约
+        min_count = int(len(stored) * Config.BASIC_SWAP_MIN_RATIO)
+        if len(data) < min_count:
+            raise DatabaseError(f"合约数据不完整: 获取 {len(data)} 条, 库中 {len(stored)} 条")
+            
+        new_hashes = data.set_index('ts_code')['content_hash']
+        old_hashes = stored['content_hash'].reindex(new_hashes.index)
+        inserted = new_hashes.index[~new_hashes.index.isin(stored.index)]
+        updated = new_hashes.index[new_hashes.index.isin(stored.index) & (old_hashes != new_hashes)]
+        deleted = stored.index[~stored.index.isin(new_hashes.index)]
+        
+        changed = data[data['ts_code'].isin(inserted.union(updated))]
+        fields = list(data.columns)
+        upsert_query = QueryBuilder.build_upsert('futures_basic', fields, ['ts_code'])
+        rows = converters.to_params(changed)
+        deleted_codes = list(deleted)
+        batch_size = Config.DB_BATCH_SIZE
+        
+        with self.transaction() as cursor:
+            for start in range(0, len(rows), batch_size):
+                cursor.executemany(upsert_query, rows[start:start + batch_size])
+            for start in range(0, len(deleted_codes), batch_size):
+                batch = deleted_codes[start:start + batch_size]
+                cursor.execute(
+                    f"DELETE FROM futures_basic WHERE ts_code IN ({', '.join(['%s'] * len(batch))})",
+                    batch
+                )
+                
+        # 受影响的品种：变化合约的新旧品种及删除合约的品种
+        products = set(zip(changed['exchange'], changed['fut_code']))
+        affected_old = stored.loc[stored.index.isin(updated.union(deleted))]
+        products |= set(zip(affected_old['exchange'], affected_old['fut_code']))
+        self._notify_contracts_changed(products)
+        
+        result = {
+            'inserted': list(inserted),
+            'updated': list(updated),
+            'deleted': deleted_codes,
+            'unchanged': len(data) - len(inserted) - len(updated)
+        }
+        message = (
+            f"合约信息同步完成: 新增 {len(inserted)}, 变化 {len(updated)}, 删除 {len(deleted_codes)}, "
+            f"未变化 {result['unchanged']}, 跳过无效数据 {skip_count}"
+        )
+        print(message)
+        logging.info(message)
+        return result
+
+    def _prepare_contracts(self, df):
+        """
+        按表结构整列转换合约数据（字符串截断到字段长度，数值转浮点，日期转 YYYYMMDD），
+        去掉无效行并计算每个合约的内容哈希。返回 (数据, 跳过的行数)
+        """
+        with self.connection.cursor() as cursor:
+            cursor.execute("DESCRIBE futures_basic")
+            field_types = converters.parse_field_types(cursor.fetchall())
+            
+        data = converters.convert_frame(df, field_types)
+        valid = data['ts_code'].fillna('').ne('') & data['exchange'].fillna('').ne('')
+        skip_count = int((~valid).sum())
+        if skip_count:
+            print(f"跳过无效数据 {skip_count} 条: {data.loc[~valid, 'ts_code'].tolist()}")
+        data = data[valid].drop_duplicates(subset=['ts_code'], keep='last')
+        data = data.reindex(columns=self.CONTRACT_FIELDS).reset_index(drop=True)
+        
+        hashes = pd.util.hash_pandas_object(
+            data.astype(object).where(data.notna(), None).astype(str),
+            index=False
+        )
+        data['content_hash'] = [f"{value:016x}" for value in hashes]
+        return data, skip_count
+
+    @classmethod
+    def add_contract_listener(cls, callback):
+        """注册合约信息变化的监听函数 callback({(exchange, fut_code)})"""
+        if callback not in cls._contract_listeners:
+            cls._contract_listeners.append(callback)
+
+    def _notify_contracts_changed(self, products):
+        """通知监听方哪些品种的合约信息发生了变化"""
+        if not products:
+            return
+        for callback in list(DatabaseManager._contract_listeners):
+            try:
+                callback(products)
+            except Exception as e:
+                logging.error(f"合约变化通知失败: {str(e)}")
+
     def get_contracts_by_future_code(self, exchange, fut_code):
-        """获取指定品种的所有未到期合约"""
+        """获取指定品种的所有未到期合约（进程内缓存）"""
+        return self.metadata_cache.get(
+            ('contracts', exchange, fut_code),
+            lambda: self._query_contracts_by_future_code(exchange, fut_code)
+        )
+    
+    def _query_contracts_by_future_code(self, exchange, fut_code):
         query = """
         SELECT 
             ts_code,
@@ -426,13 +683,14 @@ class DatabaseManager:
         FROM futures_basic
         WHERE exchange = %s 
         AND fut_code = %s
-        AND delist_date > CURDATE()
+        AND delist_date > %s
         ORDER BY ts_code
         """
+        today = datetime.now().strftime('%Y%m%d')
         try:
             # 使用原生MySQL查询
             with self.connection.cursor() as cursor:
-                cursor.execute(query, (exchange, fut_code))
+                cursor.execute(query, (exchange, fut_code, today))
                 columns = [desc[0] for desc in cursor.description]
                 data = cursor.fetchall()
                 
@@ -450,11 +708,17 @@ class DatabaseManager:
             return None
     
     def get_last_trade_date(self):
-        """获取最后有效交易日"""
+        """获取最后有效交易日（优先使用交易日历表，日历未覆盖当前日期时按工作日估算）"""
         try:
             current_time = datetime.now()
             current_date = current_time.date()
             
+            # 收盘前当天数据尚未产生，只取到前一天
+            cutoff = current_date if current_time.hour >= Config.TRADE_CAL['close_hour'] else current_date - timedelta(days=1)
+            last_trade_date = self._get_last_open_date(cutoff)
+            if last_trade_date:
+                return last_trade_date
+            
             # 如果是周末（周六或周日）
             if current_time.weekday() >= 5:
                 # 获取上周五的期
@@ -493,41 +757,35 @@ class DatabaseManager:
             logging.error(error_msg)
             return None
     
+    def _get_last_open_date(self, cutoff):
+        """从交易日历表获取不晚于 cutoff 的最后交易日，日历未覆盖 cutoff 时返回 None"""
+        try:
+            if not self.ensure_connected():
+                return None
+            query = """
+            SELECT MAX(CASE WHEN is_open = 1 AND cal_date <= %s THEN cal_date END), MAX(cal_date)
+            FROM futures_trade_cal
+            WHERE exchange = %s
+            """
+            with self.connection.cursor() as cursor:
+                cursor.execute(query, (cutoff, Config.TRADE_CAL['exchange']))
+                last_open, covered_until = cursor.fetchone()
+            if covered_until is None or covered_until < cutoff:
+                return None
+            return last_open
+        except Exception as e:
+            logging.warning(f"读取交易日历失败，按工作日估算: {str(e)}")
+            return None
+
     def check_quote_exists(self, ts_code, trade_date):
         """检查某个合约的行情数据是否存在"""
         try:
-            # 首先确保表存在
-            create_table_query = """
-            CREATE TABLE IF NOT EXISTS futures_daily_quotes (
-                id BIGINT AUTO_INCREMENT PRIMARY KEY,
-                ts_code VARCHAR(20),
-                trade_date DATE,
-                open DECIMAL(20,4),
-                high DECIMAL(20,4),
-                low DECIMAL(20,4),
-                close DECIMAL(20,4),
-                pre_close DECIMAL(20,4),
-                change_rate DECIMAL(20,4),
-                vol DECIMAL(20,4),
-                amount DECIMAL(20,4),
-                oi DECIMAL(20,4),
-                oi_chg DECIMAL(20,4),
-                update_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                UNIQUE KEY idx_ts_trade (ts_code, trade_date)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+            query = """
+            SELECT COUNT(*) 
+            FROM futures_daily_quotes 
+            WHERE ts_code = %s AND trade_date = %s
             """
-            
             with self.connection.cursor() as cursor:
-                # 创建表
-                cursor.execute(create_table_query)
-                self.connection.commit()
-                
-                # 检查数据是否存在
-                query = """
-                SELECT COUNT(*) 
-                FROM futures_daily_quotes 
-                WHERE ts_code = %s AND trade_date = %s
-                """
                 cursor.execute(query, (ts_code, trade_date))
                 count = cursor.fetchone()[0]
                 return count > 0
@@ -537,112 +795,108 @@ class DatabaseManager:
             print(error_msg)
             logging.error(error_msg)
             return False
-    
-    @error_handler(logger=logging)
-    def get_main_contracts(self, exchange, fut_code):
-        """获取主力合约"""
+
+    def get_watermarks(self, ts_codes=None):
+        """获取合约的同步水位线 {ts_code: 最后交易日}（一次查询）"""
         try:
-            # 1. 先获取该品种的最新交易日期
-            date_query = """
-            SELECT DATE_FORMAT(MAX(trade_date), '%Y-%m-%d') as latest_date
-            FROM futures_daily_quotes
-            """
+            if not self.ensure_connected():
+                return None
             
-            with self.connection.cursor() as cursor:
-                cursor.execute(date_query)
-                latest_date = cursor.fetchone()[0]
+            query = "SELECT ts_code, last_trade_date FROM futures_sync_watermark"
+            params = ()
+            if ts_codes is not None:
+                ts_codes = list(ts_codes)
+                if not ts_codes:
+                    return {}
+                query += f" WHERE ts_code IN ({', '.join(['%s'] * len(ts_codes))})"
+                params = tuple(ts_codes)
                 
-                if not latest_date:
-                    logging.warning("未找到任何行情数据")
-                    return None
-                
-                logging.debug(f"最新交易日期: {latest_date}")
-                
-                # 2. 获取该品种所有未到期合约在最新交易日的数据
-                query = """
-                SELECT 
-                    q.ts_code,
-                    CAST(COALESCE(q.vol, 0) AS DECIMAL(20,4)) as volume,
-                    CAST(COALESCE(q.oi, 0) AS DECIMAL(20,4)) as position,
-                    q.trade_date
-                FROM futures_basic b
-                LEFT JOIN futures_daily_quotes q 
-                    ON b.ts_code = q.ts_code 
-                    AND DATE(q.trade_date) = DATE(%s)
-                WHERE b.exchange = %s 
-                AND b.fut_code = %s
-                AND b.delist_date >= %s
-                HAVING volume > 0 OR position > 0
-                ORDER BY (volume * 0.4 + position * 0.6) DESC
-                """
-                
-                logging.debug(f"执行查询: {query}")
-                logging.debug(f"参数: {latest_date}, {exchange}, {fut_code}, {latest_date}")
-                
-                cursor.execute(query, (latest_date, exchange, fut_code, latest_date))
-                contracts_data = cursor.fetchall()
-                
-                if not contracts_data:
-                    # 如果没有找到有成交的合约，使用最近到期的合约作为备选
-                    backup_query = """
-                    SELECT ts_code
-                    FROM futures_basic
-                    WHERE exchange = %s
-                    AND fut_code = %s
-                    AND delist_date >= %s
-                    ORDER BY delist_date ASC
-                    LIMIT 1
-                    """
-                    cursor.execute(backup_query, (exchange, fut_code, latest_date))
-                    backup_result = cursor.fetchone()
-                    if backup_result:
-                        logging.info(f"使用备选合约: {backup_result[0]} (无成交量数据)")
-                        return backup_result[0]
-                    
-                    logging.warning(f"未找到任何有效合约: {exchange}.{fut_code}")
-                    return None
-                
-                # 3. 找出成交量和持仓量最大的合约
-                max_score = 0
-                main_contract = None
-                main_volume = 0
-                main_position = 0
-                
-                for ts_code, volume, position, trade_date in contracts_data:
-                    # 计算得分 (成交量40%，持仓量60%)
-                    score = float(volume) * 0.4 + float(position) * 0.6
-                    
-                    logging.info(
-                        f"合约: {ts_code}\n"
-                        f"  交易日期: {trade_date}\n"
-                        f"  成交量: {volume}\n"
-                        f"  持仓量: {position}\n"
-                        f"  得分: {score}"
-                    )
-                    
-                    if score > max_score:
-                        max_score = score
-                        main_contract = ts_code
-                        main_volume = volume
-                        main_position = position
-                
-                if main_contract:
-                    logging.info(
-                        f"\n选定主力合约: {main_contract}\n"
-                        f"交易日期: {latest_date}\n"
-                        f"成交量: {main_volume}\n"
-                        f"持仓量: {main_position}\n"
-                        f"最终得分: {max_score}"
-                    )
-                    return main_contract
-                else:
-                    logging.warning(f"未找到 {exchange}.{fut_code} 的主力合约")
-                    return None
+            with self.connection.cursor() as cursor:
+                cursor.execute(query, params)
+                return {row[0]: row[1] for row in cursor.fetchall()}
                 
         except Exception as e:
-            error_msg = f"获取主力合约失败: {str(e)}"
-            logging.error(f"{error_msg}\n{traceback.format_exc()}")
+            error_msg = f"获取同步水位线失败: {str(e)}"
+            print(error_msg)
+            logging.error(error_msg)
             return None
+
+    def reset_watermarks(self, watermarks):
+        """把合约水位线回退到指定日期（None 表示删除水位线），用于部分失败后重新补齐"""
+        if not watermarks:
+            return True
+        try:
+            with self.transaction() as cursor:
+                for ts_code, last_trade_date in watermarks.items():
+                    if last_trade_date is None:
+                        cursor.execute(
+                            "DELETE FROM futures_sync_watermark WHERE ts_code = %s",
+                            (ts_code,)
+                        )
+                    else:
+                        cursor.execute(
+                            "UPDATE futures_sync_watermark SET last_trade_date = %s WHERE ts_code = %s",
+                            (last_trade_date, ts_code)
+                        )
+            return True
+        except Exception as e:
+            logging.error(f"回退同步水位线失败: {str(e)}")
+            return False
+
+    def _update_watermarks(self, cursor, df):
+        """在当前事务中推进合约水位线"""
+        latest = df.groupby('ts_code')['trade_date'].max()
+        query = """
+        INSERT INTO futures_sync_watermark (ts_code, last_trade_date)
+        VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE
+            last_trade_date = GREATEST(last_trade_date, VALUES(last_trade_date))
+        """
+        cursor.executemany(query, [(str(ts_code), trade_date) for ts_code, trade_date in latest.items()])
+    
+    @error_handler(logger=logging)
+    def get_main_contracts_for_date(self, trade_date=None, compute=True):
+        """
+        一次查询获取某交易日所有品种的主力合约及其当天行情（进程内缓存，主力合约更新时失效）
+        trade_date 为空时取主力合约表的最新交易日；compute=True 且该日尚未计算时先用 compute_main_contracts 计算
+        返回 DataFrame: trade_date, exchange, fut_code, ts_code, open, high, low, close, pre_close,
+        change_rate, vol, amount, oi（行情缺失时为空值）
+        """
+        return self.metadata_cache.get(
+            ('main_contracts', trade_date),
+            lambda: self._query_main_contracts_for_date(trade_date, compute)
+        )
+    
+    def _query_main_contracts_for_date(self, trade_date, compute):
+        if not self.ensure_connected():
+            raise DatabaseError("无法建立数据库连接")
+            
+        with self.connection.cursor() as cursor:
+            if trade_date is None:
+                cursor.execute("SELECT MAX(trade_date) FROM futures_main_contract")
+                trade_date = cursor.fetchone()[0]
+                if trade_date is None:
+                    logging.warning("主力合约表为空")
+                    return pd.DataFrame(columns=self.MAIN_CONTRACT_QUOTE_FIELDS)
+            elif compute:
+                cursor.execute("SELECT COUNT(*) FROM futures_main_contract WHERE trade_date = %s", (trade_date,))
+                if cursor.fetchone()[0] == 0:
+                    self.compute_main_contracts(trade_date)
+                    
+        query = """
+        SELECT m.trade_date, m.exchange, m.fut_code, m.ts_code,
+               q.open, q.high, q.low, q.close, q.pre_close, q.change_rate,
+               q.vol, q.amount, q.oi
+        FROM futures_main_contract m
+        LEFT JOIN futures_daily_quotes q
+            ON q.ts_code = m.ts_code
+            AND q.trade_date = m.trade_date
+        WHERE m.trade_date = %s
+        ORDER BY m.exchange, m.fut_code
+        """
+        with self._statement_cursor(query) as cursor:
+            cursor.execute(query, (trade_date,))
+            return pd.DataFrame(cursor.fetchall(), columns=self.MAIN_CONTRACT_QUOTE_FIELDS)
     
     def get_contract_quotes(self, ts_code, days=1):
         """获取合约行情数据"""
@@ -651,12 +905,14 @@ class DatabaseManager:
                vol, amount, oi
         FROM futures_daily_quotes
         WHERE ts_code = %s
-        AND trade_date >= DATE_SUB(CURDATE(), INTERVAL %s DAY)
+        AND trade_date >= %s
         ORDER BY trade_date DESC
         """
+        # 起始日期作为常量参数传入，按月分区时只扫描涉及的分区
+        start_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
         try:
-            with self.connection.cursor() as cursor:
-                cursor.execute(query, (ts_code, days))
+            with self._statement_cursor(query) as cursor:
+                cursor.execute(query, (ts_code, start_date))
                 columns = [desc[0] for desc in cursor.description]
                 data = cursor.fetchall()
                 df = pd.DataFrame(data, columns=columns)
@@ -725,6 +981,7 @@ class DatabaseManager:
                 
             logging.info(f"保存主力合约信息成功: {exchange}.{fut_code} -> {ts_code} "
                         f"(vol={vol}, amount={amount}, oi={oi})")
+            self.metadata_cache.invalidate('main_contracts')
             return True
                 
         except Exception as e:
@@ -732,40 +989,52 @@ class DatabaseManager:
             logging.error(f"{error_msg}\n{traceback.format_exc()}")
             return False
 
-    def create_main_contract_table(self):
-        """创建主力合约表"""
-        try:
-            # 先删除旧表（如果存在）
-            drop_query = """
-            DROP TABLE IF EXISTS futures_main_contract
-            """
-            
-            # 创建新表
-            create_query = """
-            CREATE TABLE futures_main_contract (
-                trade_date DATE NOT NULL,
-                exchange VARCHAR(20) NOT NULL,
-                fut_code VARCHAR(20) NOT NULL,
-                ts_code VARCHAR(20) NOT NULL,
-                vol DECIMAL(20,4) DEFAULT 0,
-                amount DECIMAL(20,4) DEFAULT 0,
-                oi DECIMAL(20,4) DEFAULT 0,
-                update_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                PRIMARY KEY (trade_date, exchange, fut_code)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-            """
-            
-            with self.transaction() as cursor:
-                cursor.execute(drop_query)
-                cursor.execute(create_query)
-                logging.info("主力合约表重建成功")
-            return True
+    @error_handler(logger=logging)
+    def save_main_contracts(self, df, batch_size=None):
+        """
+        批量保存主力合约映射（trade_date, exchange, fut_code, ts_code）
+        成交量、成交额、持仓量由 fill_main_contract_stats 从行情表补齐
+        返回写入的行数
+        """
+        if df is None or df.empty:
+            return 0
             
-        except Exception as e:
-            error_msg = f"创建主力合约表失败: {str(e)}"
-            logging.error(f"{error_msg}\n{traceback.format_exc()}")
-            return False
-    
+        batch_size = batch_size or Config.DB_BATCH_SIZE
+        query = """
+        INSERT INTO futures_main_contract (trade_date, exchange, fut_code, ts_code)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE ts_code = VALUES(ts_code)
+        """
+        data = df.reindex(columns=['trade_date', 'exchange', 'fut_code', 'ts_code']).dropna()
+        rows = list(data.astype(str).itertuples(index=False, name=None))
+        
+        with self.transaction() as cursor:
+            for start in range(0, len(rows), batch_size):
+                cursor.executemany(query, rows[start:start + batch_size])
+                
+        self.metadata_cache.invalidate('main_contracts')
+        logging.info(f"保存主力合约映射 {len(rows)} 条")
+        return len(rows)
+
+    @error_handler(logger=logging)
+    def fill_main_contract_stats(self, start_date, end_date):
+        """用一条 UPDATE JOIN 从行情表补齐区间内主力合约的成交量、成交额和持仓量"""
+        query = """
+        UPDATE futures_main_contract m
+        JOIN futures_daily_quotes q
+            ON q.ts_code = m.ts_code
+            AND q.trade_date = m.trade_date
+        SET m.vol = COALESCE(q.vol, 0),
+            m.amount = COALESCE(q.amount, 0),
+            m.oi = COALESCE(q.oi, 0)
+        WHERE m.trade_date BETWEEN %s AND %s
+        """
+        with self.transaction() as cursor:
+            cursor.execute(query, (start_date, end_date))
+            updated = cursor.rowcount
+        self.metadata_cache.invalidate('main_contracts')
+        return updated
+
     def get_main_contract(self, exchange, fut_code, trade_date=None):
         """获取指定日期的主力合约"""
         try:
@@ -795,8 +1064,8 @@ class DatabaseManager:
             if not self.ensure_connected():
                 return None
                 
-            # 获取当前日期
-            today = datetime.now().strftime('%Y-%m-%d')
+            # 获取当前日期（与 delist_date 同为 YYYYMMDD 字符串）
+            today = datetime.now().strftime('%Y%m%d')
             
             query = """
             SELECT DISTINCT
@@ -837,66 +1106,261 @@ class DatabaseManager:
             logging.error(error_msg)
             return None
     
+    QUOTE_FIELDS = ['ts_code', 'trade_date', 'open', 'high', 'low', 'close',
+                    'pre_close', 'change_rate', 'vol', 'amount', 'oi']
+
     @error_handler(logger=logging)
-    def save_quotes(self, df):
-        """保存货行情数据"""
+    def save_quotes(self, df, batch_size=None):
+        """
+        保存期货行情数据
+        按 batch_size 分批执行多行 INSERT ... ON DUPLICATE KEY UPDATE，每批一个事务，
+        同一事务内推进合约水位线。返回 {'rows', 'inserted', 'updated'}
+        """
         if df is None or df.empty:
             return False
             
-        with self.transaction() as cursor:
-            # 使用QueryBuilder构建SQL
-            fields = ['ts_code', 'trade_date', 'open', 'high', 'low', 'close', 
-                     'pre_close', 'change_rate', 'vol', 'amount', 'oi']
-            insert_query = QueryBuilder.build_insert('futures_daily_quotes', fields)
-            
-            for _, row in df.iterrows():
-                # 检查数据是否存在
-                check_query = QueryBuilder.build_select(
-                    'futures_daily_quotes',
-                    'COUNT(*)',
-                    'ts_code = %s AND trade_date = %s'
-                )
-                cursor.execute(check_query, (row['ts_code'], row['trade_date']))
-                if cursor.fetchone()[0] > 0:
-                    continue
-                
-                # 准备数据并插入
-                data = self._prepare_quote_data(row)
-                cursor.execute(insert_query, [data[field] for field in fields])
+        batch_size = batch_size or Config.DB_BATCH_SIZE
+        
+        # 同一合约同一交易日只保留最后一条
+        df = df.drop_duplicates(subset=['ts_code', 'trade_date'], keep='last')
+        rows = converters.to_params(converters.quote_frame(df), self.QUOTE_FIELDS)
+        
+        result = {'rows': len(rows), 'inserted': 0, 'updated': 0}
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            upsert_query = QueryBuilder.build_upsert(
+                'futures_daily_quotes',
+                self.QUOTE_FIELDS,
+                ['ts_code', 'trade_date'],
+                rows=len(batch)
+            )
+            
+            with self.transaction() as cursor:
+                with self._statement_cursor(upsert_query, cursor) as statement:
+                    statement.execute(upsert_query, [value for row in batch for value in row])
+                    affected = statement.rowcount
+                self._update_watermarks(cursor, df.iloc[start:start + batch_size])
                 
-        return True
+            # 影响行数：新增计 1，更新计 2（值未变化的重复行计 0，此时更新数偏小）
+            updated = min(max(affected - len(batch), 0), len(batch))
+            result['updated'] += updated
+            result['inserted'] += len(batch) - updated
+            
+        logging.info(
+            f"保存行情 {result['rows']} 条: 新增 {result['inserted']} 条, 更新 {result['updated']} 条"
+        )
+        return result
 
-    def _prepare_quote_data(self, row):
-        """准备行情数据"""
-        return {
-            'ts_code': str(row['ts_code'])[:20],
-            'trade_date': row['trade_date'],
-            'open': float(row['open']) if pd.notnull(row['open']) else None,
-            'high': float(row['high']) if pd.notnull(row['high']) else None,
-            'low': float(row['low']) if pd.notnull(row['low']) else None,
-            'close': float(row['close']) if pd.notnull(row['close']) else None,
-            'pre_close': float(row['pre_close']) if pd.notnull(row['pre_close']) else None,
-            'change_rate': self._calculate_change_rate(row),
-            'vol': float(row['vol']) if pd.notnull(row['vol']) else None,
-            'amount': float(row['amount']) if pd.notnull(row['amount']) else None,
-            'oi': float(row['oi']) if pd.notnull(row['oi']) else None
-        }
+    @error_handler(logger=logging)
+    def bulk_load_quotes(self, df):
+        """
+        大批量写入行情数据（历史回补）
+        经 LOAD DATA LOCAL INFILE 载入临时表后一条语句合并到行情表，服务器不允许时退回 save_quotes
+        返回 {'rows', 'inserted', 'updated'}
+        """
+        if df is None or df.empty:
+            return False
+            
+        df = df.drop_duplicates(subset=['ts_code', 'trade_date'], keep='last')
+        data = converters.quote_frame(df)[self.QUOTE_FIELDS]
+        
+        result = self._bulk_upsert(
+            'futures_daily_quotes',
+            data,
+            ['ts_code', 'trade_date'],
+            after_merge=lambda cursor: self._update_watermarks(cursor, df)
+        )
+        if result is None:
+            return self.save_quotes(df)
+        return result
+
+    def _bulk_upsert(self, table, data, key_fields, after_merge=None):
+        """
+        LOAD DATA LOCAL INFILE 载入临时表，再用一条 INSERT ... SELECT ... ON DUPLICATE KEY UPDATE
+        合并到目标表。after_merge(cursor) 在合并的同一事务内执行。
+        返回 {'rows', 'inserted', 'updated'}；不允许 LOCAL INFILE 时返回 None，由调用方退回批量 INSERT
+        """
+        if not Config.DB_LOCAL_INFILE or DatabaseManager._local_infile_disabled:
+            return None
+        if not self.ensure_connected():
+            raise DatabaseError("无法建立数据库连接")
+            
+        fields = list(data.columns)
+        columns = ', '.join(fields)
+        staging = f"tmp_stage_{table}"
+        path = self._write_tsv(data)
+        start = time.time()
+        
+        try:
+            # 临时表只对当前连接可见，创建和删除不会隐式提交事务
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {staging}")
+                cursor.execute(f"CREATE TEMPORARY TABLE {staging} AS SELECT {columns} FROM {table} LIMIT 0")
+                try:
+                    cursor.execute(
+                        f"LOAD DATA LOCAL INFILE %s INTO TABLE {staging} CHARACTER SET utf8mb4 "
+                        f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+                        f"LINES TERMINATED BY '\\n' ({columns})",
+                        (path,)
+                    )
+                except mysql.connector.Error as e:
+                    if e.errno in self.LOCAL_INFILE_ERRORS:
+                        DatabaseManager._local_infile_disabled = True
+                        logging.warning(f"服务器不允许 LOAD DATA LOCAL INFILE，改用批量 INSERT: {str(e)}")
+                        return None
+                    raise
+                loaded = cursor.rowcount
+                
+            join = ' AND '.join(f"s.{field} = t.{field}" for field in key_fields)
+            with self.transaction() as cursor:
+                cursor.execute(f"SELECT COUNT(*) FROM {staging} s JOIN {table} t ON {join}")
+                existing = cursor.fetchone()[0]
+                cursor.execute(QueryBuilder.build_upsert_select(table, staging, fields, key_fields))
+                if after_merge:
+                    after_merge(cursor)
+                    
+            logging.info(
+                f"批量载入 {table} {loaded} 行, 耗时 {time.time() - start:.2f} 秒 "
+                f"(新增 {loaded - existing}, 更新 {existing})"
+            )
+            return {'rows': loaded, 'inserted': loaded - existing, 'updated': existing}
+            
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            try:
+                with self.connection.cursor() as cursor:
+                    cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {staging}")
+            except Exception:
+                pass
 
     @staticmethod
-    def _calculate_change_rate(row):
-        """计算涨跌幅"""
-        if pd.notnull(row['close']) and pd.notnull(row['pre_close']) and row['pre_close'] != 0:
-            return ((row['close'] - row['pre_close']) / row['pre_close'] * 100)
-        return None
-    
+    def _write_tsv(data):
+        """把 DataFrame 写成 LOAD DATA 可读取的TSV临时文件（缺失值写为 \\N），返回文件路径"""
+        data = data.copy()
+        # 只有字符串列需要转义，数值列由 to_csv 直接格式化
+        for field in data.columns:
+            values = data[field]
+            if not pd.api.types.is_numeric_dtype(values):
+                data[field] = (
+                    values.astype(str)
+                    .str.replace('\\', '\\\\', regex=False)
+                    .str.replace('\t', '\\t', regex=False)
+                    .str.replace('\n', '\\n', regex=False)
+                    .where(values.notna(), '\\N')
+                )
+                
+        fd, path = tempfile.mkstemp(prefix='bulk_', suffix='.tsv')
+        os.close(fd)
+        data.to_csv(
+            path,
+            sep='\t',
+            header=False,
+            index=False,
+            na_rep='\\N',
+            quoting=csv.QUOTE_NONE,
+            quotechar='\x07',  # 已自行转义，不使用引号
+            lineterminator='\n',
+            encoding='utf-8'
+        )
+        return path
+
+    def _main_contract_query(self):
+        """
+        按交易日集合计算主力合约的 INSERT ... SELECT：每个品种按 vol*0.4 + oi*0.6 排名取第一，
+        合约表中没有的合约（如已退市后被清理）从合约代码推导交易所和品种
+        """
+        suffix = "SUBSTRING_INDEX(q.ts_code, '.', -1)"
+        symbol = "SUBSTRING_INDEX(q.ts_code, '.', 1)"
+        exchange_case = ' '.join(
+            f"WHEN '{code}' THEN '{exchange}'" for code, exchange in self.SUFFIX_EXCHANGE.items()
+        )
+        exchange = f"COALESCE(b.exchange, CASE {suffix} {exchange_case} ELSE {suffix} END)"
+        fut_code = f"COALESCE(b.fut_code, UPPER(REGEXP_REPLACE({symbol}, '[0-9]+$', '')))"
+        return f"""
+        INSERT INTO futures_main_contract (trade_date, exchange, fut_code, ts_code, vol, amount, oi)
+        SELECT trade_date, exchange, fut_code, ts_code, vol, amount, oi
+        FROM (
+            SELECT
+                q.trade_date,
+                {exchange} AS exchange,
+                {fut_code} AS fut_code,
+                q.ts_code,
+                COALESCE(q.vol, 0) AS vol,
+                COALESCE(q.amount, 0) AS amount,
+                COALESCE(q.oi, 0) AS oi,
+                ROW_NUMBER() OVER (
+                    PARTITION BY {exchange}, {fut_code}
+                    ORDER BY COALESCE(q.vol, 0) * 0.4 + COALESCE(q.oi, 0) * 0.6 DESC, q.ts_code
+                ) AS score_rank
+            FROM futures_daily_quotes q
+            LEFT JOIN futures_basic b ON b.ts_code = q.ts_code
+            WHERE q.trade_date = %s
+            AND {symbol} REGEXP '[0-9]'
+            AND (q.vol > 0 OR q.oi > 0)
+        ) ranked
+        WHERE score_rank = 1
+        ON DUPLICATE KEY UPDATE
+            ts_code = VALUES(ts_code),
+            vol = VALUES(vol),
+            amount = VALUES(amount),
+            oi = VALUES(oi)
+        """
+
     @error_handler(logger=logging)
-    def update_main_contracts(self):
-        """更新主力合约信息"""
+    def compute_main_contracts(self, start_date, end_date=None):
+        """
+        用行情表集合计算区间内每个交易日的主力合约（每天一条 INSERT ... SELECT，排名和写入都在服务器完成）
+        返回 {'days': 计算的交易日数, 'rows': 当天主力合约数之和}
+        """
+        if not self.ensure_connected():
+            raise DatabaseError("无法建立数据库连接")
+        end_date = end_date or start_date
+        query = self._main_contract_query()
+        
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT DISTINCT trade_date FROM futures_daily_quotes WHERE trade_date BETWEEN %s AND %s ORDER BY trade_date",
+                (start_date, end_date)
+            )
+            days = [row[0] for row in cursor.fetchall()]
+            
+        result = {'days': len(days), 'rows': 0}
+        for day in days:
+            with self.transaction() as cursor:
+                cursor.execute(query, (day,))
+                cursor.execute("SELECT COUNT(*) FROM futures_main_contract WHERE trade_date = %s", (day,))
+                result['rows'] += cursor.fetchone()[0]
+                
+        self.metadata_cache.invalidate('main_contracts')
+        logging.info(f"计算主力合约 {start_date} 至 {end_date}: {result['days']} 个交易日, {result['rows']} 条")
+        return result
+
+    @error_handler(logger=logging)
+    def update_main_contracts(self, set_based=True):
+        """
+        更新最新交易日的主力合约，返回 (成功品种数, 失败品种数)
+        set_based=True 时由 compute_main_contracts 在服务器端一条语句完成，否则在 Python 中逐品种计算
+        """
+        if set_based:
+            if not self.ensure_connected():
+                raise DatabaseError("无法建立数据库连接")
+            with self.connection.cursor() as cursor:
+                cursor.execute("SELECT MAX(trade_date) FROM futures_daily_quotes")
+                latest_date = cursor.fetchone()[0]
+            if not latest_date:
+                logging.warning("未找到任何行情数据")
+                return 0, 0
+            result = self.compute_main_contracts(latest_date)
+            return result['rows'], 0
+            
         try:
             # 1. 获取最新交易日期的所有行情数据
             query = """
             SELECT 
-                q.ts_code COLLATE utf8mb4_unicode_ci,
+                q.ts_code,
                 b.exchange,
                 b.fut_code,
                 q.vol,
@@ -904,16 +1368,19 @@ class DatabaseManager:
                 q.amount,
                 q.trade_date
             FROM futures_daily_quotes q
-            JOIN futures_basic b ON q.ts_code COLLATE utf8mb4_unicode_ci = b.ts_code
-            WHERE q.trade_date = (
-                SELECT MAX(trade_date) 
-                FROM futures_daily_quotes
-            )
-            AND b.delist_date > DATE_FORMAT(NOW(), '%Y-%m-%d')
+            JOIN futures_basic b ON q.ts_code = b.ts_code
+            WHERE q.trade_date = %s
+            AND b.delist_date > %s
             """
             
             with self.connection.cursor() as cursor:
-                cursor.execute(query)
+                # 最新交易日单独查询后作为常量传入，按月分区时只扫描一个分区
+                cursor.execute("SELECT MAX(trade_date) FROM futures_daily_quotes")
+                latest_date = cursor.fetchone()[0]
+                if not latest_date:
+                    logging.warning("未找到任何行情数据")
+                    return 0, 0
+                cursor.execute(query, (latest_date, datetime.now().strftime('%Y%m%d')))
                 all_data = cursor.fetchall()
                 
                 if not all_data:
@@ -935,9 +1402,12 @@ class DatabaseManager:
                         'trade_date': trade_date
                     })
                 
-                # 3. 处理每个品种的数据
+                # 3. 处理每个品种的数据，主力合约经写后缓冲按组提交
+                from .buffered_writer import BufferedWriter, FlushError
                 success_count = 0
                 fail_count = 0
+                writer = BufferedWriter(self, threaded=False, name='主力合约缓冲写入')
+                writer.start()
                 
                 for (exchange, fut_code), contracts in grouped_data.items():
                     try:
@@ -963,31 +1433,41 @@ class DatabaseManager:
                                 main_data = contract
                         
                         if main_contract and main_data:
-                            # 保存主力合约信息
-                            if self.save_main_contract(
-                                trade_date=main_data['trade_date'],
-                                exchange=exchange,
-                                fut_code=fut_code,
-                                ts_code=main_contract,
-                                vol=main_data['vol'],
-                                amount=main_data['amount'],
-                                oi=main_data['oi']
-                            ):
-                                success_count += 1
-                                logging.info(f"更新{exchange} {fut_code}主力合约成功: {main_contract}")
-                            else:
-                                fail_count += 1
-                                logging.error(f"保存{exchange} {fut_code}主力合约失败")
+                            # 缓冲主力合约信息
+                            success_count += 1
+                            writer.write('futures_main_contract', [{
+                                'trade_date': main_data['trade_date'],
+                                'exchange': exchange,
+                                'fut_code': fut_code,
+                                'ts_code': main_contract,
+                                'vol': main_data['vol'],
+                                'amount': main_data['amount'],
+                                'oi': main_data['oi']
+                            }], tag=(exchange, fut_code))
+                            logging.info(f"更新{exchange} {fut_code}主力合约: {main_contract}")
                         else:
                             fail_count += 1
                             logging.warning(f"未找到{exchange} {fut_code}的主力合约")
                             
+                    except FlushError as e:
+                        success_count -= len(e.tags)
+                        fail_count += len(e.tags)
+                        logging.error(f"保存主力合约失败: {e.message}")
                     except Exception as e:
                         fail_count += 1
                         error_msg = f"更新{exchange} {fut_code}主力合约失败: {str(e)}"
                         logging.error(error_msg)
                         continue
                 
+                # 4. 写入剩余的缓冲
+                try:
+                    writer.close()
+                except FlushError as e:
+                    success_count -= len(e.tags)
+                    fail_count += len(e.tags)
+                    logging.error(f"保存主力合约失败: {e.message}")
+                self.metadata_cache.invalidate('main_contracts')
+                
                 summary = (
                     f"\n{'='*50}\n"
                     f"主力合约更新完成\n"
@@ -1001,4 +1481,286 @@ class DatabaseManager:
         except Exception as e:
             error_msg = f"更新主力合约失败: {str(e)}"
             logging.error(f"{error_msg}\n{traceback.format_exc()}")
-            raise
\ No newline at end of file
+            raise
+
+    @error_handler(logger=logging)
+    def update_continuous_quotes(self, start_date=None):
+        """
+        增量更新主力连续行情（futures_continuous_quotes）
+        每个品种从已保存的最后一行之后，按主力合约表拼接当天主力合约的行情并累计换月调整值；
+        只读取最近 CONTINUOUS_LOOKBACK_DAYS 天的主力合约（表为空时全量生成）。
+        start_date 不为空时先删除该日及以后的数据再重新生成（主力合约映射回补后使用）。
+        返回写入的行数
+        """
+        if not self.ensure_connected():
+            raise DatabaseError("无法建立数据库连接")
+        batch_size = Config.DB_BATCH_SIZE
+        table = continuous_series.CONTINUOUS_TABLE
+        anchor_fields = ['exchange', 'fut_code', 'trade_date', 'ts_code', 'close', 'adj_factor', 'adj_offset']
+        row_fields = ['exchange', 'fut_code', 'trade_date', 'ts_code', 'open', 'high', 'low', 'close',
+                      'pre_close', 'vol', 'amount', 'oi']
+
+        with self.transaction() as cursor:
+            if start_date is not None:
+                cursor.execute(f"DELETE FROM {table} WHERE trade_date >= %s", (start_date,))
+
+            # 各品种已保存的最后一行（按主键分组取最大日期）
+            cursor.execute(f"""
+            SELECT c.exchange, c.fut_code, c.trade_date, c.ts_code, c.close, c.adj_factor, c.adj_offset
+            FROM {table} c
+            JOIN (
+                SELECT exchange, fut_code, MAX(trade_date) AS trade_date
+                FROM {table}
+                GROUP BY exchange, fut_code
+            ) last ON last.exchange = c.exchange AND last.fut_code = c.fut_code AND last.trade_date = c.trade_date
+            """)
+            anchors = pd.DataFrame(cursor.fetchall(), columns=anchor_fields)
+
+            query = """
+            SELECT m.exchange, m.fut_code, m.trade_date, m.ts_code,
+                   q.open, q.high, q.low, q.close, q.pre_close, q.vol, q.amount, q.oi
+            FROM futures_main_contract m
+            JOIN futures_daily_quotes q ON q.ts_code = m.ts_code AND q.trade_date = m.trade_date
+            """
+            if anchors.empty:
+                cursor.execute(query)
+            else:
+                since = anchors['trade_date'].max() - timedelta(days=Config.CONTINUOUS_LOOKBACK_DAYS)
+                cursor.execute(query + " WHERE m.trade_date > %s", (since,))
+            rows = pd.DataFrame(cursor.fetchall(), columns=row_fields)
+
+            def load_closes(pairs):
+                closes = {}
+                for start in range(0, len(pairs), batch_size):
+                    batch = pairs[start:start + batch_size]
+                    cursor.execute(
+                        "SELECT ts_code, trade_date, close FROM futures_daily_quotes "
+                        f"WHERE (ts_code, trade_date) IN ({', '.join(['(%s, %s)'] * len(batch))})",
+                        [value for ts_code, trade_date in batch for value in (ts_code, trade_date.date())]
+                    )
+                    for ts_code, trade_date, close in cursor.fetchall():
+                        closes[(ts_code, pd.Timestamp(trade_date))] = float(close) if close is not None else None
+                return closes
+
+            data = continuous_series.stitch(rows, anchors, load_closes)
+            params = converters.to_params(data, continuous_series.CONTINUOUS_FIELDS)
+            for start in range(0, len(params), batch_size):
+                batch = params[start:start + batch_size]
+                cursor.execute(
+                    QueryBuilder.build_upsert(
+                        table, continuous_series.CONTINUOUS_FIELDS,
+                        continuous_series.CONTINUOUS_KEY_FIELDS, rows=len(batch)
+                    ),
+                    [value for row in batch for value in row]
+                )
+
+        rolls = int(data['is_roll'].sum()) if not data.empty else 0
+        logging.info(f"主力连续行情更新 {len(params)} 行, 换月 {rolls} 次")
+        return len(params)
+
+    @error_handler(logger=logging)
+    def get_continuous_series(self, exchange, fut_code, start_date=None, end_date=None, adjust=None):
+        """
+        获取品种的主力连续日线（一次按主键的范围扫描）
+        adjust: None/'none' 原始价格，'ratio' 按比例后复权，'diff' 按差值后复权（以品种最新一天的价格为基准）
+        返回 DataFrame: trade_date, ts_code, open, high, low, close, vol, amount, oi, is_roll, adj_factor, adj_offset
+        """
+        if adjust not in continuous_series.ADJUST_MODES:
+            raise ValueError(f"不支持的复权方式: {adjust}（可选 none、ratio、diff）")
+        if not self.ensure_connected():
+            raise DatabaseError("无法建立数据库连接")
+        fields = [field for field in continuous_series.CONTINUOUS_FIELDS if field not in ('exchange', 'fut_code')]
+        query = f"""
+        SELECT {', '.join(fields)}
+        FROM {continuous_series.CONTINUOUS_TABLE}
+        WHERE exchange = %s AND fut_code = %s
+        AND trade_date BETWEEN %s AND %s
+        ORDER BY trade_date
+        """
+        with self._statement_cursor(query) as cursor:
+            cursor.execute(query, (exchange, fut_code, start_date or '1900-01-01', end_date or '9999-12-31'))
+            df = pd.DataFrame(cursor.fetchall(), columns=fields)
+        if df.empty:
+            return df
+        for field in fields[2:]:
+            df[field] = pd.to_numeric(df[field], errors='coerce')
+
+        latest_factor = latest_offset = None
+        if adjust in ('ratio', 'diff'):
+            latest_query = f"""
+            SELECT adj_factor, adj_offset
+            FROM {continuous_series.CONTINUOUS_TABLE}
+            WHERE exchange = %s AND fut_code = %s
+            ORDER BY trade_date DESC
+            LIMIT 1
+            """
+            with self._statement_cursor(latest_query) as cursor:
+                cursor.execute(latest_query, (exchange, fut_code))
+                latest_factor, latest_offset = [float(value) for value in cursor.fetchall()[0]]
+        df = continuous_series.adjust_prices(df, latest_factor, latest_offset, adjust)
+        df['trade_date'] = pd.to_datetime(df['trade_date']).dt.strftime('%Y-%m-%d')
+        return df
+
+    def get_holding_watermarks(self):
+        """获取各交易所持仓排名的同步水位线 {exchange: 最后交易日}"""
+        try:
+            if not self.ensure_connected():
+                raise DatabaseError("无法建立数据库连接")
+            with self.connection.cursor() as cursor:
+                cursor.execute("SELECT exchange, last_trade_date FROM futures_holding_watermark")
+                return {row[0]: row[1] for row in cursor.fetchall()}
+        except Exception as e:
+            error_msg = f"获取持仓排名水位线失败: {str(e)}"
+            print(error_msg)
+            logging.error(error_msg)
+            return None
+
+    def set_holding_watermark(self, exchange, last_trade_date):
+        """推进交易所持仓排名的同步水位线（只前进不后退）"""
+        query = """
+        INSERT INTO futures_holding_watermark (exchange, last_trade_date)
+        VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE
+            last_trade_date = GREATEST(last_trade_date, VALUES(last_trade_date))
+        """
+        with self.transaction() as cursor:
+            cursor.execute(query, (exchange, last_trade_date))
+        return True
+
+    @error_handler(logger=logging)
+    def save_holding_rank(self, df, batch_size=None):
+        """
+        批量写入持仓排名数据
+        按 batch_size 分批执行多行 INSERT ... ON DUPLICATE KEY UPDATE，整批数据在一个事务内提交
+        返回写入的行数
+        """
+        if df is None or df.empty:
+            return 0
+            
+        if not self.ensure_connected():
+            raise DatabaseError("无法建立数据库连接")
+        batch_size = batch_size or Config.DB_BATCH_SIZE
+        
+        fields = self.HOLDING_FIELDS
+        update_fields = [field for field in fields if field not in ('ts_code', 'trade_date', 'broker')]
+        query = (
+            QueryBuilder.build_insert('futures_holding_rank', fields)
+            + " ON DUPLICATE KEY UPDATE "
+            + ', '.join(f"{field} = VALUES({field})" for field in update_fields)
+        )
+        
+        rows = converters.to_params(self._holding_data(df))
+        
+        with self.transaction() as cursor:
+            for start in range(0, len(rows), batch_size):
+                cursor.executemany(query, rows[start:start + batch_size])
+                
+        return len(rows)
+
+    @error_handler(logger=logging)
+    def bulk_load_holding_rank(self, df):
+        """大批量写入持仓排名（LOAD DATA LOCAL INFILE，服务器不允许时退回 save_holding_rank），返回写入的行数"""
+        if df is None or df.empty:
+            return 0
+            
+        if not self.ensure_connected():
+            raise DatabaseError("无法建立数据库连接")
+        result = self._bulk_upsert(
+            'futures_holding_rank',
+            self._holding_data(df),
+            ['ts_code', 'trade_date', 'broker']
+        )
+        if result is None:
+            return self.save_holding_rank(df)
+        return result['rows']
+
+    def _holding_data(self, df):
+        """整列转换持仓排名数据：数值列转浮点，截断超长的期货公司名称"""
+        data = df.reindex(columns=self.HOLDING_FIELDS)
+        data = data.dropna(subset=['ts_code', 'trade_date', 'broker'])
+        data['ts_code'] = converters.to_string(data['ts_code'], 20)
+        data['broker'] = converters.to_string(data['broker'], 100)
+        for field in ['vol', 'vol_chg', 'long_hld', 'long_chg', 'short_hld', 'short_chg']:
+            data[field] = converters.to_numeric(data[field])
+        return data
+
+    def get_backfill_checkpoints(self, job_id):
+        """获取回补任务已完成的分块 {chunk_key: 写入行数}"""
+        try:
+            if not self.ensure_connected():
+                raise DatabaseError("无法建立数据库连接")
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT chunk_key, rows_written FROM futures_backfill_checkpoint WHERE job_id = %s",
+                    (job_id,)
+                )
+                return {row[0]: row[1] for row in cursor.fetchall()}
+        except Exception as e:
+            error_msg = f"获取回补断点失败: {str(e)}"
+            print(error_msg)
+            logging.error(error_msg)
+            return None
+
+    def save_backfill_checkpoint(self, job_id, chunk_key, rows_written=0):
+        """记录回补任务的一个分块已完成"""
+        if not self.ensure_connected():
+            raise DatabaseError("无法建立数据库连接")
+        query = """
+        INSERT INTO futures_backfill_checkpoint (job_id, chunk_key, rows_written)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE rows_written = VALUES(rows_written)
+        """
+        with self.transaction() as cursor:
+            cursor.execute(query, (job_id, chunk_key, int(rows_written)))
+        return True
+
+    def clear_backfill_checkpoints(self, job_id):
+        """清除回补任务的断点（下次从头执行）"""
+        if not self.ensure_connected():
+            raise DatabaseError("无法建立数据库连接")
+        with self.transaction() as cursor:
+            cursor.execute("DELETE FROM futures_backfill_checkpoint WHERE job_id = %s", (job_id,))
+        return True
+
+    def get_trade_calendar(self, exchange):
+        """获取交易所的交易日历 [(日期, 是否交易日)]，按日期升序"""
+        try:
+            if not self.ensure_connected():
+                raise DatabaseError("无法建立数据库连接")
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT cal_date, is_open FROM futures_trade_cal WHERE exchange = %s ORDER BY cal_date",
+                    (exchange,)
+                )
+                return [(row[0], bool(row[1])) for row in cursor.fetchall()]
+        except Exception as e:
+            error_msg = f"获取交易日历失败: {str(e)}"
+            print(error_msg)
+            logging.error(error_msg)
+            return None
+
+    def save_trade_calendar(self, df):
+        """保存交易日历（已存在的日期覆盖更新）"""
+        if df is None or df.empty:
+            return 0
+            
+        if not self.ensure_connected():
+            raise DatabaseError("无法建立数据库连接")
+        query = """
+        INSERT INTO futures_trade_cal (exchange, cal_date, is_open, pretrade_date)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            is_open = VALUES(is_open),
+            pretrade_date = VALUES(pretrade_date)
+        """
+        data = df.reindex(columns=['exchange', 'cal_date', 'is_open', 'pretrade_date'])
+        data = data.dropna(subset=['exchange', 'cal_date', 'is_open'])
+        data['is_open'] = data['is_open'].astype(int)
+        rows = list(data.astype(object).where(data.notna(), None).itertuples(index=False, name=None))
+        
+        with self.transaction() as cursor:
+            cursor.executemany(query, rows)
+        return len(rows)
+
+# 合约信息变化时使元数据缓存中相关的交易所、品种和合约列表失效
+DatabaseManager.add_contract_listener(DatabaseManager.metadata_cache.invalidate_products)
@@ -0,0 +1,92 @@
+"""
+数据库元数据查询的进程内缓存
+交易所、品种、合约列表、当前主力合约等变化很少的查询结果按 TTL 缓存在内存中，
+界面切换和服务循环不再每次访问数据库。合约信息变化（合约监听）和主力合约更新时主动失效。
+"""
+import logging
+import time
+from threading import Lock
+import pandas as pd
+from config.config import Config
+
+class MetadataCache:
+    """
+    带 TTL 的键值缓存，键为元组，第一个元素为类别（如 ('future_codes', 'SHFE')）
+    返回 DataFrame/列表的副本，调用方修改结果不影响缓存
+    """
+    def __init__(self, ttl=None):
+        self.ttl = ttl if ttl is not None else Config.METADATA_CACHE_TTL
+        self.entries = {}  # 键 -> (过期时间, 值)
+        self.lock = Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    @staticmethod
+    def _copy(value):
+        if isinstance(value, pd.DataFrame):
+            return value.copy()
+        if isinstance(value, (list, dict)):
+            return value.copy()
+        return value
+
+    @staticmethod
+    def _is_empty(value):
+        if value is None:
+            return True
+        if isinstance(value, pd.DataFrame):
+            return value.empty
+        if isinstance(value, (list, dict)):
+            return not value
+        return False
+
+    def get(self, key, loader, ttl=None):
+        """
+        命中且未过期时返回缓存，否则调用 loader() 加载
+        结果为 None 或空（如主力合约尚未计算的交易日）时不缓存，下次重新查询
+        """
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.stats['hits'] += 1
+                return self._copy(entry[1])
+            self.stats['misses'] += 1
+
+        value = loader()
+        if not self._is_empty(value) and self.ttl > 0:
+            with self.lock:
+                self.entries[key] = (now + (ttl if ttl is not None else self.ttl), value)
+        return self._copy(value)
+
+    def invalidate(self, *categories):
+        """使指定类别的缓存失效，不指定类别时全部失效"""
+        with self.lock:
+            if not categories:
+                removed = len(self.entries)
+                self.entries.clear()
+            else:
+                keys = [key for key in self.entries if key[0] in categories]
+                for key in keys:
+                    del self.entries[key]
+                removed = len(keys)
+            self.stats['invalidations'] += removed
+        if removed:
+            logging.debug(f"元数据缓存失效 {categories or '全部'}: {removed} 项")
+
+    def invalidate_products(self, products):
+        """合约监听：品种的合约信息变化时，使相关的交易所、品种和合约列表失效"""
+        products = set(products)
+        exchanges = {exchange for exchange, _ in products}
+        with self.lock:
+            keys = [
+                key for key in self.entries
+                if key[0] == 'exchanges'
+                or (key[0] == 'future_codes' and key[1] in exchanges)
+                or (key[0] == 'contracts' and (key[1], key[2]) in products)
+            ]
+            for key in keys:
+                del self.entries[key]
+            self.stats['invalidations'] += len(keys)
+
+    def get_status(self):
+        with self.lock:
+            return dict(self.stats, entries=len(self.entries))
@@ -0,0 +1,346 @@
+"""
+数据库结构版本管理
+MIGRATIONS 中的每个版本按顺序只执行一次，已执行的版本记录在 schema_version 表。
+步骤可以是 SQL 字符串，也可以是 step(cursor) 函数（用于按现有结构判断是否需要执行，
+兼容由旧版本程序建好的表）。进程内首次连接数据库时执行，查询方法中不再执行任何 DDL。
+用法（在项目根目录执行，执行未应用的版本并列出已应用的版本）:
+    python -m database.migrations
+"""
+import logging
+from threading import Lock
+from utils.exceptions import DatabaseError
+from .partition_maintenance import PARTITIONED_TABLES, partition_by_month
+
+LOCK_NAME = 'futures_schema_migration'
+LOCK_TIMEOUT = 60
+
+_schema_ready = False
+_schema_lock = Lock()
+
+# ---------------------------------------------------------------- 结构查询
+
+def table_exists(cursor, table):
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+        (table,)
+    )
+    return cursor.fetchone()[0] > 0
+
+def column_exists(cursor, table, column):
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.columns "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s",
+        (table, column)
+    )
+    return cursor.fetchone()[0] > 0
+
+def index_exists(cursor, table, index):
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s",
+        (table, index)
+    )
+    return cursor.fetchone()[0] > 0
+
+def table_collation(cursor, table):
+    cursor.execute(
+        "SELECT table_collation FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+        (table,)
+    )
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+# ---------------------------------------------------------------- 可复用步骤
+
+def add_column(table, column, definition):
+    """列不存在时添加"""
+    def step(cursor):
+        if not column_exists(cursor, table, column):
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    step.__doc__ = f"{table} 添加列 {column}"
+    return step
+
+def add_index(table, index, columns, unique=False):
+    """索引不存在时添加"""
+    def step(cursor):
+        if not index_exists(cursor, table, index):
+            kind = 'UNIQUE KEY' if unique else 'KEY'
+            cursor.execute(f"ALTER TABLE {table} ADD {kind} {index} ({columns})")
+    step.__doc__ = f"{table} 添加索引 {index}"
+    return step
+
+def convert_collation(table, collation='utf8mb4_unicode_ci'):
+    """表排序规则不一致时整表转换（与其他表关联时不再需要 COLLATE，可以使用索引）"""
+    def step(cursor):
+        current = table_collation(cursor, table)
+        if current is not None and current != collation:
+            cursor.execute(f"ALTER TABLE {table} CONVERT TO CHARACTER SET utf8mb4 COLLATE {collation}")
+    step.__doc__ = f"{table} 转换排序规则为 {collation}"
+    return step
+
+def _quotes_primary_key(cursor):
+    """旧版行情表使用自增 id 主键加唯一索引，改为 (ts_code, trade_date) 主键（分区表的唯一索引必须包含分区列）"""
+    if not column_exists(cursor, 'futures_daily_quotes', 'id'):
+        return
+    changes = ["DROP COLUMN id"]
+    if index_exists(cursor, 'futures_daily_quotes', 'idx_ts_trade'):
+        changes.append("DROP INDEX idx_ts_trade")
+    changes += [
+        "MODIFY ts_code VARCHAR(20) NOT NULL",
+        "MODIFY trade_date DATE NOT NULL",
+        "ADD PRIMARY KEY (ts_code, trade_date)",
+    ]
+    cursor.execute(f"ALTER TABLE futures_daily_quotes {', '.join(changes)}")
+
+def _create_sync_watermark(cursor):
+    """创建合约同步水位线表，首次创建时从行情表初始化"""
+    if table_exists(cursor, 'futures_sync_watermark'):
+        return
+    cursor.execute("""
+    CREATE TABLE futures_sync_watermark (
+        ts_code VARCHAR(20) NOT NULL,
+        last_trade_date DATE NOT NULL,
+        update_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (ts_code)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    """)
+    cursor.execute("""
+    INSERT INTO futures_sync_watermark (ts_code, last_trade_date)
+    SELECT ts_code, MAX(trade_date)
+    FROM futures_daily_quotes
+    GROUP BY ts_code
+    """)
+    logging.info(f"水位线表创建完成，从行情表初始化 {cursor.rowcount} 个合约")
+
+# ---------------------------------------------------------------- 版本列表
+
+MIGRATIONS = [
+    (1, '基础表', [
+        """
+        CREATE TABLE IF NOT EXISTS futures_basic (
+            ts_code VARCHAR(20) NOT NULL,
+            symbol VARCHAR(20) NOT NULL,
+            exchange VARCHAR(10) NOT NULL,
+            name VARCHAR(50) DEFAULT NULL,
+            fut_code VARCHAR(20) DEFAULT NULL,
+            multiplier DECIMAL(20,4) DEFAULT NULL,
+            trade_unit VARCHAR(20) DEFAULT NULL,
+            per_unit DECIMAL(20,4) DEFAULT NULL,
+            quote_unit VARCHAR(20) DEFAULT NULL,
+            quote_unit_desc VARCHAR(100) DEFAULT NULL,
+            d_mode_desc VARCHAR(100) DEFAULT NULL,
+            list_date VARCHAR(8) DEFAULT NULL,
+            delist_date VARCHAR(8) DEFAULT NULL,
+            d_month VARCHAR(8) DEFAULT NULL,
+            last_ddate VARCHAR(8) DEFAULT NULL,
+            trade_time_desc TEXT,
+            update_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (ts_code),
+            KEY idx_exchange (exchange),
+            KEY idx_fut_code (fut_code)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS futures_daily_quotes (
+            ts_code VARCHAR(20) NOT NULL,
+            trade_date DATE NOT NULL,
+            open DECIMAL(20,4),
+            high DECIMAL(20,4),
+            low DECIMAL(20,4),
+            close DECIMAL(20,4),
+            pre_close DECIMAL(20,4),
+            change_rate DECIMAL(20,4),
+            vol DECIMAL(20,4),
+            amount DECIMAL(20,4),
+            oi DECIMAL(20,4),
+            update_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (ts_code, trade_date),
+            KEY idx_trade_date (trade_date)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS futures_main_contract (
+            trade_date DATE NOT NULL,
+            exchange VARCHAR(20) NOT NULL,
+            fut_code VARCHAR(20) NOT NULL,
+            ts_code VARCHAR(20) NOT NULL,
+            vol DECIMAL(20,4) DEFAULT 0,
+            amount DECIMAL(20,4) DEFAULT 0,
+            oi DECIMAL(20,4) DEFAULT 0,
+            update_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (trade_date, exchange, fut_code)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS futures_holding_rank (
+            ts_code VARCHAR(20) NOT NULL,
+            trade_date DATE NOT NULL,
+            broker VARCHAR(100) NOT NULL,
+            exchange VARCHAR(10) DEFAULT NULL,
+            vol DECIMAL(20,4) DEFAULT NULL,
+            vol_chg DECIMAL(20,4) DEFAULT NULL,
+            long_hld DECIMAL(20,4) DEFAULT NULL,
+            long_chg DECIMAL(20,4) DEFAULT NULL,
+            short_hld DECIMAL(20,4) DEFAULT NULL,
+            short_chg DECIMAL(20,4) DEFAULT NULL,
+            update_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (ts_code, trade_date, broker),
+            KEY idx_trade_date (trade_date)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS futures_holding_watermark (
+            exchange VARCHAR(10) NOT NULL,
+            last_trade_date DATE NOT NULL,
+            update_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (exchange)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS futures_backfill_checkpoint (
+            job_id VARCHAR(64) NOT NULL,
+            chunk_key VARCHAR(100) NOT NULL,
+            rows_written INT NOT NULL DEFAULT 0,
+            finished_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (job_id, chunk_key)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS futures_trade_cal (
+            exchange VARCHAR(10) NOT NULL,
+            cal_date DATE NOT NULL,
+            is_open TINYINT NOT NULL,
+            pretrade_date DATE DEFAULT NULL,
+            PRIMARY KEY (exchange, cal_date)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        """,
+        _create_sync_watermark,
+    ]),
+    (2, '合约表内容哈希列', [
+        add_column('futures_basic', 'content_hash', 'CHAR(16) DEFAULT NULL AFTER trade_time_desc'),
+    ]),
+    (3, '行情表排序规则与交易日索引', [
+        convert_collation('futures_daily_quotes'),
+        add_index('futures_daily_quotes', 'idx_trade_date', 'trade_date'),
+    ]),
+    (4, '行情表主键改为 (ts_code, trade_date)', [
+        _quotes_primary_key,
+    ]),
+    (5, '行情、持仓排名、实时价格表按月分区', [
+        partition_by_month(table, column) for table, column in PARTITIONED_TABLES.items()
+    ]),
+    (6, '合约表退市日期索引', [
+        add_index('futures_basic', 'idx_delist_date', 'delist_date'),
+    ]),
+    (7, '主力连续行情表', [
+        """
+        CREATE TABLE IF NOT EXISTS futures_continuous_quotes (
+            exchange VARCHAR(20) NOT NULL,
+            fut_code VARCHAR(20) NOT NULL,
+            trade_date DATE NOT NULL,
+            ts_code VARCHAR(20) NOT NULL,
+            open DECIMAL(20,4),
+            high DECIMAL(20,4),
+            low DECIMAL(20,4),
+            close DECIMAL(20,4),
+            vol DECIMAL(20,4),
+            amount DECIMAL(20,4),
+            oi DECIMAL(20,4),
+            is_roll TINYINT NOT NULL DEFAULT 0,
+            adj_factor DOUBLE NOT NULL DEFAULT 1,
+            adj_offset DOUBLE NOT NULL DEFAULT 0,
+            update_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (exchange, fut_code, trade_date),
+            KEY idx_trade_date (trade_date)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        """,
+    ]),
+]
+
+# ---------------------------------------------------------------- 执行
+
+class SchemaMigrator:
+    """按版本顺序执行未应用的迁移（多进程同时启动时通过 GET_LOCK 串行化）"""
+    def __init__(self, connection, migrations=None):
+        self.connection = connection
+        self.migrations = sorted(migrations or MIGRATIONS, key=lambda item: item[0])
+
+    def current_version(self, cursor):
+        if not table_exists(cursor, 'schema_version'):
+            return 0
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+        return cursor.fetchone()[0]
+
+    def pending(self, cursor):
+        version = self.current_version(cursor)
+        return [migration for migration in self.migrations if migration[0] > version]
+
+    def migrate(self):
+        """执行未应用的迁移，返回执行后的版本号"""
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT GET_LOCK(%s, %s)", (LOCK_NAME, LOCK_TIMEOUT))
+            if cursor.fetchone()[0] != 1:
+                raise DatabaseError(f"等待数据库结构迁移锁超时（{LOCK_TIMEOUT} 秒）")
+            try:
+                cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INT NOT NULL,
+                    description VARCHAR(200) NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (version)
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+                """)
+                version = self.current_version(cursor)
+                for number, description, steps in self.pending(cursor):
+                    message = f"执行数据库结构迁移 {number}: {description}"
+                    print(message)
+                    logging.info(message)
+                    for step in steps:
+                        if callable(step):
+                            step(cursor)
+                        else:
+                            cursor.execute(step)
+                    cursor.execute(
+                        "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                        (number, description)
+                    )
+                    version = number
+                return version
+            finally:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+                cursor.fetchall()
+
+def ensure_schema(connection):
+    """进程内首次连接时执行未应用的迁移，失败时抛出 DatabaseError"""
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        try:
+            version = SchemaMigrator(connection).migrate()
+        except DatabaseError:
+            raise
+        except Exception as e:
+            error_msg = f"数据库结构迁移失败: {str(e)}"
+            logging.error(error_msg)
+            raise DatabaseError(error_msg)
+        logging.info(f"数据库结构版本: {version}")
+        _schema_ready = True
+
+def main():
+    """连接数据库（首次连接时执行未应用的迁移）并显示已应用的版本"""
+    from .db_manager import DatabaseManager
+
+    db = DatabaseManager()
+    if not db.connect():
+        raise SystemExit("数据库连接失败")
+    with db.connection.cursor() as cursor:
+        cursor.execute("SELECT version, description, applied_at FROM schema_version ORDER BY version")
+        for version, description, applied_at in cursor.fetchall():
+            print(f"{version:>4}  {applied_at}  {description}")
+    db.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""
+按月分区的维护
+分区方式为 RANGE COLUMNS(日期列)，每月一个分区 pYYYYMM（小于下月1日），最后一个分区 pmax 兜底。
+预建分区时从空的 pmax 拆分出未来月份；过期分区按配置直接删除，或先用 EXCHANGE PARTITION
+交换到独立的归档表 {表名}_YYYYMM 再删除空分区，耗时都与分区行数无关（不做逐行 DELETE）。
+"""
+from datetime import date, datetime
+import logging
+from config.config import Config
+from utils.exceptions import DatabaseError
+
+# 按月分区的表及其分区列
+PARTITIONED_TABLES = {
+    'futures_daily_quotes': 'trade_date',
+    'futures_holding_rank': 'trade_date',
+    'tbPriceData': 'PriceTime',
+}
+
+MAX_PARTITION = 'pmax'
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+def add_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month):
+    return f"p{month:%Y%m}"
+
+def partition_definition(month):
+    return f"PARTITION {partition_name(month)} VALUES LESS THAN ('{add_months(month, 1):%Y-%m-%d}')"
+
+def get_partitions(cursor, table):
+    """按顺序返回表的分区 [(分区名, 上界)]，上界为 pmax 时为 None；未分区的表返回空列表"""
+    cursor.execute(
+        "SELECT partition_name, partition_description FROM information_schema.partitions "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND partition_name IS NOT NULL "
+        "ORDER BY partition_ordinal_position",
+        (table,)
+    )
+    partitions = []
+    for name, description in cursor.fetchall():
+        description = str(description).strip("'")
+        bound = None if description.upper() == 'MAXVALUE' else datetime.strptime(description[:10], '%Y-%m-%d').date()
+        partitions.append((name, bound))
+    return partitions
+
+def _unique_keys_without(cursor, table, column):
+    """不包含分区列的主键/唯一索引（分区表要求所有唯一索引包含分区列）"""
+    cursor.execute(
+        "SELECT index_name, SUM(column_name = %s) FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND non_unique = 0 GROUP BY index_name",
+        (column, table)
+    )
+    return [name for name, has_column in cursor.fetchall() if not has_column]
+
+def partition_by_month(table, column, months_ahead=None):
+    """
+    迁移步骤：把表改为按月分区（表不存在、已分区或唯一索引不含分区列时跳过）
+    分区从表中最早的月份开始，预建到 months_ahead 个月之后
+    """
+    def step(cursor):
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+            (table,)
+        )
+        if cursor.fetchone()[0] == 0 or get_partitions(cursor, table):
+            return
+        missing = _unique_keys_without(cursor, table, column)
+        if missing:
+            logging.warning(f"{table} 的唯一索引 {', '.join(missing)} 不包含 {column}，无法按月分区")
+            return
+
+        cursor.execute(f"SELECT MIN({column}) FROM {table}")
+        earliest = cursor.fetchone()[0]
+        today = datetime.now().date()
+        first = month_start(earliest if earliest else today)
+        last = add_months(month_start(today), months_ahead if months_ahead is not None else Config.PARTITION['months_ahead'])
+
+        definitions = []
+        month = first
+        while month <= last:
+            definitions.append(partition_definition(month))
+            month = add_months(month, 1)
+        definitions.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN (MAXVALUE)")
+
+        cursor.execute(f"ALTER TABLE {table} PARTITION BY RANGE COLUMNS({column}) ({', '.join(definitions)})")
+        logging.info(f"{table} 已按月分区: {len(definitions) - 1} 个分区")
+    step.__doc__ = f"{table} 按 {column} 按月分区"
+    return step
+
+class PartitionMaintainer:
+    """预建未来月份的分区，按保留月数删除或归档过期分区（保留月数为 0 的表不清理）"""
+    def __init__(self, db=None, months_ahead=None, retention_months=None, archive=None):
+        if db is None:
+            from .db_manager import DatabaseManager
+            db = DatabaseManager()
+        self.db = db
+        self.months_ahead = months_ahead if months_ahead is not None else Config.PARTITION['months_ahead']
+        self.retention_months = retention_months or Config.PARTITION['retention_months']
+        self.archive = archive if archive is not None else Config.PARTITION['archive']
+
+    def ensure_future_partitions(self, cursor, table, partitions, today):
+        """从 pmax 拆分出截至 months_ahead 个月之后的分区，返回新建的分区名"""
+        bounds = [bound for _, bound in partitions if bound is not None]
+        month = month_start(bounds[-1]) if bounds else month_start(today)
+        last = add_months(month_start(today), self.months_ahead)
+
+        months = []
+        while month <= last:
+            months.append(month)
+            month = add_months(month, 1)
+        if not months:
+            return []
+
+        definitions = [partition_definition(month) for month in months]
+        definitions.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN (MAXVALUE)")
+        cursor.execute(f"ALTER TABLE {table} REORGANIZE PARTITION {MAX_PARTITION} INTO ({', '.join(definitions)})")
+        return [partition_name(month) for month in months]
+
+    def expire_partitions(self, cursor, table, partitions, today):
+        """删除（或归档后删除）上界不晚于保留期起点的分区，返回处理的分区名"""
+        retention = self.retention_months.get(table, 0)
+        if retention <= 0:
+            return []
+        cutoff = add_months(month_start(today), -retention)
+        expired = [name for name, bound in partitions if bound is not None and bound <= cutoff]
+        # 至少保留一个有界分区，REORGANIZE pmax 时以它的上界为起点
+        if len(expired) == len([bound for _, bound in partitions if bound is not None]):
+            expired = expired[:-1]
+        if not expired:
+            return []
+
+        if self.archive:
+            for name in expired:
+                self._archive_partition(cursor, table, name)
+        cursor.execute(f"ALTER TABLE {table} DROP PARTITION {', '.join(expired)}")
+        return expired
+
+    def _archive_partition(self, cursor, table, name):
+        """把分区交换到归档表 {表名}_YYYYMM（交换后原分区为空）"""
+        archive_table = f"{table}_{name[1:]}"
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+            (archive_table,)
+        )
+        if cursor.fetchone()[0]:
+            raise DatabaseError(f"归档表 {archive_table} 已存在，请先处理后再清理 {table}.{name}")
+        cursor.execute(f"CREATE TABLE {archive_table} LIKE {table}")
+        cursor.execute(f"ALTER TABLE {archive_table} REMOVE PARTITIONING")
+        cursor.execute(f"ALTER TABLE {table} EXCHANGE PARTITION {name} WITH TABLE {archive_table}")
+        logging.info(f"{table}.{name} 已归档到 {archive_table}")
+
+    def run(self, today=None):
+        """维护所有按月分区的表，返回 {表名: {'created': [...], 'expired': [...]}}"""
+        today = today or datetime.now().date()
+        if not self.db.ensure_connected():
+            raise DatabaseError("无法建立数据库连接")
+
+        report = {}
+        with self.db.connection.cursor() as cursor:
+            for table in PARTITIONED_TABLES:
+                partitions = get_partitions(cursor, table)
+                if not partitions:
+                    continue
+                if partitions[-1][0] != MAX_PARTITION:
+                    logging.warning(f"{table} 的最后一个分区不是 {MAX_PARTITION}，跳过分区维护")
+                    continue
+                try:
+                    expired = self.expire_partitions(cursor, table, partitions, today)
+                    created = self.ensure_future_partitions(cursor, table, get_partitions(cursor, table), today)
+                except Exception as e:
+                    error_msg = f"维护 {table} 分区失败: {str(e)}"
+                    logging.error(error_msg)
+                    raise DatabaseError(error_msg)
+
+                report[table] = {'created': created, 'expired': expired}
+                message = (
+                    f"{table} 分区维护完成: 新建 {len(created)} 个, "
+                    f"{'归档' if self.archive else '删除'} {len(expired)} 个"
+                )
+                print(message)
+                logging.info(message)
+        return report
@@ -0,0 +1,248 @@
+from datetime import timedelta
+import hashlib
+import logging
+import time
+import pandas as pd
+from config.config import Config
+from utils.exceptions import DatabaseError
+from database.db_manager import DatabaseManager
+from .fetch_engine import FetchEngine, FetchRequest
+from .ingest_pipeline import IngestPipeline
+from .trade_calendar import TradeCalendar
+from .tushare_service import TushareService
+
+class BackfillEngine:
+    """
+    可断点续传的历史行情回补引擎
+    把 日期区间 × 合约集合 拆成若干分块（按交易所每个交易日一次，或按合约每 chunk_days 天一次，
+    每个交易所选择调用次数更少的方式），通过并发获取引擎获取、入库流水线写入。
+    每个分块写入成功后记录到断点表，中断或取消后以相同参数再次执行时跳过已完成的分块。
+    """
+    def __init__(self, tushare=None, db=None, fetch_engine=None, chunk_days=None, calendar=None):
+        self.tushare = tushare or TushareService()
+        self.db = db or DatabaseManager()
+        self.fetch_engine = fetch_engine or FetchEngine(self.tushare)
+        self.chunk_days = chunk_days or Config.BACKFILL_CHUNK_DAYS
+        self.calendar = calendar or TradeCalendar.instance()
+
+    def load_contracts(self, start_date, end_date, exchanges=None, fut_codes=None):
+        """获取区间内上市交易过的合约（含已退市合约）"""
+        start_date = pd.Timestamp(start_date).date()
+        end_date = pd.Timestamp(end_date).date()
+        requests = [
+            FetchRequest(
+                'fut_basic',
+                {'exchange': exchange, 'fields': 'ts_code,exchange,fut_code,list_date,delist_date'},
+                tag=exchange
+            )
+            for exchange in (exchanges or TushareService.EXCHANGES)
+        ]
+
+        frames = []
+        for result in self.fetch_engine.run(requests):
+            if not result.ok:
+                raise result.error
+            if result.data is not None and not result.data.empty:
+                frames.append(result.data)
+        if not frames:
+            return pd.DataFrame(columns=['ts_code', 'exchange', 'fut_code', 'list_date', 'delist_date'])
+
+        df = pd.concat(frames, ignore_index=True)
+        df['list_date'] = pd.to_datetime(df['list_date'], errors='coerce').dt.date
+        df['delist_date'] = pd.to_datetime(df['delist_date'], errors='coerce').dt.date
+        # 连续合约、主力合约等没有上市/退市日期，不参与回补
+        df = df.dropna(subset=['ts_code', 'list_date', 'delist_date'])
+        df = df[(df['list_date'] <= end_date) & (df['delist_date'] >= start_date)]
+        if fut_codes:
+            df = df[df['fut_code'].isin(fut_codes)]
+        return df.sort_values('ts_code').reset_index(drop=True)
+
+    def make_job_id(self, start_date, end_date, contracts_df, strategy):
+        """由回补参数生成任务ID，相同参数再次执行时可从断点继续"""
+        raw = '|'.join([
+            pd.Timestamp(start_date).strftime('%Y%m%d'),
+            pd.Timestamp(end_date).strftime('%Y%m%d'),
+            strategy,
+            str(self.chunk_days),
+            ','.join(sorted(contracts_df['ts_code']))
+        ])
+        return f"bf-{hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]}"
+
+    def plan_chunks(self, contracts_df, start_date, end_date, strategy='auto'):
+        """
+        生成分块请求，tag 为 (分块标识, 需要保留的合约集合)
+        strategy: auto 自动选择 / date 按交易日 / contract 按合约
+        """
+        start_date = pd.Timestamp(start_date).date()
+        end_date = pd.Timestamp(end_date).date()
+        requests = []
+
+        for exchange, group in contracts_df.groupby('exchange'):
+            ranges = {}
+            for row in group.itertuples(index=False):
+                first = max(start_date, row.list_date)
+                last = min(end_date, row.delist_date)
+                if first <= last:
+                    ranges[row.ts_code] = (first, last)
+            if not ranges:
+                continue
+
+            contract_chunks = []
+            for ts_code, (first, last) in ranges.items():
+                chunk_start = first
+                while chunk_start <= last:
+                    chunk_end = min(last, chunk_start + timedelta(days=self.chunk_days - 1))
+                    contract_chunks.append((ts_code, chunk_start, chunk_end))
+                    chunk_start = chunk_end + timedelta(days=1)
+
+            date_codes = {}
+            for ts_code, (first, last) in ranges.items():
+                for day in self.calendar.trading_days_between(first, last):
+                    date_codes.setdefault(day, set()).add(ts_code)
+
+            by_date = strategy == 'date' or (strategy == 'auto' and len(date_codes) <= len(contract_chunks))
+            if by_date:
+                requests.extend(
+                    FetchRequest(
+                        'fut_daily',
+                        {
+                            'trade_date': day.strftime('%Y%m%d'),
+                            'exchange': exchange,
+                            'fields': TushareService.DAILY_FIELDS
+                        },
+                        tag=(f"{exchange}:{day.strftime('%Y%m%d')}", codes)
+                    )
+                    for day, codes in sorted(date_codes.items())
+                )
+            else:
+                requests.extend(
+                    FetchRequest(
+                        'fut_daily',
+                        {
+                            'ts_code': ts_code,
+                            'start_date': chunk_start.strftime('%Y%m%d'),
+                            'end_date': chunk_end.strftime('%Y%m%d'),
+                            'fields': TushareService.DAILY_FIELDS
+                        },
+                        tag=(
+                            f"{ts_code}:{chunk_start.strftime('%Y%m%d')}-{chunk_end.strftime('%Y%m%d')}",
+                            {ts_code}
+                        )
+                    )
+                    for ts_code, chunk_start, chunk_end in contract_chunks
+                )
+
+        return requests
+
+    def run(self, start_date, end_date, exchanges=None, fut_codes=None, contracts_df=None,
+            strategy='auto', job_id=None, progress_callback=None, cancel_event=None):
+        """
+        执行回补任务
+        contracts_df: 可选，直接指定合约（需包含 ts_code、exchange、list_date、delist_date 列）
+        cancel_event: 可选的 threading.Event，置位后停止获取，已获取的数据仍会写完并记录断点
+        返回回补统计
+        """
+        if not self.db.ensure_connected():
+            raise DatabaseError("数据库连接失败")
+
+        if contracts_df is None:
+            contracts_df = self.load_contracts(start_date, end_date, exchanges, fut_codes)
+        job_id = job_id or self.make_job_id(start_date, end_date, contracts_df, strategy)
+
+        requests = self.plan_chunks(contracts_df, start_date, end_date, strategy)
+        finished = self.db.get_backfill_checkpoints(job_id)
+        if finished is None:
+            raise DatabaseError("无法读取回补断点")
+        pending = [request for request in requests if request.tag[0] not in finished]
+
+        report = {
+            'job_id': job_id,
+            'contracts': len(contracts_df),
+            'total_chunks': len(requests),
+            'resumed_chunks': len(requests) - len(pending),
+            'completed': 0,
+            'empty': 0,
+            'failed': 0,
+            'rows': 0,
+            'elapsed': 0.0,
+            'rows_per_second': 0.0,
+            'cancelled': False
+        }
+        message = (
+            f"历史回补 {job_id}: {start_date} 至 {end_date}, {len(contracts_df)} 个合约, "
+            f"{len(requests)} 个分块, 已完成 {report['resumed_chunks']} 个, 待执行 {len(pending)} 个"
+        )
+        print(message)
+        logging.info(message)
+        if not pending:
+            return report
+
+        start = time.time()
+        failed = set()
+        fetched = 0
+
+        def checkpoint(db, chunk_key, rows):
+            db.save_backfill_checkpoint(job_id, chunk_key, rows)
+
+        with IngestPipeline(
+            writer=lambda db, df: db.bulk_load_quotes(df),
+            db=self.db,
+            name='历史回补',
+            on_written=checkpoint
+        ) as pipeline:
+            for result in self.fetch_engine.run(pending, cancel_event):
+                fetched += 1
+                chunk_key, codes = result.request.tag
+
+                if not result.ok:
+                    failed.add(chunk_key)
+                else:
+                    df = result.data
+                    if df is not None and not df.empty:
+                        df = df[df['ts_code'].isin(codes)]
+                    if df is None or df.empty:
+                        # 无数据的分块（如停牌、节假日）同样记为完成
+                        checkpoint(self.db, chunk_key, 0)
+                        report['empty'] += 1
+                    else:
+                        pipeline.put(df, tag=chunk_key, fetch_elapsed=result.elapsed)
+
+                self._report_progress(fetched, len(pending), pipeline, start, progress_callback)
+
+        for chunk_key, ok, error in pipeline.results:
+            if not ok:
+                failed.add(chunk_key)
+                logging.error(f"回补分块写入失败 {chunk_key}: {error}")
+
+        elapsed = time.time() - start
+        report.update(
+            completed=fetched - len(failed),
+            failed=len(failed),
+            rows=pipeline.write_stats.rows,
+            elapsed=elapsed,
+            rows_per_second=pipeline.write_stats.rows / elapsed if elapsed > 0 else 0.0,
+            cancelled=bool(cancel_event is not None and cancel_event.is_set())
+        )
+        summary = (
+            f"\n历史回补{'已取消' if report['cancelled'] else '完成'} {job_id}\n"
+            f"完成: {report['completed']} (无数据 {report['empty']})  失败: {report['failed']}  "
+            f"未执行: {len(pending) - fetched}\n"
+            f"写入: {report['rows']} 行, 耗时 {elapsed:.1f} 秒, {report['rows_per_second']:.1f} 行/秒"
+        )
+        print(summary)
+        logging.info(summary)
+        return report
+
+    @staticmethod
+    def _report_progress(done, total, pipeline, start, progress_callback=None):
+        """输出进度、写入速度和预计剩余时间"""
+        elapsed = time.time() - start
+        rows = pipeline.write_stats.rows
+        rate = rows / elapsed if elapsed > 0 else 0.0
+        eta = elapsed / done * (total - done) if done else 0.0
+        message = f"回补进度 {done}/{total}, 已写入 {rows} 行, {rate:.1f} 行/秒, 预计剩余 {eta:.0f} 秒"
+
+        if progress_callback:
+            progress_callback(int(done * 100 / total), message)
+        if done == total or done % 20 == 0:
+            logging.info(message)
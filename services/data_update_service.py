@@ -1,14 +1,20 @@
 from datetime import datetime, timedelta
 import logging
 from .tushare_service import TushareService
+from .fetch_engine import FetchEngine, FetchRequest
+from .ingest_pipeline import IngestPipeline
+from .sync_planner import SyncPlanner
+from .backfill_engine import BackfillEngine
+from .trade_calendar import TradeCalendar
 from database.db_manager import DatabaseManager
-from utils.rate_limiter import RateLimiter
+from database.buffered_writer import BufferedWriter, FlushError
 import pandas as pd
 import traceback
 import sys
 import time
 from utils.decorators import error_handler
 from utils.exceptions import DatabaseError
+from config.config import Config
 
 class DataUpdateService:
     def __init__(self):
@@ -16,7 +22,9 @@ class DataUpdateService:
             print("初始化数据更新服务...")
             self.tushare = TushareService()
             self.db = DatabaseManager()
-            self.rate_limiter = RateLimiter(max_calls=180, time_window=60)
+            self.fetch_engine = FetchEngine(self.tushare)
+            self.calendar = TradeCalendar.instance()
+            self.sync_planner = SyncPlanner(self.db, calendar=self.calendar)
             print("数据更新服务初始化成功")
         except Exception as e:
             error_msg = f"初始化数据更新服务失败: {str(e)}\n{traceback.format_exc()}"
@@ -24,6 +32,14 @@ class DataUpdateService:
             logging.error(error_msg)
             raise
     
+    def _get_last_trade_date(self):
+        """获取最后交易日（按交易日历，日历不可用时退回数据库的估算）"""
+        try:
+            return self.calendar.last_trade_date()
+        except Exception as e:
+            logging.warning(f"交易日历不可用，按工作日估算最后交易日: {str(e)}")
+            return self.db.get_last_trade_date()
+    
     def _update_progress(self, current, total, message, callback=None):
         """统一处理进度更新"""
         if callback:
@@ -49,7 +65,7 @@ class DataUpdateService:
                 raise DatabaseError("无有效合约信息")
             
             # 获取最后交易日
-            last_trade_date = self.db.get_last_trade_date()
+            last_trade_date = self._get_last_trade_date()
             if not last_trade_date:
                 raise DatabaseError("无法获取最新交易日")
             
@@ -83,7 +99,6 @@ class DataUpdateService:
         
     def update_futures_basic(self):
         """更新期货基础信息"""
-        self.rate_limiter.acquire()
         df = self.tushare.get_futures_basic()
         if df is not None and len(df) > 0:
             self.db.update_contracts(df)
@@ -101,47 +116,33 @@ class DataUpdateService:
             
             # 如果没有传入交易日，则获取最新交易日
             if last_trade_date is None:
-                last_trade_date = self.db.get_last_trade_date()
+                last_trade_date = self._get_last_trade_date()
                 if not last_trade_date:
                     raise DatabaseError("无法获取最新交易日")
             
-            print(f"更新{ts_code}在{last_trade_date}的行情数据")
+            print(f"更新{ts_code}截至{last_trade_date}的行情数据")
             
-            # 检查是否需要更新
-            if self.db.check_quote_exists(ts_code, last_trade_date):
+            # 按同步水位线补齐水位线之后到最新交易日的全部缺口（没有水位线时从 SYNC_LOOKBACK_DAYS 之前开始），
+            # 只取最新交易日会把水位线推过中间缺失的交易日，之后的同步不会再发现这些缺口
+            exchange = self.db.SUFFIX_EXCHANGE.get(ts_code.rsplit('.', 1)[-1], '')
+            contract = pd.DataFrame({'ts_code': [ts_code], 'exchange': [exchange]})
+            plan = self.sync_planner.plan(contract, last_trade_date, strategy='contract')
+            if ts_code in plan.up_to_date:
                 print(f"{ts_code}在{last_trade_date}的行情数据已存在，跳过更新")
                 return True
             
-            # 获取行情数据前等待限流器许可
-            self.rate_limiter.acquire()
-            try:
-                # 只获取最新交易日的数据
-                df = self.tushare.get_futures_daily(
-                    ts_code, 
-                    start_date=last_trade_date.strftime('%Y%m%d'),
-                    end_date=last_trade_date.strftime('%Y%m%d')
-                )
-            except Exception as e:
-                error_msg = f"获取行情数据失败: {str(e)}"
-                print(error_msg)
-                logging.error(f"{error_msg}\n{traceback.format_exc()}")
-                raise DatabaseError(error_msg)
-            
-            if df is None:
-                print(f"{ts_code}在{last_trade_date}无可用行情数据")
-                return False
-            
-            if len(df) == 0:
-                print(f"{ts_code}在{last_trade_date}无新行情数据")
-                return True
-            
-            # 保存数据
-            if not self.db.save_quotes(df):
-                error_msg = "保存行情数据失败"
-                print(error_msg)
-                raise DatabaseError(error_msg)
+            gap_start, gap_end = plan.gaps[ts_code]
+            print(f"{ts_code}缺少 {gap_start} 至 {gap_end} 的行情数据")
+            success_count, fail_count = self._run_sync_plan(
+                plan, f"合约: {ts_code}", pipelined=False
+            )
+            if fail_count:
+                raise DatabaseError(f"补齐{ts_code}的行情数据失败")
             
-            print(f"{ts_code}在{last_trade_date}的行情数据更新成功")
+            if success_count:
+                print(f"{ts_code}截至{last_trade_date}的行情数据更新成功")
+            else:
+                print(f"{ts_code}在 {gap_start} 至 {gap_end} 无新行情数据")
             return True
             
         except Exception as e:
@@ -175,10 +176,10 @@ class DataUpdateService:
         return success_count, fail_count
 
     def update_main_contracts(self):
-        """更新主力合约信息"""
+        """更新最新交易日的主力合约（服务器端集合计算，一次查询读回全部品种的主力合约和行情）"""
         try:
             # 获取最新交易日
-            latest_date = self.db.get_last_trade_date()
+            latest_date = self._get_last_trade_date()
             if not latest_date:
                 error_msg = "无法获取最新交易日"
                 print(error_msg)
@@ -186,63 +187,18 @@ class DataUpdateService:
             
             print(f"\n开始更新主力合约信息，交易日期: {latest_date}")
             
-            # 获取所有交易所和品种
-            exchanges = self.db.get_exchanges()
-            if not exchanges:
-                error_msg = "无可用交易所"
-                print(error_msg)
-                raise Exception(error_msg)
+            self.db.compute_main_contracts(latest_date)
+            main_contracts = self.db.get_main_contracts_for_date(latest_date, compute=False)
+            if main_contracts is None:
+                raise Exception("读取主力合约失败")
             
-            total_success = 0
-            total_fail = 0
+            # 主力合约当天没有行情的品种记为失败
+            missing = main_contracts['close'].isna()
+            for row in main_contracts[missing].itertuples(index=False):
+                print(f"未找到主力合约{row.ts_code}的行情数据")
+            total_success = int((~missing).sum())
+            total_fail = int(missing.sum())
             
-            # 遍历每个交易所和品种
-            for exchange in exchanges:
-                fut_codes = self.db.get_future_codes(exchange)
-                if not fut_codes:
-                    continue
-                    
-                for fut_code in fut_codes:
-                    try:
-                        print(f"\n处理 {exchange} {fut_code}")
-                        # 从数据库获取主力合约
-                        main_contract = self.db.get_main_contracts(exchange, fut_code)
-                        
-                        if main_contract:
-                            print(f"找到主力合约: {main_contract}")
-                            # 获取主力合约的最新行情数据
-                            df = self.db.get_contract_quotes(main_contract, days=1)
-                            if df is not None and not df.empty:
-                                row = df.iloc[0]
-                                # 保存主力合约信息
-                                if self.db.save_main_contract(
-                                    trade_date=latest_date,
-                                    exchange=exchange,
-                                    fut_code=fut_code,
-                                    ts_code=main_contract,
-                                    vol=float(row['vol']) if 'vol' in row else 0,
-                                    amount=float(row['amount']) if 'amount' in row else 0,
-                                    oi=float(row['oi']) if 'oi' in row else 0
-                                ):
-                                    total_success += 1
-                                    print(f"保存主力合约信息成功")
-                                else:
-                                    total_fail += 1
-                                    print(f"保存主力合约信息失败")
-                            else:
-                                total_fail += 1
-                                print(f"未找到主力合约{main_contract}的行情数据")
-                        else:
-                            total_fail += 1
-                            print(f"未找到主力合约")
-                            
-                    except Exception as e:
-                        total_fail += 1
-                        error_msg = f"更新{exchange} {fut_code}主力合约失败: {str(e)}"
-                        print(error_msg)
-                        logging.error(error_msg)
-                        continue
-                        
             summary = f"\n主力合约更新完成\n成功: {total_success}\n失败: {total_fail}"
             print(summary)
             return total_success, total_fail
@@ -253,8 +209,14 @@ class DataUpdateService:
             logging.error(error_msg)
             raise
             
-    def update_all_quotes(self, progress_callback=None):
-        """更新所有有效合约的行情数据"""
+    def update_all_quotes(self, progress_callback=None, bulk=True, pipelined=True):
+        """更新所有有效合约的行情数据
+        
+        根据同步水位线计算每个合约缺失的交易日，只获取缺口数据（停机后自动补齐）。
+        bulk=True 时按交易所在“整日批量”和“逐合约区间”之间选择调用次数更少的方式；
+        bulk=False 时始终逐合约获取。
+        pipelined=True 时获取与写库在不同线程中重叠执行。
+        """
         try:
             if not self.db.connect():
                 error_msg = "数据库连接失败"
@@ -262,7 +224,7 @@ class DataUpdateService:
                 raise Exception(error_msg)
                 
             # 1. 获取最新交易日（只计算一次）
-            latest_trade_date = self.db.get_last_trade_date()
+            latest_trade_date = self._get_last_trade_date()
             if not latest_trade_date:
                 error_msg = "无法获取最新交易日"
                 print(error_msg, file=sys.stderr)
@@ -292,69 +254,20 @@ class DataUpdateService:
             print(f"第一个合约: {valid_contracts.iloc[0]['ts_code']}")
             print(f"最后一个合约: {valid_contracts.iloc[-1]['ts_code']}")
             
-            success_count = 0
-            skip_count = 0
-            fail_count = 0
-            
-            # 3. 遍历处理每个合约
+            # 3. 更新合约行情数据
             print(f"\n{'-'*50}")
-            print("开始更新合约行情数据")
+            print(f"开始更新合约行情数据 ({'按交易所批量' if bulk else '逐合约'})")
             print(f"{'-'*50}")
             
-            for i, (_, contract) in enumerate(valid_contracts.iterrows()):
-                ts_code = contract['ts_code']
-                try:
-                    current_progress = int((i + 1) * 100 / total_contracts)
-                    remaining = total_contracts - (i + 1)
-                    
-                    # 构建进度消息
-                    progress_msg = (
-                        f"{trade_date_msg}\n"
-                        f"处理合约 {ts_code} ({i+1}/{total_contracts})\n"
-                        f"成功: {success_count}  跳过: {skip_count}  失败: {fail_count}  剩余: {remaining}"
-                    )
-                    
-                    print(f"\n当前处理: {ts_code} ({i+1}/{total_contracts})")
-                    print(f"到期日: {contract['last_ddate']}")
-                    
-                    if progress_callback:
-                        progress_callback(current_progress, progress_msg)
-                        
-                    # 检查是否已有数据
-                    if self.db.check_quote_exists(ts_code, latest_trade_date):
-                        print(f"合约 {ts_code} 已有最新数据，跳过")
-                        skip_count += 1
-                        continue
-                        
-                    # 获取行情数据
-                    print(f"获取 {ts_code} 的行情数据...")
-                    self.rate_limiter.acquire()
-                    df = self.tushare.get_futures_daily(ts_code, start_date=latest_trade_date, end_date=latest_trade_date)
-                    
-                    if df is not None and not df.empty:
-                        print(f"获取到 {len(df)} 条数据")
-                        # 保存数据
-                        if self.db.save_quotes(df):
-                            success_count += 1
-                            print(f"合约 {ts_code} 更新成功")
-                        else:
-                            fail_count += 1
-                            print(f"合约 {ts_code} 保存失败")
-                    else:
-                        print(f"合约 {ts_code} 无数据")
-                        skip_count += 1
-                        
-                except Exception as e:
-                    fail_count += 1
-                    error_msg = f"更新合约 {ts_code} 失败: {str(e)}"
-                    print(error_msg, file=sys.stderr)
-                    logging.error(f"{error_msg}\n{traceback.format_exc()}")
-                    continue
-                    
-                # 每50个合约暂停1秒
-                if (i + 1) % 50 == 0:
-                    print("\n达到50个合约，暂停1秒...")
-                    time.sleep(1)
+            plan = self.sync_planner.plan(
+                valid_contracts, latest_trade_date, strategy='auto' if bulk else 'contract'
+            )
+            print(plan)
+            
+            success_count, fail_count = self._run_sync_plan(
+                plan, trade_date_msg, progress_callback, pipelined
+            )
+            skip_count = total_contracts - success_count - fail_count
                     
             # 4. 完成处理
             summary = (
@@ -381,14 +294,79 @@ class DataUpdateService:
                 progress_callback(-1, f"更新失败: {str(e)}")
             raise
             
+    def _run_sync_plan(self, plan, trade_date_msg, progress_callback=None, pipelined=True):
+        """
+        执行同步计划：并发获取缺口数据，经写后缓冲按组写入数据库，返回 (成功合约数, 失败合约数)
+        pipelined=True 时由后台线程写入，与获取重叠执行
+        """
+        failed_codes = set()
+        saved_codes = set()
+        total_requests = len(plan.requests)
+        
+        def record_failure(error):
+            for codes in error.tags:
+                failed_codes.update(codes)
+            print(f"保存行情失败: {error.message}", file=sys.stderr)
+        
+        with BufferedWriter(self.db, threaded=pipelined, name='行情缓冲写入') as writer:
+            for i, result in enumerate(self.fetch_engine.run(plan.requests)):
+                codes = result.request.tag
+                params = result.request.params
+                label = params.get('ts_code') or f"{params.get('exchange')} {params.get('trade_date')}"
+                
+                progress_msg = (
+                    f"{trade_date_msg}\n"
+                    f"完成请求 {label} ({i+1}/{total_requests})\n"
+                    f"待补齐合约: {len(plan.gaps)}  获取失败: {len(failed_codes)}"
+                )
+                print(f"\n当前处理: {label} ({i+1}/{total_requests})")
+                if progress_callback:
+                    progress_callback(int(5 + (i + 1) * 90 / total_requests), progress_msg)
+                
+                if not result.ok:
+                    failed_codes |= codes
+                    error_msg = f"获取 {label} 行情失败: {str(result.error)}"
+                    print(error_msg, file=sys.stderr)
+                    logging.error(error_msg)
+                    continue
+                
+                df = result.data
+                if df is None or df.empty:
+                    print(f"{label} 无行情数据")
+                    continue
+                
+                # 只保留缺口内的合约（同时过滤掉主力/连续等指数合约）
+                df = df[df['ts_code'].isin(codes)]
+                if df.empty:
+                    print(f"{label} 无待更新合约的行情数据")
+                    continue
+                
+                found = set(df['ts_code'])
+                print(f"获取到 {len(df)} 条数据，涉及 {len(found)} 个合约")
+                saved_codes |= found
+                try:
+                    writer.write('futures_daily_quotes', df, tag=found, fetch_elapsed=result.elapsed)
+                except FlushError as e:
+                    record_failure(e)
+            
+            # 阶段结束时确认全部数据已落库
+            try:
+                writer.flush()
+            except FlushError as e:
+                record_failure(e)
+        
+        # 部分日期失败的合约回退水位线，下次运行重新补齐缺口
+        if failed_codes:
+            self.db.reset_watermarks({code: plan.watermarks.get(code) for code in failed_codes})
+        
+        success_count = len(saved_codes - failed_codes)
+        return success_count, len(failed_codes)
+            
     def update_main_contract_history(self):
         """更新主力合约历史行情"""
         try:
-            # 1. 确保主力合约表存在
-            self.db.create_main_contract_table()
-            
-            # 2. 获取最新交易日
-            latest_date = self.db.get_last_trade_date()
+            # 1. 获取最新交易日
+            latest_date = self._get_last_trade_date()
             if not latest_date:
                 error_msg = "无法获取最新交易日"
                 print(error_msg)
@@ -396,7 +374,7 @@ class DataUpdateService:
                 
             print(f"最新交易日: {latest_date}")
             
-            # 3. 获取所有交易所和品种
+            # 2. 一次调用获取全部品种的主力合约映射，批量写入主力合约表
             exchanges = self.db.get_exchanges()
             if not exchanges:
                 error_msg = "无可用交易所"
@@ -407,59 +385,60 @@ class DataUpdateService:
             total_skip = 0
             total_fail = 0
             
-            # 4. 遍历每个交易所和品种
-            for exchange in exchanges:
-                fut_codes = self.db.get_future_codes(exchange)
-                if not fut_codes:
-                    continue
-                    
-                for fut_code in fut_codes:
-                    try:
-                        # 调用tushare接口获取主力合约
-                        self.rate_limiter.acquire()
-                        df = self.tushare.get_dominant_contract(exchange, fut_code)
-                        
-                        if df is not None and len(df) > 0:
-                            row = df.iloc[0]
-                            main_ts_code = row['mapping_ts_code']
-                            
-                            # 保存主力合约信息
-                            if self.db.save_main_contract(
-                                trade_date=latest_date,
-                                exchange=exchange,
-                                fut_code=fut_code,
-                                ts_code=main_ts_code,
-                                vol=row.get('vol', 0),
-                                amount=row.get('amount', 0),
-                                oi=row.get('oi', 0)
-                            ):
-                                # 获取主力合约的历史行情
-                                self.rate_limiter.acquire()
-                                df = self.tushare.get_futures_daily(main_ts_code, days=30)
-                                if df is not None and not df.empty:
-                                    if self.db.save_quotes(df):
-                                        total_success += 1
-                                        print(f"更新主力合约{main_ts_code}历史行情成功")
-                                    else:
-                                        total_fail += 1
-                                        print(f"保存主力合约{main_ts_code}历史行情失败")
-                                else:
-                                    total_skip += 1
-                                    print(f"主力合约{main_ts_code}无历史行情数据")
-                            else:
-                                total_fail += 1
-                                print(f"保存主力合约信息失败: {exchange} {fut_code}")
-                        else:
-                            total_skip += 1
-                            print(f"无主力合约信息: {exchange} {fut_code}")
-                            
-                    except Exception as e:
+            # 成交量等字段在第5步行情入库后再补齐，这里不重复执行
+            mapping_df = self.update_main_contract_mapping(latest_date, exchanges=exchanges, fill_stats=False)
+            if mapping_df.empty:
+                error_msg = f"未获取到 {latest_date} 的主力合约映射"
+                print(error_msg)
+                raise Exception(error_msg)
+            print(f"获取到 {len(mapping_df)} 个品种的主力合约")
+            
+            # 3. 为每个主力合约生成历史行情请求
+            end_date = datetime.now()
+            start_date = end_date - timedelta(days=30)
+            daily_requests = [
+                FetchRequest(
+                    'fut_daily',
+                    {
+                        'ts_code': main_ts_code,
+                        'start_date': start_date.strftime('%Y%m%d'),
+                        'end_date': end_date.strftime('%Y%m%d'),
+                        'fields': TushareService.DAILY_FIELDS
+                    },
+                    tag=main_ts_code
+                )
+                for main_ts_code in mapping_df['ts_code'].unique()
+            ]
+            
+            # 4. 并发获取主力合约的历史行情，写库与获取重叠执行
+            with IngestPipeline(db=self.db) as pipeline:
+                for result in self.fetch_engine.run(daily_requests):
+                    main_ts_code = result.request.tag
+                    if not result.ok:
                         total_fail += 1
-                        error_msg = f"更新{exchange} {fut_code}主力合约历史失败: {str(e)}"
+                        error_msg = f"获取主力合约{main_ts_code}历史失败: {str(result.error)}"
                         print(error_msg)
                         logging.error(error_msg)
                         continue
                         
+                    df = result.data
+                    if df is not None and not df.empty:
+                        pipeline.put(df, tag=main_ts_code, fetch_elapsed=result.elapsed)
+                    else:
+                        total_skip += 1
+                        print(f"主力合约{main_ts_code}无历史行情数据")
+            
+            for main_ts_code, ok, error in pipeline.results:
+                if ok:
+                    total_success += 1
+                    print(f"更新主力合约{main_ts_code}历史行情成功")
+                else:
+                    total_fail += 1
+                    print(f"保存主力合约{main_ts_code}历史行情失败: {error}")
+            
+            # 5. 行情入库后补齐主力合约的成交量、成交额和持仓量
+            self.db.fill_main_contract_stats(latest_date, latest_date)
+                        
             return total_success, total_skip, total_fail
             
         except Exception as e:
@@ -468,6 +447,47 @@ class DataUpdateService:
             logging.error(error_msg)
             raise
             
+    def update_main_contract_mapping(self, start_date, end_date=None, exchanges=None, fill_stats=True):
+        """
+        批量更新主力合约映射
+        每个交易日一次 fut_mapping 调用即返回全部品种的主力合约（结果有缓存），
+        映射批量写入主力合约表，从行情表补齐成交量、成交额和持仓量，并重新生成区间起点之后的主力连续行情。
+        fill_stats: 调用方随后才写入主力合约行情时传 False，由调用方在行情入库后补齐
+        返回写入的映射 (trade_date, exchange, fut_code, ts_code)
+        """
+        start_date = pd.Timestamp(start_date).date()
+        end_date = pd.Timestamp(end_date).date() if end_date else start_date
+        days = [start_date] if start_date == end_date else self.calendar.trading_days_between(start_date, end_date)
+        
+        requests = [
+            FetchRequest('fut_mapping', {'trade_date': day.strftime('%Y%m%d')}, tag=day)
+            for day in days
+        ]
+        frames = []
+        for result in self.fetch_engine.run(requests):
+            if not result.ok:
+                error_msg = f"获取 {result.request.tag} 主力合约映射失败: {str(result.error)}"
+                print(error_msg)
+                logging.error(error_msg)
+                continue
+            mapping = TushareService.parse_main_mapping(result.data)
+            if not mapping.empty:
+                frames.append(mapping)
+                
+        if not frames:
+            return TushareService.parse_main_mapping(None)
+            
+        mapping_df = pd.concat(frames, ignore_index=True)
+        if exchanges:
+            mapping_df = mapping_df[mapping_df['exchange'].isin(exchanges)]
+            
+        self.db.save_main_contracts(mapping_df)
+        if fill_stats:
+            self.db.fill_main_contract_stats(start_date, end_date)
+        # 历史主力合约变化后，主力连续行情从区间起点重新生成
+        self.db.update_continuous_quotes(start_date)
+        return mapping_df
+            
     def update_basic_info(self):
         """更新期货基础信息"""
         try:
@@ -481,22 +501,30 @@ class DataUpdateService:
             today = datetime.now().strftime('%Y%m%d')
             print(f"当前日期: {today}")
             
-            # 获取所有交易所的期货合约信息
-            exchanges = ['CFFEX', 'SHFE', 'DCE', 'CZCE', 'INE', 'GFEX']
+            # 并发获取所有交易所的期货合约信息
+            requests = [
+                FetchRequest(
+                    'fut_basic',
+                    {
+                        'exchange': exchange,
+                        'fields': (
+                            'ts_code,symbol,exchange,name,fut_code,multiplier,trade_unit,'
+                            'per_unit,quote_unit,quote_unit_desc,delivery_month,'
+                            'last_trade_date,delist_date,list_date,list_status,is_delist'
+                        )
+                    },
+                    tag=exchange
+                )
+                for exchange in TushareService.EXCHANGES
+            ]
             all_data = []
             
-            for exchange in exchanges:
-                print(f"获取 {exchange} 的期货合约信息...")
-                # 调用tushare接口获取数据
-                self.rate_limiter.acquire()
-                df = self.tushare.pro.fut_basic(
-                    exchange=exchange,
-                    fields=(
-                        'ts_code,symbol,exchange,name,fut_code,multiplier,trade_unit,'
-                        'per_unit,quote_unit,quote_unit_desc,delivery_month,'
-                        'last_trade_date,delist_date,list_date,list_status,is_delist'
-                    )
-                )
+            for result in self.fetch_engine.run(requests):
+                exchange = result.request.tag
+                if not result.ok:
+                    raise result.error
+                print(f"获取到 {exchange} 的期货合约信息")
+                df = result.data
                 
                 if df is not None and len(df) > 0:
                     # 1. 过滤掉已退市的合约
@@ -557,8 +585,8 @@ class DataUpdateService:
                     print(error_msg)
                     raise Exception(error_msg)
                 
-                # 保存到数据库
-                if self.db.update_contracts(result):
+                # 只写入变化的部分（新增、变化、删除）
+                if self.db.sync_contracts(result) is not None:
                     print("合约信息更新成功")
                     return True
                 else:
@@ -575,4 +603,160 @@ class DataUpdateService:
             print(error_msg)
             logging.error(error_msg)
             raise
-            
\ No newline at end of file
+
+    def update_holding_rank(self, start_date=None, end_date=None, progress_callback=None):
+        """
+        更新期货持仓排名（fut_holding）
+        按 交易所 × 交易日 获取，每次调用返回该交易所当日全部合约的席位排名，
+        默认从各交易所的水位线继续；指定 start_date 时从该日期开始回补历史。
+        每年约 6 × 250 次调用，在180次/分钟的配额下约9分钟可回补一年。
+        返回: (成功交易日数, 无数据交易日数, 失败交易日数)
+        """
+        try:
+            if not self.db.connect():
+                raise DatabaseError("数据库连接失败")
+                
+            if end_date is None:
+                end_date = self._get_last_trade_date()
+                if not end_date:
+                    raise DatabaseError("无法获取最新交易日")
+            end_date = pd.Timestamp(end_date).date()
+            
+            watermarks = self.db.get_holding_watermarks()
+            if watermarks is None:
+                raise DatabaseError("无法读取持仓排名水位线")
+            
+            # 1. 为每个交易所的缺失交易日生成请求
+            requests = []
+            exchange_days = {}
+            for exchange in TushareService.EXCHANGES:
+                if start_date is not None:
+                    start = pd.Timestamp(start_date).date()
+                elif watermarks.get(exchange):
+                    start = watermarks[exchange] + timedelta(days=1)
+                else:
+                    start = end_date - timedelta(days=Config.SYNC_LOOKBACK_DAYS)
+                    
+                days = self.calendar.trading_days_between(start, end_date)
+                exchange_days[exchange] = days
+                for day in days:
+                    requests.append(FetchRequest(
+                        'fut_holding',
+                        {
+                            'trade_date': day.strftime('%Y%m%d'),
+                            'exchange': exchange,
+                            'fields': TushareService.HOLDING_FIELDS
+                        },
+                        tag=(exchange, day)
+                    ))
+            
+            total = len(requests)
+            print(f"\n持仓排名待更新: {total} 个 交易所×交易日 (截至 {end_date})")
+            if not requests:
+                return 0, 0, 0
+            
+            # 2. 并发获取，写库与获取重叠执行
+            failed = set()
+            empty = set()
+            suffixes = TushareService.EXCHANGE_SUFFIX
+            
+            # 回补历史时数据量大，使用 LOAD DATA 批量载入
+            if start_date is not None:
+                writer = lambda db, df: db.bulk_load_holding_rank(df) >= 0
+            else:
+                writer = lambda db, df: db.save_holding_rank(df) >= 0
+                
+            with IngestPipeline(
+                writer=writer,
+                db=self.db,
+                name='持仓排名'
+            ) as pipeline:
+                for i, result in enumerate(self.fetch_engine.run(requests)):
+                    exchange, day = result.request.tag
+                    if progress_callback:
+                        progress_callback(
+                            int((i + 1) * 100 / total),
+                            f"获取持仓排名 {exchange} {day} ({i+1}/{total})"
+                        )
+                    
+                    if not result.ok:
+                        failed.add((exchange, day))
+                        error_msg = f"获取 {exchange} {day} 持仓排名失败: {str(result.error)}"
+                        print(error_msg, file=sys.stderr)
+                        logging.error(error_msg)
+                        continue
+                    
+                    df = result.data
+                    if df is None or df.empty:
+                        empty.add((exchange, day))
+                        continue
+                    
+                    # 由交易所合约代码推出 ts_code
+                    df['exchange'] = exchange
+                    df['ts_code'] = df['symbol'].astype(str).str.upper() + '.' + suffixes[exchange]
+                    pipeline.put(df, tag=(exchange, day), fetch_elapsed=result.elapsed)
+            
+            for tag, ok, error in pipeline.results:
+                if not ok:
+                    failed.add(tag)
+                    print(f"保存 {tag[0]} {tag[1]} 持仓排名失败: {error}", file=sys.stderr)
+            
+            # 3. 按交易所推进水位线，只推进到第一个失败日之前，下次从失败日继续；
+            #    末尾连续无数据的交易日可能只是尚未发布（收盘后较晚才公布），不越过，下次重新获取
+            for exchange, days in exchange_days.items():
+                last_ok = None
+                for day in days:
+                    if (exchange, day) in failed:
+                        break
+                    if (exchange, day) not in empty:
+                        last_ok = day
+                if last_ok:
+                    self.db.set_holding_watermark(exchange, last_ok)
+            
+            empty_count = len(empty)
+            fail_count = len(failed)
+            success_count = total - empty_count - fail_count
+            summary = (
+                f"\n持仓排名更新完成 (截至 {end_date})\n"
+                f"成功: {success_count}  无数据: {empty_count}  失败: {fail_count}  "
+                f"写入: {pipeline.write_stats.rows} 行"
+            )
+            print(summary)
+            logging.info(summary)
+            return success_count, empty_count, fail_count
+            
+        except Exception as e:
+            error_msg = f"更新持仓排名失败: {str(e)}"
+            print(error_msg)
+            logging.error(f"{error_msg}\n{traceback.format_exc()}")
+            raise
+
+    def backfill_history(self, start_date, end_date=None, exchanges=None, fut_codes=None,
+                         progress_callback=None, cancel_event=None):
+        """
+        回补多年历史行情（可断点续传）
+        以相同参数再次调用时跳过已完成的分块；返回回补统计
+        """
+        try:
+            if not self.db.connect():
+                raise DatabaseError("数据库连接失败")
+            if end_date is None:
+                end_date = self._get_last_trade_date()
+                if not end_date:
+                    raise DatabaseError("无法获取最新交易日")
+                    
+            engine = BackfillEngine(self.tushare, self.db, self.fetch_engine, calendar=self.calendar)
+            return engine.run(
+                start_date,
+                end_date,
+                exchanges=exchanges,
+                fut_codes=fut_codes,
+                progress_callback=progress_callback,
+                cancel_event=cancel_event
+            )
+            
+        except Exception as e:
+            error_msg = f"回补历史行情失败: {str(e)}"
+            print(error_msg)
+            logging.error(f"{error_msg}\n{traceback.format_exc()}")
+            raise
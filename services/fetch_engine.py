@@ -0,0 +1,81 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import logging
+import time
+from config.config import Config
+from .tushare_service import TushareService
+
+class FetchRequest:
+    """单个接口请求（接口名 + 参数）"""
+    def __init__(self, endpoint, params=None, tag=None):
+        self.endpoint = endpoint
+        self.params = params or {}
+        self.tag = tag  # 调用方自定义标识，如交易所、合约代码
+
+    def __repr__(self):
+        return f"FetchRequest({self.endpoint}, {self.params}, tag={self.tag})"
+
+class FetchResult:
+    """单个请求的执行结果"""
+    def __init__(self, request, data=None, error=None, elapsed=0.0):
+        self.request = request
+        self.data = data
+        self.error = error
+        self.elapsed = elapsed
+
+    @property
+    def ok(self):
+        return self.error is None
+
+class FetchEngine:
+    """
+    并发获取引擎
+    使用线程池并发执行接口请求，所有线程共享进程内唯一的接口配额管理器，
+    因此整体速度只受接口配额限制，而不是每次请求的网络往返时间
+    """
+    def __init__(self, tushare=None, max_workers=None):
+        self.tushare = tushare or TushareService()
+        self.max_workers = max_workers or Config.FETCH_WORKERS
+
+    def run(self, requests, cancel_event=None):
+        """
+        并发执行请求，按完成顺序逐个返回 FetchResult（生成器）
+        cancel_event: 可选的 threading.Event，置位后不再返回后续结果并取消未开始的请求
+        """
+        requests = list(requests)
+        if not requests:
+            return
+
+        workers = max(1, min(self.max_workers, len(requests)))
+        logging.info(f"并发获取开始: {len(requests)} 个请求, {workers} 个线程")
+        start = time.time()
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tushare-fetch') as executor:
+            futures = [executor.submit(self._execute, request) for request in requests]
+            try:
+                for future in as_completed(futures):
+                    yield future.result()
+                    if cancel_event is not None and cancel_event.is_set():
+                        logging.info("并发获取已取消")
+                        break
+            finally:
+                for future in futures:
+                    future.cancel()
+
+        logging.info(
+            f"并发获取结束: 耗时 {time.time() - start:.2f} 秒, "
+            f"{self.tushare.quota}, {self.tushare.cache}"
+        )
+
+    def fetch_all(self, requests):
+        """并发执行请求，返回全部结果列表"""
+        return list(self.run(requests))
+
+    def _execute(self, request):
+        """在工作线程中执行单个请求"""
+        start = time.time()
+        try:
+            data = self.tushare.query(request.endpoint, **request.params)
+            return FetchResult(request, data=data, elapsed=time.time() - start)
+        except Exception as e:
+            logging.error(f"请求失败 {request}: {str(e)}")
+            return FetchResult(request, error=e, elapsed=time.time() - start)
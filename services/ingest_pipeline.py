@@ -0,0 +1,166 @@
+import logging
+import queue
+import threading
+import time
+from database.db_manager import DatabaseManager
+from utils.stage_stats import StageStats
+
+class IngestPipeline:
+    """
+    行情入库流水线
+    获取阶段通过 put() 把数据放入有界队列，写入阶段在独立线程中取出并写入数据库，
+    使接口请求与数据库写入重叠执行。队列满时 put() 阻塞（背压），close() 等待队列
+    全部写完后退出。threaded=False 时在 put() 中同步写入，接口保持一致。
+    on_written(db, tag, rows): 可选，每批写入成功后在写入线程中调用（如记录断点），
+    抛出异常时该批按失败处理。
+    """
+    _STOP = object()
+
+    def __init__(self, writer=None, queue_size=8, threaded=True, db=None, name='行情入库', on_written=None):
+        self.writer = writer or (lambda db, df: db.save_quotes(df))
+        self.on_written = on_written
+        self.threaded = threaded
+        self.db = db
+        self.name = name
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.fetch_stats = StageStats('获取阶段')
+        self.write_stats = StageStats('写入阶段')
+        self.results = []  # [(tag, 是否成功, 异常)]
+        self._thread = None
+        self._owns_db = False
+        self._abort_event = threading.Event()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type:
+            self.abort()
+        else:
+            self.close()
+
+    def start(self):
+        """启动写入线程"""
+        if not self.threaded:
+            if self.db is None:
+                self.db = DatabaseManager()
+                self._owns_db = True
+            return
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._write_loop,
+                name="ingest-writer",
+                daemon=True
+            )
+            self._thread.start()
+            logging.info(f"{self.name}流水线已启动")
+
+    def put(self, df, tag=None, fetch_elapsed=0.0):
+        """放入一批待写入的数据（队列满时阻塞）"""
+        rows = len(df) if df is not None else 0
+        self.fetch_stats.record(rows, fetch_elapsed)
+
+        if not self.threaded:
+            self._write_batch(self.db, tag, df)
+            return
+
+        if self._thread is None:
+            raise RuntimeError("流水线尚未启动")
+
+        start = time.time()
+        while True:
+            try:
+                self.queue.put((tag, df), timeout=0.5)
+                break
+            except queue.Full:
+                if not self._thread.is_alive():
+                    raise RuntimeError("写入线程已退出")
+        self.fetch_stats.record_blocked(time.time() - start)
+
+    def close(self, timeout=None):
+        """发送结束标记，等待写入线程处理完队列中的数据"""
+        if self._thread is not None:
+            deadline = time.time() + timeout if timeout is not None else None
+            # 写入线程已退出时队列不会再被取出，不能阻塞等待
+            while self._thread.is_alive():
+                try:
+                    self.queue.put(self._STOP, timeout=0.5)
+                    break
+                except queue.Full:
+                    if deadline is not None and time.time() >= deadline:
+                        break
+            self._thread.join(None if deadline is None else max(deadline - time.time(), 0))
+            if self._thread.is_alive():
+                logging.warning(f"{self.name}流水线写入线程未在 {timeout} 秒内结束")
+            else:
+                self._drain_unwritten()
+            self._thread = None
+        if self._owns_db:
+            # 同步模式自行创建的管理器，连接归还连接池
+            self.db.close()
+            self.db = None
+            self._owns_db = False
+        self._log_summary()
+        return self.results
+
+    def _drain_unwritten(self):
+        """写入线程异常退出后，队列中剩余的数据按失败记录"""
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not self._STOP:
+                self.results.append((item[0], False, RuntimeError("写入线程已退出")))
+
+    def abort(self):
+        """放弃队列中尚未写入的数据并停止"""
+        self._abort_event.set()
+        return self.close()
+
+    def _write_loop(self):
+        """写入线程：从连接池取出独立的连接逐批写入，结束时归还"""
+        db = DatabaseManager()
+        if not db.connect():
+            logging.error(f"{self.name}流水线写入线程无法连接数据库")
+        try:
+            while True:
+                item = self.queue.get()
+                try:
+                    if item is self._STOP:
+                        break
+                    tag, df = item
+                    if self._abort_event.is_set():
+                        self.results.append((tag, False, RuntimeError("流水线已取消")))
+                        continue
+                    self._write_batch(db, tag, df)
+                finally:
+                    self.queue.task_done()
+        finally:
+            db.close()
+
+    def _write_batch(self, db, tag, df):
+        """写入一批数据并记录结果"""
+        rows = len(df) if df is not None else 0
+        start = time.time()
+        try:
+            ok = bool(self.writer(db, df))
+            if ok and self.on_written:
+                self.on_written(db, tag, rows)
+            self.write_stats.record(rows, time.time() - start, error=not ok)
+            self.results.append((tag, ok, None))
+        except Exception as e:
+            self.write_stats.record(rows, time.time() - start, error=True)
+            self.results.append((tag, False, e))
+            logging.error(f"{self.name}写入失败 {tag}: {str(e)}")
+
+    def _log_summary(self):
+        """输出各阶段吞吐统计"""
+        summary = (
+            f"\n{self.name}流水线统计\n"
+            f"  {self.fetch_stats}\n"
+            f"  {self.write_stats}"
+        )
+        print(summary)
+        logging.info(summary)
@@ -0,0 +1,232 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime
+from threading import Lock
+import pandas as pd
+from config.config import Config
+
+class ResponseCache:
+    """
+    Tushare接口响应的磁盘缓存
+    以 接口名 + 规范化参数 为键，DataFrame 以 gzip 压缩的 pickle 文件保存。
+    过期规则：
+      - 参数中的日期全部早于今天（已收盘的历史数据）: 永不过期
+      - 涉及今天或未指定结束日期: today_ttl 秒
+      - 不含日期参数的接口: 按 endpoint_ttl 配置，未配置时同 today_ttl
+      - 空结果（如数据尚未发布）: today_ttl 秒
+    总大小超过 max_bytes 时按最近访问时间淘汰（LRU）。
+    """
+    DATE_PARAMS = ('trade_date', 'start_date', 'end_date', 'cal_date')
+
+    def __init__(self, cache_dir=None, max_bytes=None, today_ttl=None, endpoint_ttl=None, enabled=None):
+        config = Config.TUSHARE_CACHE
+        self.cache_dir = cache_dir or config['dir']
+        self.max_bytes = max_bytes if max_bytes is not None else config['max_bytes']
+        self.today_ttl = today_ttl if today_ttl is not None else config['today_ttl']
+        self.endpoint_ttl = endpoint_ttl if endpoint_ttl is not None else config['endpoint_ttl']
+        self.enabled = enabled if enabled is not None else config['enabled']
+
+        self.lock = Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'writes': 0, 'evictions': 0}
+        self.total_bytes = 0
+
+        if self.enabled:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self.total_bytes = sum(size for _, _, size in self._scan())
+            logging.info(
+                f"初始化接口缓存: {self.cache_dir}, 当前 {self.total_bytes / 1024 / 1024:.1f}MB, "
+                f"上限 {self.max_bytes / 1024 / 1024:.0f}MB"
+            )
+
+    @staticmethod
+    def _normalize_params(params):
+        """规范化参数：去掉空值，日期统一为YYYYMMDD，按键排序"""
+        normalized = {}
+        for key, value in params.items():
+            if value is None or value == '':
+                continue
+            if hasattr(value, 'strftime'):
+                value = value.strftime('%Y%m%d')
+            elif key in ResponseCache.DATE_PARAMS:
+                value = str(value).replace('-', '')
+            normalized[key] = str(value)
+        return dict(sorted(normalized.items()))
+
+    def make_key(self, endpoint, params):
+        """生成缓存键"""
+        raw = json.dumps([endpoint, self._normalize_params(params)], ensure_ascii=False)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.pkl.gz")
+
+    def _expires_at(self, endpoint, params, empty=False):
+        """计算过期时间，None 表示永不过期"""
+        normalized = self._normalize_params(params)
+        dates = [normalized[key] for key in self.DATE_PARAMS if key in normalized]
+        now = time.time()
+
+        # 空结果可能只是数据尚未发布，不能当作已收盘的历史数据永久缓存
+        if empty:
+            return now + self.today_ttl
+
+        if not dates:
+            return now + self.endpoint_ttl.get(endpoint, self.today_ttl)
+
+        today = datetime.now().strftime('%Y%m%d')
+        # 只有开始日期而没有结束日期时，数据会一直延伸到今天
+        open_ended = 'start_date' in normalized and 'end_date' not in normalized
+        if not open_ended and max(dates) < today:
+            return None
+        return now + self.today_ttl
+
+    def get(self, endpoint, params):
+        """读取缓存，未命中或已过期返回 None"""
+        if not self.enabled:
+            return None
+
+        path = self._path(self.make_key(endpoint, params))
+        try:
+            entry = pd.read_pickle(path, compression='gzip')
+        except FileNotFoundError:
+            with self.lock:
+                self.stats['misses'] += 1
+            return None
+        except Exception as e:
+            logging.warning(f"读取缓存失败，忽略该缓存: {path}, {str(e)}")
+            self._remove(path)
+            with self.lock:
+                self.stats['misses'] += 1
+            return None
+
+        expires_at = entry.get('expires_at')
+        if expires_at is not None and expires_at < time.time():
+            self._remove(path)
+            with self.lock:
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+            return None
+
+        # 更新访问时间，用于LRU淘汰
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        with self.lock:
+            self.stats['hits'] += 1
+        return entry['data']
+
+    def put(self, endpoint, params, df):
+        """写入缓存"""
+        if not self.enabled or df is None:
+            return
+
+        key = self.make_key(endpoint, params)
+        path = self._path(key)
+        entry = {
+            'endpoint': endpoint,
+            'params': self._normalize_params(params),
+            'expires_at': self._expires_at(endpoint, params, empty=df.empty),
+            'data': df
+        }
+
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            # 每次写入使用唯一的临时文件，多个线程同时写同一个键时互不覆盖
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f"{key}.", suffix='.tmp')
+            os.close(fd)
+            pd.to_pickle(entry, tmp_path, compression='gzip')
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+        except Exception as e:
+            logging.warning(f"写入缓存失败: {endpoint} {params}, {str(e)}")
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+            return
+
+        with self.lock:
+            self.stats['writes'] += 1
+            self.total_bytes += size - old_size
+            need_evict = self.total_bytes > self.max_bytes
+
+        if need_evict:
+            self.evict()
+
+    def evict(self):
+        """按最近访问时间淘汰，直到总大小降到上限的90%以下"""
+        target = self.max_bytes * 0.9
+        entries = sorted(self._scan(), key=lambda item: item[1])
+        with self.lock:
+            for path, _, size in entries:
+                if self.total_bytes <= target:
+                    break
+                try:
+                    os.remove(path)
+                    self.total_bytes -= size
+                    self.stats['evictions'] += 1
+                except OSError:
+                    continue
+
+    def clear(self, endpoint=None):
+        """清空缓存（可只清除指定接口）"""
+        for path, _, size in list(self._scan()):
+            if endpoint is not None:
+                try:
+                    if pd.read_pickle(path, compression='gzip').get('endpoint') != endpoint:
+                        continue
+                except Exception:
+                    pass
+            self._remove(path, size)
+
+    def _remove(self, path, size=None):
+        try:
+            size = size if size is not None else os.path.getsize(path)
+            os.remove(path)
+            with self.lock:
+                self.total_bytes -= size
+        except OSError:
+            pass
+
+    def _scan(self):
+        """遍历缓存文件，返回 (路径, 最近访问时间, 大小)"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.pkl.gz'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_mtime, stat.st_size
+
+    def get_status(self):
+        """获取缓存统计"""
+        with self.lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return dict(
+                self.stats,
+                hit_rate=self.stats['hits'] / lookups if lookups else 0.0,
+                total_bytes=self.total_bytes,
+                max_bytes=self.max_bytes
+            )
+
+    def __str__(self):
+        status = self.get_status()
+        return (
+            f"ResponseCache(命中: {status['hits']}, 未命中: {status['misses']}, "
+            f"命中率: {status['hit_rate']:.1%}, 淘汰: {status['evictions']}, "
+            f"大小: {status['total_bytes'] / 1024 / 1024:.1f}MB)"
+        )
@@ -0,0 +1,119 @@
+from datetime import timedelta
+import logging
+import pandas as pd
+from config.config import Config
+from utils.exceptions import DatabaseError
+from .fetch_engine import FetchRequest
+from .trade_calendar import TradeCalendar
+from .tushare_service import TushareService
+
+class SyncPlan:
+    """同步计划：各合约缺失的日期区间及需要发出的请求"""
+    def __init__(self, target_date):
+        self.target_date = target_date
+        self.requests = []
+        self.gaps = {}          # ts_code -> (开始日期, 结束日期)
+        self.watermarks = {}    # 规划时各合约的水位线，用于失败时回退
+        self.up_to_date = set()
+
+    def __str__(self):
+        return (
+            f"同步计划(目标交易日: {self.target_date}, 已是最新: {len(self.up_to_date)}, "
+            f"有缺口: {len(self.gaps)}, 请求数: {len(self.requests)})"
+        )
+
+class SyncPlanner:
+    """
+    增量同步规划器
+    一次查询读取全部合约的水位线，计算每个合约从水位线到目标交易日之间缺失的交易日，
+    再按交易所在“按交易日整所获取”和“按合约区间获取”之间选择调用次数更少的方式
+    """
+    def __init__(self, db, lookback_days=None, calendar=None):
+        self.db = db
+        self.lookback_days = lookback_days or Config.SYNC_LOOKBACK_DAYS
+        self.calendar = calendar or TradeCalendar.instance()
+        self._calendar_failed = False
+
+    def plan(self, contracts_df, target_date, strategy='auto'):
+        """
+        生成同步计划
+        contracts_df: 需要同步的合约（至少包含 ts_code、exchange 列）
+        strategy: auto 自动选择 / date 按交易日 / contract 按合约
+        """
+        target_date = pd.Timestamp(target_date).date()
+        watermarks = self.db.get_watermarks()
+        if watermarks is None:
+            raise DatabaseError("无法读取同步水位线")
+
+        plan = SyncPlan(target_date)
+        self._calendar_failed = False
+        default_start = target_date - timedelta(days=self.lookback_days)
+
+        for exchange, group in contracts_df.groupby('exchange'):
+            exchange_gaps = {}
+            for ts_code in group['ts_code']:
+                last_date = watermarks.get(ts_code)
+                start = last_date + timedelta(days=1) if last_date else default_start
+                days = self._trading_days_between(start, target_date)
+                if not days:
+                    plan.up_to_date.add(ts_code)
+                    continue
+                exchange_gaps[ts_code] = days
+                plan.watermarks[ts_code] = last_date
+
+            if not exchange_gaps:
+                continue
+
+            plan.gaps.update({code: (days[0], days[-1]) for code, days in exchange_gaps.items()})
+            plan.requests.extend(self._build_requests(exchange, exchange_gaps, strategy))
+
+        logging.info(str(plan))
+        return plan
+
+    def _trading_days_between(self, start, end):
+        """区间内的交易日，日历不可用时按工作日估算（节假日的请求返回空数据）"""
+        if not self._calendar_failed:
+            try:
+                return self.calendar.trading_days_between(start, end)
+            except Exception as e:
+                # 本次规划的其余合约不再重试日历
+                self._calendar_failed = True
+                logging.warning(f"交易日历不可用，按工作日规划同步区间: {str(e)}")
+        return [day.date() for day in pd.bdate_range(start, end)]
+
+    @staticmethod
+    def _build_requests(exchange, gaps, strategy):
+        """为一个交易所的缺口生成请求，tag 为该请求结果中需要保留的合约集合"""
+        date_codes = {}
+        for ts_code, days in gaps.items():
+            for day in days:
+                date_codes.setdefault(day, set()).add(ts_code)
+
+        by_date = strategy == 'date' or (strategy == 'auto' and len(date_codes) <= len(gaps))
+        if by_date:
+            return [
+                FetchRequest(
+                    'fut_daily',
+                    {
+                        'trade_date': day.strftime('%Y%m%d'),
+                        'exchange': exchange,
+                        'fields': TushareService.DAILY_FIELDS
+                    },
+                    tag=codes
+                )
+                for day, codes in sorted(date_codes.items())
+            ]
+
+        return [
+            FetchRequest(
+                'fut_daily',
+                {
+                    'ts_code': ts_code,
+                    'start_date': days[0].strftime('%Y%m%d'),
+                    'end_date': days[-1].strftime('%Y%m%d'),
+                    'fields': TushareService.DAILY_FIELDS
+                },
+                tag={ts_code}
+            )
+            for ts_code, days in gaps.items()
+        ]
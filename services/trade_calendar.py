@@ -0,0 +1,139 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+import logging
+import time
+from threading import Lock
+import pandas as pd
+from config.config import Config
+from database.db_manager import DatabaseManager
+from .tushare_service import TushareService
+
+class TradeCalendar:
+    """
+    期货交易日历
+    trade_cal 接口数据保存在 futures_trade_cal 表中，内存中维护升序排列的交易日列表，
+    查询均为二分查找。首次使用时从数据库加载，日历未覆盖到今天时从接口增量刷新
+    （只获取已加载的最后日期之后的部分，最短间隔 refresh_interval 秒）。
+    """
+    _instances = {}
+    _instances_lock = Lock()
+
+    @classmethod
+    def instance(cls, exchange=None):
+        """获取进程内交易所对应的唯一实例"""
+        exchange = exchange or Config.TRADE_CAL['exchange']
+        if exchange not in cls._instances:
+            with cls._instances_lock:
+                if exchange not in cls._instances:
+                    cls._instances[exchange] = cls(exchange)
+        return cls._instances[exchange]
+
+    def __init__(self, exchange=None, tushare=None, db=None):
+        self.exchange = exchange or Config.TRADE_CAL['exchange']
+        self.tushare = tushare
+        self.db = db
+        self.days = []              # 升序排列的交易日
+        self.covered_until = None   # 日历已覆盖的最后日期（含非交易日）
+        self.last_refresh = 0.0
+        self.lock = Lock()
+
+    def _ensure_loaded(self):
+        """首次使用时加载，日历未覆盖今天时尝试增量刷新"""
+        today = datetime.now().date()
+        if self.covered_until is not None and self.covered_until >= today:
+            return
+        with self.lock:
+            if self.covered_until is None:
+                self._load_from_db()
+            if self.covered_until is None or self.covered_until < today:
+                if time.time() - self.last_refresh >= Config.TRADE_CAL['refresh_interval']:
+                    self._refresh()
+            if not self.days:
+                raise RuntimeError(f"交易日历不可用: {self.exchange}")
+
+    def _get_db(self):
+        if self.db is None:
+            self.db = DatabaseManager()
+        return self.db
+
+    def _load_from_db(self):
+        """从数据库加载日历到内存"""
+        calendar = self._get_db().get_trade_calendar(self.exchange) or []
+        if calendar:
+            self.days = [cal_date for cal_date, is_open in calendar if is_open]
+            self.covered_until = calendar[-1][0]
+            logging.info(f"加载交易日历 {self.exchange}: {len(self.days)} 个交易日, 覆盖至 {self.covered_until}")
+
+    def _refresh(self):
+        """从接口增量获取日历（已覆盖日期之后到明年年底）并写入数据库"""
+        self.last_refresh = time.time()
+        if self.covered_until is None:
+            start = pd.Timestamp(Config.TRADE_CAL['start_date']).date()
+        else:
+            start = self.covered_until + timedelta(days=1)
+        end = datetime(datetime.now().year + 1, 12, 31).date()
+
+        try:
+            if self.tushare is None:
+                self.tushare = TushareService()
+            df = self.tushare.query(
+                'trade_cal',
+                exchange=self.exchange,
+                start_date=start.strftime('%Y%m%d'),
+                end_date=end.strftime('%Y%m%d'),
+                fields='exchange,cal_date,is_open,pretrade_date'
+            )
+        except Exception as e:
+            logging.error(f"获取交易日历失败 {self.exchange}: {str(e)}")
+            return
+
+        if df is None or df.empty:
+            return
+        df = df.copy()
+        df['exchange'] = self.exchange
+        self._get_db().save_trade_calendar(df)
+
+        dates = pd.to_datetime(df['cal_date']).dt.date
+        opened = sorted(set(dates[df['is_open'] == 1]))
+        self.days = sorted(set(self.days).union(opened))
+        self.covered_until = max(self.covered_until or dates.max(), dates.max())
+        logging.info(f"刷新交易日历 {self.exchange}: 新增 {len(df)} 天, 覆盖至 {self.covered_until}")
+
+    @staticmethod
+    def _to_date(value):
+        return pd.Timestamp(value).date()
+
+    def is_trading_day(self, day):
+        """是否交易日"""
+        self._ensure_loaded()
+        day = self._to_date(day)
+        index = bisect_left(self.days, day)
+        return index < len(self.days) and self.days[index] == day
+
+    def prev_trading_day(self, day, inclusive=False):
+        """day 之前的最后一个交易日（inclusive 为 True 时 day 本身是交易日则返回 day）"""
+        self._ensure_loaded()
+        day = self._to_date(day)
+        index = bisect_right(self.days, day) if inclusive else bisect_left(self.days, day)
+        return self.days[index - 1] if index > 0 else None
+
+    def next_trading_day(self, day):
+        """day 之后的第一个交易日"""
+        self._ensure_loaded()
+        index = bisect_right(self.days, self._to_date(day))
+        return self.days[index] if index < len(self.days) else None
+
+    def trading_days_between(self, start, end):
+        """[start, end] 区间内的交易日列表"""
+        self._ensure_loaded()
+        start, end = self._to_date(start), self._to_date(end)
+        if start > end:
+            return []
+        return self.days[bisect_left(self.days, start):bisect_right(self.days, end)]
+
+    def last_trade_date(self, now=None):
+        """最后一个已收盘的交易日（收盘前返回上一个交易日）"""
+        now = now or datetime.now()
+        if now.hour >= Config.TRADE_CAL['close_hour']:
+            return self.prev_trading_day(now.date(), inclusive=True)
+        return self.prev_trading_day(now.date())
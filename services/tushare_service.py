@@ -4,7 +4,8 @@ import logging
 from datetime import datetime, timedelta
 import pandas as pd
 import time
-from utils.rate_limiter import RateLimiter
+from utils.quota_manager import QuotaManager
+from .response_cache import ResponseCache
 from utils.decorators import error_handler
 from utils.exceptions import APIError
 
@@ -12,6 +13,33 @@ class TushareService:
     _instance = None
     _initialized = False
     
+    # 期货交易所列表
+    EXCHANGES = ['CFFEX', 'SHFE', 'DCE', 'CZCE', 'INE', 'GFEX']
+    
+    # 日线行情字段
+    DAILY_FIELDS = ('ts_code,trade_date,open,high,low,close,pre_close,'
+                    'pre_settle,settle,vol,amount,oi')
+    DAILY_NUMERIC_COLUMNS = ['open', 'high', 'low', 'close', 'pre_close',
+                             'pre_settle', 'settle', 'vol', 'amount', 'oi']
+    
+    # 交易所代码 -> Tushare合约代码后缀
+    EXCHANGE_SUFFIX = {
+        'CFFEX': 'CFX', 'SHFE': 'SHF', 'DCE': 'DCE',
+        'CZCE': 'ZCE', 'INE': 'INE', 'GFEX': 'GFE'
+    }
+    
+    # 各接口返回数据的统一处理规则: 接口名 -> (日期列, 数值列)
+    ENDPOINT_COLUMNS = {
+        'fut_daily': (['trade_date'], DAILY_NUMERIC_COLUMNS),
+        'fut_mapping': (['trade_date'], None),
+        'fut_holding': (['trade_date'], ['vol', 'vol_chg', 'long_hld', 'long_chg', 'short_hld', 'short_chg']),
+        'trade_cal': (['cal_date', 'pretrade_date'], ['is_open']),
+    }
+    
+    # 持仓排名字段
+    HOLDING_FIELDS = ('trade_date,symbol,broker,vol,vol_chg,long_hld,long_chg,'
+                      'short_hld,short_chg,exchange')
+    
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(TushareService, cls).__new__(cls)
@@ -28,6 +56,12 @@ class TushareService:
                 # 设置token
                 ts.set_token(token)
                 
+                # 进程内共享的接口配额管理器
+                self.quota = QuotaManager.instance()
+                
+                # 接口响应缓存
+                self.cache = ResponseCache()
+                
                 # 初始化API（带重试机制）
                 max_retries = 3
                 retry_delay = 1
@@ -36,6 +70,7 @@ class TushareService:
                     try:
                         self.pro = ts.pro_api()
                         # 使用简单的API调用测试token
+                        self.quota.acquire('trade_cal')
                         self.pro.query('trade_cal', start_date='20240101', end_date='20240101')
                         logging.info("Tushare API 初始化成功")
                         break
@@ -44,9 +79,6 @@ class TushareService:
                             raise ValueError(f"Tushare API 初始化失败: {str(e)}")
                         time.sleep(retry_delay)
                 
-                # 初始化频率限制器
-                self.rate_limiter = RateLimiter(max_calls=180, time_window=60)
-                
                 self._initialized = True
                 
             except Exception as e:
@@ -89,16 +121,38 @@ class TushareService:
         
         return df
     
+    def query(self, endpoint, use_cache=True, **params):
+        """通用接口调用（先查缓存，受接口配额限制），返回按接口规则处理后的DataFrame"""
+        self.ensure_api_ready()
+        
+        if use_cache:
+            df = self.cache.get(endpoint, params)
+            if df is not None:
+                return df
+        
+        self.quota.acquire(endpoint)
+        df = self.pro.query(endpoint, **params)
+        
+        date_columns, numeric_columns = self.ENDPOINT_COLUMNS.get(endpoint, (None, None))
+        df = self._process_dataframe(
+            df,
+            date_columns=date_columns,
+            numeric_columns=numeric_columns
+        )
+        
+        if use_cache:
+            self.cache.put(endpoint, params, df)
+        return df
+    
     @error_handler(logger=logging)
     def get_futures_basic(self):
         """获取期货基础信息"""
         self.ensure_api_ready()
-        exchanges = ['CFFEX', 'SHFE', 'DCE', 'CZCE', 'INE', 'GFEX']
         all_data = []
         
-        for exchange in exchanges:
-            self.rate_limiter.acquire()
-            df = self.pro.fut_basic(
+        for exchange in self.EXCHANGES:
+            df = self.query(
+                'fut_basic',
                 exchange=exchange,
                 fields='ts_code,symbol,exchange,name,fut_code,multiplier,trade_unit,'
                        'per_unit,quote_unit,quote_unit_desc,d_mode_desc,'
@@ -129,8 +183,7 @@ class TushareService:
         
         params = {
             'ts_code': ts_code,
-            'fields': 'ts_code,trade_date,open,high,low,close,pre_close,'
-                     'pre_settle,settle,vol,amount,oi'
+            'fields': self.DAILY_FIELDS
         }
         
         # 处理日期参数
@@ -143,12 +196,50 @@ class TushareService:
         if end_date:
             params['end_date'] = self._format_date(end_date)
         
-        self.rate_limiter.acquire()
-        df = self.pro.fut_daily(**params)
+        return self.query('fut_daily', **params)
+
+    @error_handler(logger=logging)
+    def get_futures_daily_by_date(self, trade_date, exchange=None):
+        """按交易日获取期货日线数据（一次返回整个交易所当日全部合约）"""
+        self.ensure_api_ready()
         
-        return self._process_dataframe(
-            df,
-            date_columns=['trade_date'],
-            numeric_columns=['open', 'high', 'low', 'close', 'pre_close', 
-                           'pre_settle', 'settle', 'vol', 'amount', 'oi']
-        )
\ No newline at end of file
+        params = {
+            'trade_date': self._format_date(trade_date),
+            'fields': self.DAILY_FIELDS
+        }
+        if exchange:
+            params['exchange'] = exchange
+        
+        return self.query('fut_daily', **params)
+
+    @classmethod
+    def parse_main_mapping(cls, df):
+        """
+        把 fut_mapping 结果整理为主力合约映射 (trade_date, exchange, fut_code, ts_code)
+        只保留品种主力连续合约（如 CU.SHF），跳过次主力等其他连续合约
+        """
+        columns = ['trade_date', 'exchange', 'fut_code', 'ts_code']
+        if df is None or df.empty:
+            return pd.DataFrame(columns=columns)
+            
+        suffix_exchange = {suffix: exchange for exchange, suffix in cls.EXCHANGE_SUFFIX.items()}
+        parts = df['ts_code'].astype(str).str.upper().str.split('.', n=1, expand=True)
+        result = pd.DataFrame({
+            'trade_date': df['trade_date'],
+            'exchange': parts[1].map(suffix_exchange),
+            'fut_code': parts[0],
+            'ts_code': df['mapping_ts_code']
+        })
+        result = result.dropna(subset=columns)
+        result = result[
+            result['fut_code'].str.fullmatch(r'[A-Z]+')
+            & result.apply(lambda row: str(row['ts_code']).upper().startswith(row['fut_code']), axis=1)
+        ]
+        return result.drop_duplicates(subset=['trade_date', 'exchange', 'fut_code']).reset_index(drop=True)
+
+    @error_handler(logger=logging)
+    def get_main_contract_mapping(self, trade_date):
+        """获取指定交易日全部品种的主力合约映射（一次调用）"""
+        self.ensure_api_ready()
+        df = self.query('fut_mapping', trade_date=self._format_date(trade_date))
+        return self.parse_main_mapping(df)
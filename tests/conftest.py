@@ -0,0 +1,117 @@
+"""
+测试公用的替身对象：记录语句的游标、内存交易日历、返回预设结果的获取引擎
+在项目根目录执行: python -m pytest -q
+"""
+import contextlib
+import pandas as pd
+import pytest
+from database.db_manager import DatabaseManager
+from services.fetch_engine import FetchResult
+
+class FakeCursor:
+    """记录执行的语句；results 为 {语句片段: 返回行或 callable(params)}，按插入顺序匹配第一个片段"""
+    def __init__(self, results=None, rowcount=None):
+        self.executed = []
+        self.results = results or {}
+        self.rows = []
+        self.rowcount = 0
+        self._rowcount = rowcount
+
+    def execute(self, query, params=None):
+        query = ' '.join(query.split())
+        self.executed.append((query, params))
+        self.rows = []
+        for fragment, rows in self.results.items():
+            if fragment in query:
+                self.rows = rows(params) if callable(rows) else rows
+                break
+        self.rowcount = self._rowcount(query, params) if self._rowcount else len(self.rows)
+
+    def executemany(self, query, seq_params):
+        seq_params = list(seq_params)
+        self.executed.append((' '.join(query.split()), seq_params))
+        self.rowcount = len(seq_params)
+
+    def fetchall(self):
+        return list(self.rows)
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def statements(self, fragment):
+        return [(query, params) for query, params in self.executed if fragment in query]
+
+class StubCalendar:
+    """内存交易日历（days 为升序的交易日）"""
+    def __init__(self, days):
+        self.days = sorted(pd.Timestamp(day).date() for day in days)
+
+    def is_trading_day(self, day):
+        return pd.Timestamp(day).date() in self.days
+
+    def trading_days_between(self, start, end):
+        start, end = pd.Timestamp(start).date(), pd.Timestamp(end).date()
+        return [day for day in self.days if start <= day <= end]
+
+class StubFetchEngine:
+    """按请求返回预设数据：responses(request) 返回 DataFrame，或抛出异常表示获取失败"""
+    def __init__(self, responses):
+        self.responses = responses
+        self.requests = []
+
+    def run(self, requests, cancel_event=None):
+        for request in requests:
+            self.requests.append(request)
+            try:
+                yield FetchResult(request, data=self.responses(request))
+            except Exception as e:
+                yield FetchResult(request, error=e)
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """
+    不连接数据库的 DatabaseManager：transaction() 和 connection.cursor() 都返回同一个 FakeCursor（db.cursor），
+    db.fail_transaction 为 True 时事务抛出 DatabaseError
+    """
+    db = DatabaseManager()
+    db.cursor = FakeCursor()
+    db.fail_transaction = False
+
+    @contextlib.contextmanager
+    def transaction():
+        if db.fail_transaction:
+            from utils.exceptions import DatabaseError
+            raise DatabaseError("事务执行失败: 模拟写入失败")
+        yield db.cursor
+
+    class Connection:
+        in_transaction = False
+
+        def cursor(self, *args, **kwargs):
+            return db.cursor
+
+        def is_connected(self):
+            return True
+
+    monkeypatch.setattr(db, 'ensure_connected', lambda: True)
+    monkeypatch.setattr(db, 'transaction', transaction)
+    monkeypatch.setattr(db, 'release', lambda: None)
+    db._local.connection = Connection()
+    return db
+
+def quote_rows(ts_code, days, close=100.0):
+    """合约在给定交易日的行情 DataFrame（Tushare fut_daily 的字段）"""
+    return pd.DataFrame([{
+        'ts_code': ts_code, 'trade_date': pd.Timestamp(day).strftime('%Y%m%d'),
+        'open': close, 'high': close, 'low': close, 'close': close, 'pre_close': close,
+        'vol': 1.0, 'amount': 1.0, 'oi': 1.0,
+    } for day in days])
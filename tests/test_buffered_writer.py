@@ -0,0 +1,69 @@
+import contextlib
+import threading
+import time
+import pandas as pd
+from database.buffered_writer import BufferedWriter, BufferTarget
+from conftest import FakeCursor
+
+class SlowDB:
+    """事务在 gate 打开前阻塞，模拟写入跟不上获取"""
+    def __init__(self):
+        self.gate = threading.Event()
+        self.cursor = FakeCursor()
+
+    def ensure_connected(self):
+        return True
+
+    def release(self):
+        pass
+
+    @contextlib.contextmanager
+    def transaction(self):
+        self.gate.wait(5)
+        yield self.cursor
+
+TARGET = BufferTarget('t', ['k', 'v'], ['k'])
+
+def rows(start, count=2):
+    return pd.DataFrame({'k': range(start, start + count), 'v': 1.0})
+
+def test_write_blocks_above_high_water_mark():
+    db = SlowDB()
+    writer = BufferedWriter(db, targets=[TARGET], max_rows=2, max_delay=60, max_pending=2)
+    writer.start()
+
+    # 第一组被后台线程取走后阻塞在事务中，之后缓冲到高水位（4 行）
+    writer.write('t', rows(0))
+    while writer.buffered_rows:
+        time.sleep(0.01)
+    for start in (2, 4):
+        writer.write('t', rows(start))
+
+    blocked = threading.Thread(target=writer.write, args=('t', rows(6)))
+    blocked.start()
+    blocked.join(0.3)
+    assert blocked.is_alive()
+    assert writer.buffered_rows == 4
+
+    db.gate.set()
+    blocked.join(5)
+    assert not blocked.is_alive()
+    writer.close()
+
+    written = sorted(key for _, params in db.cursor.executed for key in params[0::2])
+    assert written == list(range(8))
+    assert writer.fetch_stats.get_status()['rows'] == 8
+    assert writer.fetch_stats.get_status()['blocked_time'] > 0
+    assert writer.write_stats.get_status()['rows'] == 8
+
+def test_synchronous_writer_records_stage_stats():
+    db = SlowDB()
+    db.gate.set()
+    writer = BufferedWriter(db, targets=[TARGET], max_rows=2, max_delay=60, threaded=False)
+    writer.start()
+    writer.write('t', rows(0, 3), fetch_elapsed=0.5)
+    writer.close()
+
+    assert writer.fetch_stats.get_status()['busy_time'] == 0.5
+    assert writer.write_stats.get_status()['batches'] == 1
+    assert writer.write_stats.get_status()['rows'] == 3
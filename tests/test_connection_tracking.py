@@ -0,0 +1,68 @@
+import gc
+import threading
+from database import db_manager
+from database.db_manager import DatabaseManager
+
+class FakePool:
+    def __init__(self):
+        self.acquired = []
+        self.released = []
+
+    def acquire(self):
+        connection = object()
+        self.acquired.append(connection)
+        return connection
+
+    def release(self, connection):
+        self.released.append(connection)
+
+def manager(monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(db_manager.ConnectionPool, 'instance', classmethod(lambda cls: pool))
+    return DatabaseManager(), pool
+
+def test_connection_is_released_when_thread_is_collected(monkeypatch):
+    db, pool = manager(monkeypatch)
+    thread = threading.Thread(target=db._checkout)
+    thread.start()
+    thread.join()
+    assert pool.released == []
+
+    del thread
+    gc.collect()
+
+    assert pool.released == pool.acquired
+    assert db._connections == {}
+
+def test_finished_thread_is_released_on_next_checkout(monkeypatch):
+    db, pool = manager(monkeypatch)
+    # 线程对象仍被引用（如线程池、QThread 的包装对象），不会被回收
+    thread = threading.Thread(target=db._checkout)
+    thread.start()
+    thread.join()
+
+    db._checkout()
+
+    assert pool.released == pool.acquired[:1]
+    assert len(db._connections) == 1
+    db.close()
+    assert pool.released == pool.acquired
+
+def test_release_returns_only_the_current_thread_connection(monkeypatch):
+    db, pool = manager(monkeypatch)
+    started, done = threading.Event(), threading.Event()
+
+    def worker():
+        db._checkout()
+        started.set()
+        done.wait()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    started.wait()
+    db._checkout()
+    db.release()
+
+    assert pool.released == [pool.acquired[1]]
+    done.set()
+    thread.join()
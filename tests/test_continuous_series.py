@@ -0,0 +1,109 @@
+from datetime import date
+import logging
+import pandas as pd
+import pytest
+from database import continuous_series
+
+D1, D2, D3, D4, D5 = [date(2024, 1, day) for day in (2, 3, 4, 5, 8)]
+
+ANCHOR_COLUMNS = ['exchange', 'fut_code', 'trade_date', 'ts_code', 'close', 'adj_factor', 'adj_offset']
+
+def main_rows(rows):
+    """(日期, 主力合约, 收盘价, 昨收) -> stitch 的输入行"""
+    return pd.DataFrame([{
+        'exchange': 'SHFE', 'fut_code': 'CU', 'trade_date': day, 'ts_code': ts_code,
+        'open': close, 'high': close, 'low': close, 'close': close, 'pre_close': pre_close,
+        'vol': 1.0, 'amount': 1.0, 'oi': 1.0,
+    } for day, ts_code, close, pre_close in rows])
+
+# A -> B 在 D3 换月，旧合约 A 当天收盘 104；B -> C 在 D5 换月，旧合约 B 当天无行情
+ROWS = main_rows([
+    (D1, 'A', 100.0, 99.0),
+    (D2, 'A', 102.0, 100.0),
+    (D3, 'B', 110.0, 108.0),
+    (D4, 'B', 111.0, 110.0),
+    (D5, 'C', 120.0, 115.0),
+])
+OLD_CLOSES = {('A', pd.Timestamp(D3)): 104.0}
+
+def load_closes(pairs):
+    return {pair: OLD_CLOSES[pair] for pair in pairs if pair in OLD_CLOSES}
+
+def empty_anchors():
+    return pd.DataFrame(columns=ANCHOR_COLUMNS)
+
+# D3: 110 / 104，差值 6；D5: 旧合约无当天收盘，用 C 的昨收 115 对 B 的前一日收盘 111，差值 4
+FACTORS = [1.0, 1.0, 110 / 104, 110 / 104, 110 / 104 * 115 / 111]
+OFFSETS = [0.0, 0.0, 6.0, 6.0, 10.0]
+
+def test_stitch_accumulates_ratio_and_difference_at_rolls():
+    result = continuous_series.stitch(ROWS, empty_anchors(), load_closes)
+
+    assert list(result.columns) == continuous_series.CONTINUOUS_FIELDS
+    assert list(result['trade_date']) == [D1, D2, D3, D4, D5]
+    assert list(result['is_roll']) == [0, 0, 1, 0, 1]
+    assert list(result['adj_factor']) == pytest.approx(FACTORS)
+    assert list(result['adj_offset']) == pytest.approx(OFFSETS)
+
+def test_stitch_continues_from_anchor():
+    first = continuous_series.stitch(ROWS[ROWS['trade_date'] <= D3], empty_anchors(), load_closes)
+    anchor = first.iloc[[-1]][ANCHOR_COLUMNS]
+
+    # 已保存区间内的行被忽略，只拼接锚点之后的交易日
+    rest = continuous_series.stitch(ROWS, anchor, load_closes)
+
+    assert list(rest['trade_date']) == [D4, D5]
+    assert list(rest['is_roll']) == [0, 1]
+    assert list(rest['adj_factor']) == pytest.approx(FACTORS[3:])
+    assert list(rest['adj_offset']) == pytest.approx(OFFSETS[3:])
+
+def test_roll_against_anchor_contract():
+    # 锚点为 A，新的第一行已换成 B：换月价差用锚点合约当天的收盘价
+    anchor = pd.DataFrame([['SHFE', 'CU', D2, 'A', 102.0, 2.0, 5.0]], columns=ANCHOR_COLUMNS)
+    result = continuous_series.stitch(ROWS[ROWS['trade_date'] == D3], anchor, load_closes)
+
+    assert list(result['is_roll']) == [1]
+    assert result['adj_factor'].iloc[0] == pytest.approx(2.0 * 110 / 104)
+    assert result['adj_offset'].iloc[0] == pytest.approx(5.0 + 6.0)
+
+def test_roll_without_prices_is_not_adjusted(caplog):
+    rows = main_rows([(D1, 'A', 100.0, 99.0), (D2, 'B', 110.0, float('nan'))])
+
+    with caplog.at_level(logging.WARNING):
+        result = continuous_series.stitch(rows, empty_anchors(), lambda pairs: {})
+
+    assert list(result['is_roll']) == [0, 1]
+    assert list(result['adj_factor']) == [1.0, 1.0]
+    assert list(result['adj_offset']) == [0.0, 0.0]
+    assert '缺少价格，不调整' in caplog.text
+
+def test_products_are_stitched_independently():
+    # M 的合约没有换月日旧合约收盘价，两次换月都用昨收 / 前一日收盘价: 108 / 102、115 / 111
+    other = ROWS.assign(exchange='DCE', fut_code='M', ts_code='M' + ROWS['ts_code'])
+    result = continuous_series.stitch(pd.concat([ROWS, other]), empty_anchors(), load_closes)
+
+    cu = result[result['fut_code'] == 'CU']
+    m = result[result['fut_code'] == 'M']
+    assert list(cu['adj_factor']) == pytest.approx(FACTORS)
+    assert list(m['adj_factor']) == pytest.approx([1.0, 1.0, 108 / 102, 108 / 102, 108 / 102 * 115 / 111])
+    assert list(m['adj_offset']) == pytest.approx([0.0, 0.0, 6.0, 6.0, 10.0])
+
+def test_adjust_prices_back_adjusts_to_latest_row():
+    stitched = continuous_series.stitch(ROWS, empty_anchors(), load_closes)
+    latest_factor, latest_offset = FACTORS[-1], OFFSETS[-1]
+
+    ratio = continuous_series.adjust_prices(stitched, latest_factor, latest_offset, 'ratio')
+    diff = continuous_series.adjust_prices(stitched, latest_factor, latest_offset, 'diff')
+    raw = continuous_series.adjust_prices(stitched, latest_factor, latest_offset, None)
+
+    assert list(ratio['close']) == pytest.approx([
+        100 * latest_factor, 102 * latest_factor, 110 * 115 / 111, 111 * 115 / 111, 120,
+    ])
+    assert list(diff['close']) == pytest.approx([110, 112, 114, 115, 120])
+    assert list(raw['close']) == [100, 102, 110, 111, 120]
+    # 换算不修改原数据
+    assert list(stitched['close']) == [100, 102, 110, 111, 120]
+
+def test_adjust_prices_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        continuous_series.adjust_prices(pd.DataFrame(), 1.0, 0.0, 'forward')
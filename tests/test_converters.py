@@ -0,0 +1,90 @@
+from datetime import date
+import math
+import numpy as np
+import pandas as pd
+import pytest
+from database import converters
+
+DESCRIBE_ROWS = [
+    ('ts_code', b'varchar(6)', 'NO', 'PRI', None, ''),
+    ('name', 'varchar(4)', 'YES', '', None, ''),
+    ('multiplier', 'decimal(20,4)', 'YES', '', None, ''),
+    ('list_date', 'date', 'YES', '', None, ''),
+    ('delist_date', 'date', 'YES', '', None, ''),
+]
+
+def test_parse_field_types_reads_lengths():
+    field_types = converters.parse_field_types(DESCRIBE_ROWS)
+
+    assert field_types == {
+        'ts_code': ('VARCHAR', 6),
+        'name': ('VARCHAR', 4),
+        'multiplier': ('DECIMAL', 20),
+        'list_date': ('DATE', None),
+        'delist_date': ('DATE', None),
+    }
+
+def test_convert_frame_truncates_to_describe_widths():
+    df = pd.DataFrame({
+        'ts_code': ['CU2401.SHF', 'M2405'],
+        'name': ['沪铜主力合约', None],
+        'multiplier': ['5', 'x'],
+        'list_date': ['20230115', '20240201'],
+        'delist_date': ['20240115', None],
+        'unknown': [1, 2],
+    })
+    frame = converters.convert_frame(df, converters.parse_field_types(DESCRIBE_ROWS))
+
+    # 表中不存在的字段被丢弃
+    assert list(frame.columns) == ['ts_code', 'name', 'multiplier', 'list_date', 'delist_date']
+    assert list(frame['ts_code']) == ['CU2401', 'M2405']
+    # 缺失的字符串填充为 string_fill
+    assert list(frame['name']) == ['沪铜主力', '']
+    assert frame['multiplier'].iloc[0] == 5.0
+    assert math.isnan(frame['multiplier'].iloc[1])
+    assert list(frame['list_date']) == ['20230115', '20240201']
+    assert list(frame['delist_date']) == ['20240115', None]
+
+def test_convert_frame_date_format():
+    field_types = {'list_date': ('DATE', None)}
+    df = pd.DataFrame({'list_date': ['20230115', date(2024, 2, 1), 'not a date']})
+
+    frame = converters.convert_frame(df, field_types, date_format='%Y-%m-%d')
+
+    assert list(frame['list_date']) == ['2023-01-15', '2024-02-01', None]
+
+def test_to_date_string_defaults_to_iso_format():
+    values = pd.Series([pd.Timestamp('2024-01-02'), None])
+
+    assert list(converters.to_date_string(values)) == ['2024-01-02', None]
+
+def test_to_params_replaces_nan_with_none():
+    frame = pd.DataFrame({'ts_code': ['A', None], 'close': [1.5, np.nan], 'vol': [np.nan, 2.0]})
+
+    assert converters.to_params(frame) == [('A', 1.5, None), (None, None, 2.0)]
+
+def test_to_params_orders_and_fills_fields():
+    frame = pd.DataFrame({'close': [1.5], 'ts_code': ['A']})
+
+    assert converters.to_params(frame, ['ts_code', 'close', 'oi']) == [('A', 1.5, None)]
+
+def test_change_rate_with_zero_or_missing_pre_close():
+    close = pd.Series([110.0, 110.0, 110.0, 110.0])
+    pre_close = pd.Series([100.0, 0.0, np.nan, 'bad'])
+
+    rate = converters.change_rate(close, pre_close)
+
+    assert rate.iloc[0] == pytest.approx(10.0)
+    assert rate.iloc[1:].isna().all()
+
+def test_quote_frame_builds_quote_params():
+    df = pd.DataFrame({
+        'ts_code': ['CU2401.SHF' + 'X' * 20], 'trade_date': ['20240102'],
+        'open': ['100'], 'high': [101], 'low': [99], 'close': [102], 'pre_close': [0],
+        'vol': [None], 'amount': [1.0], 'oi': [3.0],
+    })
+
+    params = converters.to_params(converters.quote_frame(df))
+
+    assert params == [(('CU2401.SHF' + 'X' * 20)[:20], '20240102', 100.0, 101.0, 99.0, 102.0, 0.0,
+                       None, None, 1.0, 3.0)]
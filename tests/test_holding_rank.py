@@ -0,0 +1,49 @@
+from datetime import date
+import pandas as pd
+from services import ingest_pipeline
+from services.data_update_service import DataUpdateService
+from services.tushare_service import TushareService
+from conftest import StubCalendar, StubFetchEngine
+
+DAYS = [date(2024, 1, 8), date(2024, 1, 9), date(2024, 1, 10)]
+
+def holding_rows(day):
+    return pd.DataFrame([{
+        'trade_date': day.strftime('%Y%m%d'), 'symbol': 'cu2401', 'broker': '席位',
+        'vol': 1.0, 'vol_chg': 0.0, 'long_hld': 1.0, 'long_chg': 0.0, 'short_hld': 1.0, 'short_chg': 0.0,
+    }])
+
+def run_update(fake_db, monkeypatch, responses):
+    monkeypatch.setattr(fake_db, 'connect', lambda: True)
+    monkeypatch.setattr(ingest_pipeline, 'DatabaseManager', lambda: fake_db)
+    monkeypatch.setattr(fake_db, 'close', lambda: None)
+    watermarks = {exchange: date(2024, 1, 5) for exchange in TushareService.EXCHANGES}
+    fake_db.get_holding_watermarks = lambda: dict(watermarks)
+    fake_db.set_holding_watermark = lambda exchange, day: watermarks.__setitem__(exchange, day)
+
+    service = DataUpdateService.__new__(DataUpdateService)
+    service.db = fake_db
+    service.calendar = StubCalendar(DAYS)
+    service.fetch_engine = StubFetchEngine(responses)
+    counts = service.update_holding_rank(end_date=DAYS[-1])
+    return counts, watermarks
+
+def test_empty_latest_day_does_not_advance_watermark(fake_db, monkeypatch):
+    # 最新交易日的持仓排名尚未发布：水位线停在前一个交易日，下次重新获取
+    def responses(request):
+        day = pd.Timestamp(request.params['trade_date']).date()
+        return pd.DataFrame() if day == DAYS[-1] else holding_rows(day)
+
+    (success, empty, fail), watermarks = run_update(fake_db, monkeypatch, responses)
+
+    assert (success, empty, fail) == (12, 6, 0)
+    assert set(watermarks.values()) == {DAYS[1]}
+
+def test_empty_day_followed_by_data_is_passed(fake_db, monkeypatch):
+    def responses(request):
+        day = pd.Timestamp(request.params['trade_date']).date()
+        return pd.DataFrame() if day == DAYS[0] else holding_rows(day)
+
+    _, watermarks = run_update(fake_db, monkeypatch, responses)
+
+    assert set(watermarks.values()) == {DAYS[-1]}
@@ -0,0 +1,55 @@
+import threading
+import pandas as pd
+from services import ingest_pipeline
+from services.ingest_pipeline import IngestPipeline
+
+class FakeManager:
+    instances = []
+
+    def __init__(self):
+        self.closed = False
+        FakeManager.instances.append(self)
+
+    def connect(self):
+        return True
+
+    def close(self):
+        self.closed = True
+
+def test_close_does_not_block_when_writer_thread_died(monkeypatch):
+    def broken_manager():
+        raise RuntimeError('连接池已关闭')
+    monkeypatch.setattr(ingest_pipeline, 'DatabaseManager', broken_manager)
+    monkeypatch.setattr(threading, 'excepthook', lambda args: None)
+
+    pipeline = IngestPipeline(writer=lambda db, df: True, queue_size=1)
+    pipeline.start()
+    pipeline._thread.join()
+    # 队列已满，旧实现在 close() 中放入结束标记时永久阻塞
+    pipeline.put(pd.DataFrame({'close': [1.0]}), tag='A')
+
+    results = pipeline.close(timeout=5)
+
+    assert [(tag, ok) for tag, ok, _ in results] == [('A', False)]
+
+def test_synchronous_mode_closes_its_own_manager(monkeypatch):
+    FakeManager.instances = []
+    monkeypatch.setattr(ingest_pipeline, 'DatabaseManager', FakeManager)
+
+    pipeline = IngestPipeline(writer=lambda db, df: True, threaded=False)
+    pipeline.start()
+    pipeline.put(pd.DataFrame({'close': [1.0]}), tag='A')
+    results = pipeline.close()
+
+    assert [(tag, ok) for tag, ok, _ in results] == [('A', True)]
+    assert [manager.closed for manager in FakeManager.instances] == [True]
+    assert pipeline.db is None
+
+def test_synchronous_mode_keeps_caller_manager(monkeypatch):
+    db = FakeManager()
+    pipeline = IngestPipeline(writer=lambda db, df: True, threaded=False, db=db)
+    pipeline.start()
+    pipeline.close()
+
+    assert not db.closed
+    assert pipeline.db is db
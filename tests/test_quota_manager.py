@@ -0,0 +1,16 @@
+from utils.quota_manager import QuotaManager
+
+def test_only_calls_that_slept_count_as_waits():
+    quota = QuotaManager({'total': 600, 'burst': 2}, time_window=60)
+
+    # 桶内有 2 个令牌，前两次调用不需要等待
+    assert quota.acquire('fut_daily')
+    assert quota.acquire('fut_daily')
+    stat = quota.get_status()['endpoints']['fut_daily']
+    assert (stat['calls'], stat['waits'], stat['wait_time']) == (2, 0, 0.0)
+
+    # 补充速率 598/60 次/秒，第三次调用需要等待约 0.1 秒
+    assert quota.acquire('fut_daily')
+    stat = quota.get_status()['endpoints']['fut_daily']
+    assert (stat['calls'], stat['waits']) == (3, 1)
+    assert stat['wait_time'] > 0
@@ -0,0 +1,51 @@
+import os
+import threading
+import time
+import pandas as pd
+from services.response_cache import ResponseCache
+
+HISTORY = {'trade_date': '20200102', 'exchange': 'SHFE'}
+
+def cache(tmp_path):
+    return ResponseCache(cache_dir=str(tmp_path), max_bytes=1 << 30, today_ttl=60, endpoint_ttl={}, enabled=True)
+
+def stored_entry(response_cache, params):
+    return pd.read_pickle(response_cache._path(response_cache.make_key('fut_daily', params)), compression='gzip')
+
+def test_history_is_cached_forever(tmp_path):
+    response_cache = cache(tmp_path)
+    response_cache.put('fut_daily', HISTORY, pd.DataFrame({'close': [1.0]}))
+
+    assert stored_entry(response_cache, HISTORY)['expires_at'] is None
+
+def test_empty_result_expires_after_today_ttl(tmp_path):
+    response_cache = cache(tmp_path)
+    response_cache.put('fut_daily', HISTORY, pd.DataFrame())
+
+    expires_at = stored_entry(response_cache, HISTORY)['expires_at']
+    assert expires_at is not None
+    assert expires_at <= time.time() + 60
+
+def test_concurrent_puts_do_not_share_temp_files(tmp_path):
+    response_cache = cache(tmp_path)
+    frame = pd.DataFrame({'close': range(1000)})
+    errors = []
+
+    def put():
+        try:
+            for _ in range(20):
+                response_cache.put('fut_daily', HISTORY, frame)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=put) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert response_cache.stats['writes'] == 80
+    assert response_cache.get('fut_daily', HISTORY).equals(frame)
+    leftovers = [name for _, _, files in os.walk(tmp_path) for name in files if name.endswith('.tmp')]
+    assert leftovers == []
@@ -0,0 +1,39 @@
+from datetime import date
+import pandas as pd
+from conftest import FakeCursor, quote_rows
+
+DAYS = [date(2024, 1, 2), date(2024, 1, 3)]
+
+def upsert_rowcount(existing):
+    """模拟 INSERT ... ON DUPLICATE KEY UPDATE 的影响行数：新增计 1，已存在的行更新计 2"""
+    def rowcount(query, params):
+        keys = list(zip(params[0::11], params[1::11]))
+        return sum(2 if key in existing else 1 for key in keys)
+    return rowcount
+
+def test_counts_come_from_upsert_rowcount(fake_db):
+    fake_db.cursor = FakeCursor(rowcount=upsert_rowcount({('A', '20240102')}))
+    df = pd.concat([quote_rows('A', DAYS), quote_rows('B', DAYS)])
+
+    result = fake_db.save_quotes(df, batch_size=3)
+
+    assert result == {'rows': 4, 'inserted': 3, 'updated': 1}
+    upserts = fake_db.cursor.statements('INSERT INTO futures_daily_quotes')
+    assert [len(params) // 11 for _, params in upserts] == [3, 1]
+    # 只执行写入，不再逐批查询已存在的行数
+    assert fake_db.cursor.statements('COUNT(*)') == []
+
+def test_duplicate_rows_keep_the_last(fake_db):
+    fake_db.cursor = FakeCursor(rowcount=upsert_rowcount(set()))
+    df = pd.concat([quote_rows('A', DAYS[:1], close=100.0), quote_rows('A', DAYS[:1], close=101.0)])
+
+    result = fake_db.save_quotes(df)
+
+    assert result == {'rows': 1, 'inserted': 1, 'updated': 0}
+    _, params = fake_db.cursor.statements('INSERT INTO futures_daily_quotes')[0]
+    assert params[:2] == ['A', '20240102']
+    assert params[5] == 101.0
+
+def test_empty_frame_is_not_saved(fake_db):
+    assert fake_db.save_quotes(pd.DataFrame()) is False
+    assert fake_db.cursor.executed == []
@@ -0,0 +1,169 @@
+from datetime import date
+import pandas as pd
+from database.db_manager import DatabaseManager
+from services.data_update_service import DataUpdateService
+from services.sync_planner import SyncPlanner
+from conftest import FakeCursor, StubCalendar, StubFetchEngine, quote_rows
+
+DAYS = [date(2024, 1, day) for day in (2, 3, 4, 5, 8, 9, 10, 11, 12)]
+TARGET = date(2024, 1, 12)
+
+class WatermarkDB:
+    def __init__(self, watermarks):
+        self.watermarks = watermarks
+
+    def get_watermarks(self, ts_codes=None):
+        return dict(self.watermarks)
+
+def contracts(*codes, exchange='SHFE'):
+    return pd.DataFrame({'ts_code': list(codes), 'exchange': exchange})
+
+def planner(watermarks, lookback_days=30):
+    return SyncPlanner(WatermarkDB(watermarks), lookback_days=lookback_days, calendar=StubCalendar(DAYS))
+
+def test_shared_short_gap_fetches_by_date():
+    # 3 个合约都缺最后 2 个交易日：按交易日整所获取只需 2 次调用
+    watermark = date(2024, 1, 10)
+    plan = planner({'A': watermark, 'B': watermark, 'C': watermark}).plan(contracts('A', 'B', 'C'), TARGET)
+
+    assert [request.params['trade_date'] for request in plan.requests] == ['20240111', '20240112']
+    assert all(request.params['exchange'] == 'SHFE' for request in plan.requests)
+    assert all(request.tag == {'A', 'B', 'C'} for request in plan.requests)
+    assert plan.gaps == {code: (date(2024, 1, 11), TARGET) for code in 'ABC'}
+
+def test_single_long_gap_fetches_by_contract():
+    # 1 个合约缺 6 个交易日：按合约区间获取只需 1 次调用
+    plan = planner({'A': date(2024, 1, 4)}).plan(contracts('A'), TARGET)
+
+    assert len(plan.requests) == 1
+    params = plan.requests[0].params
+    assert (params['ts_code'], params['start_date'], params['end_date']) == ('A', '20240105', '20240112')
+    assert plan.requests[0].tag == {'A'}
+
+def test_forced_strategy_overrides_auto():
+    watermarks = {'A': date(2024, 1, 4)}
+    by_date = planner(watermarks).plan(contracts('A'), TARGET, strategy='date')
+    assert len(by_date.requests) == 6
+    assert all('trade_date' in request.params for request in by_date.requests)
+
+    watermarks = {code: date(2024, 1, 10) for code in 'ABC'}
+    by_contract = planner(watermarks).plan(contracts('A', 'B', 'C'), TARGET, strategy='contract')
+    assert sorted(request.params['ts_code'] for request in by_contract.requests) == ['A', 'B', 'C']
+
+def test_up_to_date_and_new_contracts():
+    # A 已是最新；B 没有水位线，从 lookback_days 之前开始补齐
+    plan = planner({'A': TARGET}, lookback_days=3).plan(contracts('A', 'B'), TARGET)
+
+    assert plan.up_to_date == {'A'}
+    assert plan.gaps == {'B': (date(2024, 1, 9), TARGET)}
+    assert plan.watermarks == {'B': None}
+
+def test_exchanges_are_planned_separately():
+    watermark = date(2024, 1, 11)
+    df = pd.concat([contracts('A', 'B'), contracts('C', exchange='DCE')])
+    plan = planner({'A': watermark, 'B': watermark, 'C': watermark}).plan(df, TARGET)
+
+    exchanges = sorted(request.params['exchange'] for request in plan.requests)
+    assert exchanges == ['DCE', 'SHFE']
+
+def test_holes_below_watermark_are_not_replanned():
+    # 规划只看水位线：水位线之前区间内的缺失日期不会被重新发现，
+    # 失败时必须回退水位线（见 _run_sync_plan），否则缺口永久存在
+    plan = planner({'A': TARGET}).plan(contracts('A'), TARGET)
+
+    assert plan.requests == []
+    assert plan.up_to_date == {'A'}
+
+def test_update_watermarks_advances_to_latest_date_per_contract():
+    cursor = FakeCursor()
+    df = pd.DataFrame({
+        'ts_code': ['A', 'A', 'B'],
+        'trade_date': [date(2024, 1, 10), date(2024, 1, 12), date(2024, 1, 11)],
+    })
+    DatabaseManager()._update_watermarks(cursor, df)
+
+    query, rows = cursor.executed[0]
+    assert 'GREATEST(last_trade_date, VALUES(last_trade_date))' in query
+    assert sorted(rows) == [('A', date(2024, 1, 12)), ('B', date(2024, 1, 11))]
+
+def run_plan(fake_db, plan, responses):
+    service = DataUpdateService.__new__(DataUpdateService)
+    service.db = fake_db
+    service.fetch_engine = StubFetchEngine(responses)
+    resets = []
+    fake_db.reset_watermarks = lambda watermarks: resets.append(watermarks) or True
+    return service._run_sync_plan(plan, '测试', pipelined=False), resets
+
+def test_failed_fetch_rolls_back_watermarks(fake_db):
+    plan = planner({'A': date(2024, 1, 4), 'B': date(2024, 1, 10), 'C': date(2024, 1, 10)}).plan(
+        contracts('A', 'B', 'C'), TARGET, strategy='contract'
+    )
+
+    def responses(request):
+        if request.params['ts_code'] == 'B':
+            raise RuntimeError('接口超时')
+        return quote_rows(request.params['ts_code'], [TARGET])
+
+    (success, failed), resets = run_plan(fake_db, plan, responses)
+
+    assert (success, failed) == (2, 1)
+    assert resets == [{'B': date(2024, 1, 10)}]
+    # 成功的合约在写入行情的同一事务中推进水位线
+    _, rows = fake_db.cursor.statements('futures_sync_watermark')[0]
+    assert sorted(code for code, _ in rows) == ['A', 'C']
+
+def test_failed_write_rolls_back_every_contract_in_the_group(fake_db):
+    plan = planner({'A': date(2024, 1, 10), 'B': None}).plan(contracts('A', 'B'), TARGET, strategy='contract')
+    fake_db.fail_transaction = True
+
+    (success, failed), resets = run_plan(fake_db, plan, lambda request: quote_rows(request.params['ts_code'], [TARGET]))
+
+    assert (success, failed) == (0, 2)
+    assert resets == [{'A': date(2024, 1, 10), 'B': None}]
+
+class BrokenCalendar:
+    def __init__(self):
+        self.calls = 0
+
+    def trading_days_between(self, start, end):
+        self.calls += 1
+        raise RuntimeError('交易日历不可用: SHFE')
+
+def test_unavailable_calendar_falls_back_to_weekdays():
+    calendar = BrokenCalendar()
+    watermarks = {code: date(2024, 1, 10) for code in 'ABC'}
+    plan = SyncPlanner(WatermarkDB(watermarks), calendar=calendar).plan(contracts('A', 'B', 'C'), date(2024, 1, 15))
+
+    # 1月13、14日是周末
+    assert plan.gaps == {code: (date(2024, 1, 11), date(2024, 1, 15)) for code in 'ABC'}
+    assert [request.params['trade_date'] for request in plan.requests] == ['20240111', '20240112', '20240115']
+    assert calendar.calls == 1
+
+def test_single_contract_update_fetches_from_watermark(fake_db, monkeypatch):
+    # 水位线落后多个交易日：请求覆盖水位线次日到最新交易日的整个区间，而不只是最新交易日
+    monkeypatch.setattr(fake_db, 'connect', lambda: True)
+    service = DataUpdateService.__new__(DataUpdateService)
+    service.db = fake_db
+    service.sync_planner = SyncPlanner(
+        WatermarkDB({'CU2401.SHF': date(2024, 1, 4)}), calendar=StubCalendar(DAYS)
+    )
+    service.fetch_engine = StubFetchEngine(
+        lambda request: quote_rows(request.params['ts_code'], DAYS[3:])
+    )
+
+    assert service.update_contract_quotes('CU2401.SHF', TARGET) is True
+
+    [request] = service.fetch_engine.requests
+    assert (request.params['start_date'], request.params['end_date']) == ('20240105', '20240112')
+    _, rows = fake_db.cursor.statements('futures_sync_watermark')[0]
+    assert rows == [('CU2401.SHF', '20240112')]
+
+def test_single_contract_update_skips_when_up_to_date(fake_db, monkeypatch):
+    monkeypatch.setattr(fake_db, 'connect', lambda: True)
+    service = DataUpdateService.__new__(DataUpdateService)
+    service.db = fake_db
+    service.sync_planner = SyncPlanner(WatermarkDB({'CU2401.SHF': TARGET}), calendar=StubCalendar(DAYS))
+    service.fetch_engine = StubFetchEngine(lambda request: None)
+
+    assert service.update_contract_quotes('CU2401.SHF', TARGET) is True
+    assert service.fetch_engine.requests == []
@@ -0,0 +1,111 @@
+"""
+连接器模式性能对比：纯Python连接器 vs C扩展 + 预处理语句
+在独立的测试库中写入合成行情（合约代码以 BENCH 开头），分别计时 save_quotes 和 get_contract_quotes，
+结束后删除测试数据。测试库不能与配置的业务库相同，不存在时自动创建。用法（在项目根目录执行）:
+    python -m tools.bench_connector --database futures_bench --contracts 50 --days 200 --repeat 3
+"""
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from config.config import Config
+from database.connection_pool import ConnectionPool
+from database.db_manager import DatabaseManager, QueryBuilder
+from tools.explain_check import prepare_database
+
+MODES = [
+    ('纯Python', {'DB_USE_PURE': True, 'DB_PREPARED': False}),
+    ('C扩展+预处理', {'DB_USE_PURE': False, 'DB_PREPARED': True}),
+]
+
+def make_quotes(contracts, days):
+    """生成合成行情数据（最近 days 个自然日，每个合约每天一条）"""
+    end = datetime.now().date()
+    dates = [(end - timedelta(days=offset)).strftime('%Y%m%d') for offset in range(days)]
+    codes = [f"BENCH{index:04d}.SHF" for index in range(contracts)]
+    index = pd.MultiIndex.from_product([codes, dates], names=['ts_code', 'trade_date'])
+    df = index.to_frame(index=False)
+
+    rng = np.random.default_rng(0)
+    close = rng.uniform(1000, 80000, len(df)).round(2)
+    df['pre_close'] = (close * rng.uniform(0.97, 1.03, len(df))).round(2)
+    df['open'] = (close * rng.uniform(0.98, 1.02, len(df))).round(2)
+    df['high'] = np.maximum(df['open'], close) * 1.01
+    df['low'] = np.minimum(df['open'], close) * 0.99
+    df['close'] = close
+    df['vol'] = rng.integers(100, 500000, len(df)).astype(float)
+    df['amount'] = (df['vol'] * close / 10000).round(4)
+    df['oi'] = rng.integers(100, 300000, len(df)).astype(float)
+    return df
+
+def cleanup(db):
+    """删除测试数据及其水位线"""
+    with db.transaction() as cursor:
+        cursor.execute("DELETE FROM futures_daily_quotes WHERE ts_code LIKE 'BENCH%'")
+        cursor.execute("DELETE FROM futures_sync_watermark WHERE ts_code LIKE 'BENCH%'")
+
+def run_mode(settings, df, days, repeat):
+    """按指定连接器模式执行一轮测试，返回各项耗时（秒，取多次中的最小值）"""
+    for key, value in settings.items():
+        setattr(Config, key, value)
+    # 连接器模式变化时连接池重建
+    ConnectionPool.instance()
+
+    db = DatabaseManager()
+    if not db.connect():
+        raise RuntimeError("数据库连接失败")
+    codes = df['ts_code'].unique()
+    timings = {'save_quotes': [], 'get_contract_quotes': []}
+    try:
+        for _ in range(repeat):
+            cleanup(db)
+            start = time.perf_counter()
+            db.save_quotes(df)
+            timings['save_quotes'].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for ts_code in codes:
+                db.get_contract_quotes(ts_code, days)
+            timings['get_contract_quotes'].append(time.perf_counter() - start)
+    finally:
+        cleanup(db)
+        db.close()
+    return {name: min(values) for name, values in timings.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description='对比纯Python连接器与C扩展+预处理语句的读写耗时')
+    parser.add_argument('--database', required=True, help='测试库名（不能与配置的业务库相同）')
+    parser.add_argument('--contracts', type=int, default=50, help='合成合约数量')
+    parser.add_argument('--days', type=int, default=200, help='每个合约的行情天数')
+    parser.add_argument('--repeat', type=int, default=3, help='每种模式重复次数（取最小耗时）')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    # 切换到测试库并建表，之后各模式的连接池都连接测试库
+    prepare_database(args.database, reseed=False).close()
+
+    df = make_quotes(args.contracts, args.days)
+    original = {key: getattr(Config, key) for key in ('DB_USE_PURE', 'DB_PREPARED')}
+    results = {}
+    try:
+        for name, settings in MODES:
+            print(f"测试 {name} ...")
+            results[name] = run_mode(settings, df, args.days, args.repeat)
+    finally:
+        for key, value in original.items():
+            setattr(Config, key, value)
+
+    rows = len(df)
+    print(f"\n数据量: {args.contracts} 个合约 × {args.days} 天 = {rows} 行, 重复 {args.repeat} 次取最小值")
+    print(f"{'模式':<14}{'save_quotes':>16}{'行/秒':>12}{'get_contract_quotes':>22}{'次/秒':>10}")
+    for name, timing in results.items():
+        print(
+            f"{name:<14}{timing['save_quotes']:>15.3f}s{rows / timing['save_quotes']:>12.0f}"
+            f"{timing['get_contract_quotes']:>21.3f}s{args.contracts / timing['get_contract_quotes']:>10.1f}"
+        )
+    print(f"\n语句缓存: {QueryBuilder.build_upsert.cache_info()}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,438 @@
+"""
+执行计划回归检查
+在独立的测试库中按生产规模生成合成数据（合约、行情、主力合约、主力连续行情、持仓排名、交易日历），
+然后依次调用 DatabaseManager 的读写方法。每条语句执行前在同一连接上先做 EXPLAIN FORMAT=JSON，
+出现预估行数超过阈值的全表扫描（access_type = ALL）或文件排序（filesort）时记为问题，
+有问题时以非零状态退出，用于在部署前发现索引失效。用法（在项目根目录执行）:
+    python -m tools.explain_check --database futures_explain --products 60 --years 3 --max-rows 10000
+测试库不存在时自动创建；库中已有数据时跳过生成（--reseed 强制重新生成）。
+"""
+import argparse
+import json
+import logging
+import re
+import sys
+import traceback
+from datetime import datetime, timedelta
+import mysql.connector
+import numpy as np
+import pandas as pd
+from config.config import Config
+from database.connection_pool import ConnectionPool
+from database.db_manager import DatabaseManager
+
+# 需要检查执行计划的语句（纯 INSERT ... VALUES 不读取表，不检查）
+EXPLAINABLE = re.compile(r'^\s*(SELECT|UPDATE|DELETE|INSERT|REPLACE)\b', re.IGNORECASE)
+SKIPPED = re.compile(r'information_schema|GET_LOCK|RELEASE_LOCK', re.IGNORECASE)
+
+# 生成的合成数据涉及的表（--reseed 时清空）
+SEEDED_TABLES = [
+    'futures_basic', 'futures_daily_quotes', 'futures_sync_watermark', 'futures_main_contract',
+    'futures_holding_rank', 'futures_holding_watermark', 'futures_trade_cal', 'futures_backfill_checkpoint',
+    'futures_continuous_quotes',
+]
+
+def normalize(query):
+    return ' '.join(query.split())
+
+class PlanChecker:
+    """对语句做 EXPLAIN FORMAT=JSON 并记录超过阈值的全表扫描和文件排序"""
+    def __init__(self, max_rows):
+        self.max_rows = max_rows
+        self.enabled = False
+        self.statements = {}  # 规范化语句 -> {'callers', 'issues', 'error'}
+
+    def check(self, connection, query, params):
+        if not self.enabled or not EXPLAINABLE.match(query) or SKIPPED.search(query):
+            return
+        if re.match(r'^\s*(INSERT|REPLACE)\b', query, re.IGNORECASE) and not re.search(r'\bSELECT\b', query, re.IGNORECASE):
+            return
+
+        key = normalize(query)
+        entry = self.statements.get(key)
+        if entry is None:
+            entry = self.statements[key] = {'callers': set(), 'issues': [], 'error': None}
+            try:
+                cursor = connection.cursor()
+                try:
+                    cursor.execute(f"EXPLAIN FORMAT=JSON {query}", params)
+                    plan = json.loads(cursor.fetchall()[0][0])
+                finally:
+                    cursor.close()
+                entry['issues'] = self.find_issues(plan)
+            except Exception as e:
+                entry['error'] = str(e)
+        entry['callers'].add(self.caller())
+
+    @staticmethod
+    def caller():
+        """发出语句的 database 包中最内层的函数"""
+        for frame in reversed(traceback.extract_stack()):
+            path = frame.filename.replace('\\', '/')
+            if '/database/' in path:
+                return f"{path.rsplit('/', 1)[-1]}:{frame.name}"
+        return '?'
+
+    @staticmethod
+    def table_rows(node):
+        """表节点的预估行数（MySQL 为 rows_examined_per_scan，MariaDB 为 rows）"""
+        for field in ('rows_examined_per_scan', 'rows'):
+            if field in node:
+                try:
+                    return int(float(node[field]))
+                except (TypeError, ValueError):
+                    return 0
+        return 0
+
+    def subtree_rows(self, node):
+        """子树中各表预估行数的最大值（作为文件排序的输入行数）"""
+        if isinstance(node, list):
+            return max([self.subtree_rows(item) for item in node] or [0])
+        if not isinstance(node, dict):
+            return 0
+        rows = self.table_rows(node) if 'table_name' in node else 0
+        return max([rows] + [self.subtree_rows(value) for value in node.values()])
+
+    def find_issues(self, plan):
+        """遍历执行计划（兼容 MySQL 与 MariaDB 的 JSON 格式），返回 [(类型, 表名, 预估行数)]"""
+        issues = []
+
+        def walk(node, scope_rows):
+            if isinstance(node, list):
+                for item in node:
+                    walk(item, scope_rows)
+                return
+            if not isinstance(node, dict):
+                return
+            rows = self.subtree_rows(node) or scope_rows
+            if 'table_name' in node and node.get('access_type') == 'ALL':
+                table_rows = self.table_rows(node)
+                if table_rows > self.max_rows:
+                    issues.append(('全表扫描', node['table_name'], table_rows))
+            # MySQL: "using_filesort": true；MariaDB: "filesort": {...}
+            if node.get('using_filesort') is True or isinstance(node.get('filesort'), dict):
+                if rows > self.max_rows:
+                    issues.append(('文件排序', node.get('table_name', '-'), rows))
+            for value in node.values():
+                walk(value, rows)
+
+        walk(plan, 0)
+        return sorted(set(issues))
+
+class ExplainingCursor:
+    """执行语句前先检查执行计划的游标代理"""
+    def __init__(self, checker, connection, cursor):
+        self._checker = checker
+        self._connection = connection
+        self._cursor = cursor
+
+    def execute(self, query, params=None, *args, **kwargs):
+        self._checker.check(self._connection, query, params)
+        return self._cursor.execute(query, params, *args, **kwargs)
+
+    def executemany(self, query, seq_params, *args, **kwargs):
+        seq_params = list(seq_params)
+        if seq_params:
+            self._checker.check(self._connection, query, seq_params[0])
+        return self._cursor.executemany(query, seq_params, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._cursor.close()
+
+class ExplainingConnection:
+    """连接代理：cursor() 返回 ExplainingCursor，其余属性（含 _statement_cache）读写原连接"""
+    def __init__(self, checker, connection):
+        object.__setattr__(self, '_checker', checker)
+        object.__setattr__(self, '_connection', connection)
+
+    def cursor(self, *args, **kwargs):
+        return ExplainingCursor(self._checker, self._connection, self._connection.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._connection, name, value)
+
+# ---------------------------------------------------------------- 合成数据
+
+def product_codes(count):
+    """合成品种代码 ZAA, ZAB, ...（不与真实品种重名）"""
+    return [f"Z{chr(65 + index // 26 % 26)}{chr(65 + index % 26)}" for index in range(count)]
+
+def make_contracts(products, years, today):
+    """每个品种每月一个合约，上市 12 个月后到期；覆盖过去 years 年并延伸到 12 个月之后"""
+    suffixes = list(DatabaseManager.SUFFIX_EXCHANGE.items())
+    first = today.replace(day=1) - pd.DateOffset(years=years)
+    months = pd.date_range(first, periods=years * 12 + 13, freq='MS')
+    rows = []
+    for index, fut_code in enumerate(product_codes(products)):
+        suffix, exchange = suffixes[index % len(suffixes)]
+        for month in months:
+            symbol = f"{fut_code}{month:%y%m}"
+            delist = month + pd.Timedelta(days=14)
+            rows.append({
+                'ts_code': f"{symbol}.{suffix}",
+                'symbol': symbol,
+                'exchange': exchange,
+                'name': f"合成{fut_code}{month:%y%m}",
+                'fut_code': fut_code,
+                'multiplier': 10.0,
+                'list_date': (delist - pd.DateOffset(months=12)).strftime('%Y%m%d'),
+                'delist_date': delist.strftime('%Y%m%d'),
+                'd_month': f"{month:%Y%m}",
+                'last_ddate': delist.strftime('%Y%m%d'),
+            })
+    return pd.DataFrame(rows)
+
+def make_quotes(contracts, days):
+    """交易日 × 存续合约的合成行情；临近交割前 2~4 个月的合约成交量和持仓量最大，主力合约按月换月"""
+    dates = pd.DatetimeIndex(days)
+    listed = pd.to_datetime(contracts['list_date'], format='%Y%m%d').to_numpy()
+    delisted = pd.to_datetime(contracts['delist_date'], format='%Y%m%d').to_numpy()
+    rng = np.random.default_rng(0)
+    base_price = rng.uniform(1000, 80000, len(contracts))
+
+    frames = []
+    for start in range(0, len(dates), 20):
+        chunk = dates[start:start + 20].to_numpy()
+        alive = (listed[:, None] <= chunk[None, :]) & (chunk[None, :] <= delisted[:, None])
+        contract_index, date_index = np.nonzero(alive)
+        trade_dates = chunk[date_index]
+        months_left = (delisted[contract_index] - trade_dates) / np.timedelta64(30, 'D')
+        weight = np.exp(-np.abs(months_left - 3.0))
+        close = base_price[contract_index] * (1 + 0.1 * np.sin(date_index / 15.0 + contract_index)) \
+            * rng.uniform(0.99, 1.01, len(contract_index))
+        vol = (weight * rng.uniform(5e4, 2e5, len(contract_index))).round()
+        frames.append(pd.DataFrame({
+            'ts_code': contracts['ts_code'].to_numpy()[contract_index],
+            'trade_date': pd.DatetimeIndex(trade_dates).strftime('%Y%m%d'),
+            'pre_close': (close * 0.995).round(2),
+            'open': (close * 0.998).round(2),
+            'high': (close * 1.01).round(2),
+            'low': (close * 0.99).round(2),
+            'close': close.round(2),
+            'vol': vol,
+            'amount': (vol * close / 1e4).round(4),
+            'oi': (weight * rng.uniform(1e5, 4e5, len(contract_index))).round(),
+        }))
+    return frames
+
+def make_holding_rank(quotes, brokers=20):
+    """给定日期行情中每个合约 brokers 家期货公司的持仓排名"""
+    codes = quotes[['ts_code', 'trade_date']].drop_duplicates()
+    frame = codes.loc[codes.index.repeat(brokers)].reset_index(drop=True)
+    frame['broker'] = [f"合成期货{index % brokers:02d}" for index in range(len(frame))]
+    frame['exchange'] = frame['ts_code'].str.split('.').str[-1].map(DatabaseManager.SUFFIX_EXCHANGE)
+    rng = np.random.default_rng(1)
+    for field in ['vol', 'vol_chg', 'long_hld', 'long_chg', 'short_hld', 'short_chg']:
+        frame[field] = rng.integers(0, 10000, len(frame)).astype(float)
+    return frame
+
+def make_calendar(exchanges, start, end):
+    days = pd.date_range(start, end, freq='D')
+    frames = []
+    for exchange in exchanges:
+        frames.append(pd.DataFrame({
+            'exchange': exchange,
+            'cal_date': days.strftime('%Y%m%d'),
+            'is_open': (days.weekday < 5).astype(int),
+            'pretrade_date': None,
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+def seed(db, products, years, holding_days):
+    """生成并写入合成数据（写入阶段不检查执行计划）"""
+    today = datetime.now().date()
+    contracts = make_contracts(products, years, pd.Timestamp(today))
+    db.sync_contracts(contracts)
+    print(f"合约: {len(contracts)} 个")
+
+    start = today - timedelta(days=365 * years)
+    days = pd.bdate_range(start, today)
+    db.save_trade_calendar(make_calendar(sorted(set(DatabaseManager.SUFFIX_EXCHANGE.values())), start, today))
+
+    total = 0
+    last_frame = None
+    for frame in make_quotes(contracts, days):
+        db.bulk_load_quotes(frame)
+        total += len(frame)
+        last_frame = frame
+        print(f"\r行情: {total} 行", end='', flush=True)
+    print()
+
+    latest_days = sorted(last_frame['trade_date'].unique())[-holding_days:]
+    holding = make_holding_rank(last_frame[last_frame['trade_date'].isin(latest_days)])
+    db.bulk_load_holding_rank(holding)
+    print(f"持仓排名: {len(holding)} 行")
+
+    result = db.compute_main_contracts(start.strftime('%Y-%m-%d'), today.strftime('%Y-%m-%d'))
+    print(f"主力合约: {result['days']} 天, {result['rows']} 行")
+
+# ---------------------------------------------------------------- 检查
+
+def workload(db):
+    """依次调用 DatabaseManager 的读写方法（覆盖其发出的全部语句），返回 [(名称, 调用)]"""
+    with db.connection.cursor() as cursor:
+        cursor.execute("SELECT MAX(trade_date) FROM futures_daily_quotes")
+        latest = cursor.fetchone()[0]
+        cursor.execute(
+            "SELECT m.exchange, m.fut_code, m.ts_code FROM futures_main_contract m "
+            "WHERE m.trade_date = %s ORDER BY m.exchange, m.fut_code LIMIT 1",
+            (latest,)
+        )
+        exchange, fut_code, ts_code = cursor.fetchone()
+        cursor.execute(
+            f"SELECT {', '.join(DatabaseManager.CONTRACT_FIELDS)} FROM futures_basic WHERE fut_code = %s",
+            (fut_code,)
+        )
+        contracts = pd.DataFrame(cursor.fetchall(), columns=DatabaseManager.CONTRACT_FIELDS)
+    month_ago = latest - timedelta(days=30)
+    day_quotes = pd.DataFrame([{
+        'ts_code': ts_code, 'trade_date': latest.strftime('%Y%m%d'), 'pre_close': 100.0, 'open': 100.0,
+        'high': 101.0, 'low': 99.0, 'close': 100.0, 'vol': 1000.0, 'amount': 10.0, 'oi': 1000.0,
+    }])
+    holding = make_holding_rank(day_quotes, brokers=3)
+    main = db.get_main_contracts_for_date(latest, compute=False)
+    job_id = 'explain_check'
+
+    return [
+        ('get_contracts', lambda: db.get_contracts()),
+        ('get_contracts(exchange)', lambda: db.get_contracts(exchange)),
+        ('get_exchanges', lambda: db.get_exchanges()),
+        ('get_future_codes', lambda: db.get_future_codes(exchange)),
+        ('get_contracts_by_future_code', lambda: db.get_contracts_by_future_code(exchange, fut_code)),
+        ('get_valid_contracts', lambda: db.get_valid_contracts()),
+        ('get_last_trade_date', lambda: db.get_last_trade_date()),
+        ('check_quote_exists', lambda: db.check_quote_exists(ts_code, latest)),
+        ('get_watermarks', lambda: db.get_watermarks()),
+        ('get_watermarks(ts_codes)', lambda: db.get_watermarks(contracts['ts_code'].tolist())),
+        ('get_contract_quotes', lambda: db.get_contract_quotes(ts_code, 365)),
+        ('get_main_contract', lambda: db.get_main_contract(exchange, fut_code, latest)),
+        ('get_main_contracts_for_date', lambda: db.get_main_contracts_for_date(latest)),
+        ('get_main_contracts_for_date(None)', lambda: db.get_main_contracts_for_date()),
+        ('compute_main_contracts', lambda: db.compute_main_contracts(month_ago, latest)),
+        ('fill_main_contract_stats', lambda: db.fill_main_contract_stats(month_ago, latest)),
+        ('save_main_contracts', lambda: db.save_main_contracts(main)),
+        ('update_main_contracts', lambda: db.update_main_contracts()),
+        ('update_main_contracts(set_based=False)', lambda: db.update_main_contracts(set_based=False)),
+        ('update_continuous_quotes', lambda: db.update_continuous_quotes()),
+        ('update_continuous_quotes(start_date)', lambda: db.update_continuous_quotes(month_ago)),
+        ('get_continuous_series', lambda: db.get_continuous_series(exchange, fut_code, month_ago, latest, 'ratio')),
+        ('save_quotes', lambda: db.save_quotes(day_quotes)),
+        ('bulk_load_quotes', lambda: db.bulk_load_quotes(day_quotes)),
+        ('reset_watermarks', lambda: db.reset_watermarks({ts_code: latest})),
+        ('sync_contracts', lambda: db.sync_contracts(contracts)),
+        ('get_holding_watermarks', lambda: db.get_holding_watermarks()),
+        ('set_holding_watermark', lambda: db.set_holding_watermark(exchange, latest)),
+        ('save_holding_rank', lambda: db.save_holding_rank(holding)),
+        ('bulk_load_holding_rank', lambda: db.bulk_load_holding_rank(holding)),
+        ('save_backfill_checkpoint', lambda: db.save_backfill_checkpoint(job_id, 'chunk', 1)),
+        ('get_backfill_checkpoints', lambda: db.get_backfill_checkpoints(job_id)),
+        ('clear_backfill_checkpoints', lambda: db.clear_backfill_checkpoints(job_id)),
+        ('get_trade_calendar', lambda: db.get_trade_calendar(exchange)),
+        ('save_trade_calendar', lambda: db.save_trade_calendar(
+            make_calendar([exchange], latest, latest + timedelta(days=7)))),
+    ]
+
+def prepare_database(database, reseed):
+    """切换到测试库（不存在时创建），--reseed 时清空合成数据涉及的表"""
+    original = Config.DB_CONFIG.get('database')
+    if database == original:
+        raise SystemExit(f"测试库 {database} 与配置的业务库相同，请指定独立的测试库")
+    server_config = {key: value for key, value in Config.DB_CONFIG.items() if key != 'database'}
+    connection = mysql.connector.connect(**server_config)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{database}` DEFAULT CHARACTER SET utf8mb4")
+    finally:
+        connection.close()
+
+    Config.DB_CONFIG = dict(Config.DB_CONFIG, database=database)
+    ConnectionPool.instance()
+    db = DatabaseManager()
+    if not db.connect():
+        raise SystemExit(f"连接测试库 {database} 失败")
+    if reseed:
+        with db.connection.cursor() as cursor:
+            for table in SEEDED_TABLES:
+                cursor.execute(f"TRUNCATE TABLE {table}")
+    return db
+
+def report(checker, failures):
+    problems = 0
+    for query, entry in sorted(checker.statements.items(), key=lambda item: (not item[1]['issues'], item[0])):
+        if not entry['issues'] and not entry['error']:
+            continue
+        print(f"\n[{', '.join(sorted(entry['callers']))}]")
+        print(f"  {query[:300]}")
+        for kind, table, rows in entry['issues']:
+            problems += 1
+            print(f"  ✗ {kind}: {table} 约 {rows} 行")
+        if entry['error']:
+            print(f"  ! EXPLAIN 失败: {entry['error']}")
+    for name, error in failures:
+        print(f"\n✗ 调用 {name} 失败: {error}")
+
+    print(
+        f"\n共检查 {len(checker.statements)} 条语句, 问题 {problems} 个, "
+        f"EXPLAIN 失败 {sum(1 for entry in checker.statements.values() if entry['error'])} 条, "
+        f"调用失败 {len(failures)} 个 (阈值 {checker.max_rows} 行)"
+    )
+    return problems + len(failures)
+
+def main():
+    parser = argparse.ArgumentParser(description='检查 DatabaseManager 全部语句的执行计划（全表扫描、文件排序）')
+    parser.add_argument('--database', required=True, help='测试库名（不能与配置的业务库相同）')
+    parser.add_argument('--products', type=int, default=60, help='合成品种数量')
+    parser.add_argument('--years', type=int, default=3, help='合成行情的年数')
+    parser.add_argument('--holding-days', type=int, default=20, help='合成持仓排名的交易日数')
+    parser.add_argument('--max-rows', type=int, default=10000, help='全表扫描、文件排序的预估行数阈值')
+    parser.add_argument('--reseed', action='store_true', help='清空测试库并重新生成合成数据')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    db = prepare_database(args.database, args.reseed)
+    with db.connection.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM futures_main_contract")
+        seeded = cursor.fetchone()[0] > 0
+        cursor.execute("SELECT COUNT(*) FROM futures_continuous_quotes")
+        continuous = cursor.fetchone()[0] > 0
+    if not seeded:
+        seed(db, args.products, args.years, args.holding_days)
+    if not continuous:
+        # 首次全量生成主力连续行情（检查的是每日的增量更新）
+        print(f"主力连续行情: {db.update_continuous_quotes()} 行")
+
+    checker = PlanChecker(args.max_rows)
+    db.connection = ExplainingConnection(checker, db.connection)
+    calls = workload(db)
+    # 元数据缓存命中时不发出语句
+    DatabaseManager.metadata_cache.invalidate()
+    failures = []
+    checker.enabled = True
+    for name, call in calls:
+        try:
+            # 多数方法出错时记录日志并返回 None/False
+            result = call()
+            if result is None or result is False:
+                failures.append((name, '返回 None/False，详见日志'))
+        except Exception as e:
+            failures.append((name, str(e)))
+    checker.enabled = False
+
+    problems = report(checker, failures)
+    db.close()
+    sys.exit(1 if problems else 0)
+
+if __name__ == '__main__':
+    main()
@@ -19,6 +19,7 @@ from utils.scheduler import setup_scheduler
 class DataFetchThread(QThread):
     progress_updated = pyqtSignal(int, str)
     data_ready = pyqtSignal(object)
+    error_occurred = pyqtSignal(str)
     
     def __init__(self, exchange=None, fut_code=None):
         super().__init__()
@@ -28,20 +29,27 @@ class DataFetchThread(QThread):
         self.db = DatabaseManager()
         
     def run(self):
-        self.progress_updated.emit(10, "连接数据库...")
-        if not self.db.connect():
-            return
-            
-        self.progress_updated.emit(30, "获取合约数据...")
-        df = self.tushare.get_future_contracts(self.exchange, self.fut_code)
-        
-        if df is not None:
-            self.progress_updated.emit(60, "保存数据到数据库...")
-            self.db.update_contracts(df)
+        try:
+            self.progress_updated.emit(10, "连接数据库...")
+            if not self.db.connect():
+                error_msg = "数据库连接失败，无法获取合约数据"
+                logging.error(error_msg)
+                self.error_occurred.emit(error_msg)
+                return
+                
+            self.progress_updated.emit(30, "获取合约数据...")
+            df = self.tushare.get_future_contracts(self.exchange, self.fut_code)
             
-        self.progress_updated.emit(90, "读取最新数据...")
-        result_df = self.db.get_contracts_by_future_code(self.exchange, self.fut_code)
-        self.data_ready.emit(result_df)
+            if df is not None:
+                self.progress_updated.emit(60, "保存数据到数据库...")
+                self.db.update_contracts(df)
+                
+            self.progress_updated.emit(90, "读取最新数据...")
+            result_df = self.db.get_contracts_by_future_code(self.exchange, self.fut_code)
+            self.data_ready.emit(result_df)
+        finally:
+            # QThread 结束后线程对象不会被回收，必须显式归还本线程从连接池取出的连接
+            self.db.release()
 
 class ContractView(QWidget):
     def __init__(self):
@@ -296,9 +304,9 @@ class ContractView(QWidget):
             # 禁用断开连接按钮
             self.disconnect_btn.setEnabled(False)
             
-            if self.db and self.db.connection:
+            if self.db:
                 try:
-                    self.db.connection.close()
+                    self.db.close()
                 except Exception as e:
                     logging.error(f"关闭数据库连接失败: {str(e)}")
                 finally:
@@ -446,6 +454,7 @@ class ContractView(QWidget):
         self.fetch_thread = DataFetchThread(self.current_exchange, self.current_fut_code)
         self.fetch_thread.progress_updated.connect(self.progress_dialog.update_progress)
         self.fetch_thread.data_ready.connect(self.update_table)
+        self.fetch_thread.error_occurred.connect(lambda message: QMessageBox.warning(self, "警告", message))
         self.fetch_thread.finished.connect(self.progress_dialog.accept)
         self.fetch_thread.start()
         
@@ -495,23 +504,12 @@ class ContractView(QWidget):
             logging.error(f"更新表格失败: {str(e)}\n{traceback.format_exc()}")
     
     def _get_current_main_contracts(self):
-        """获取当前所有主力合约"""
+        """获取当前所有主力合约 {(exchange, fut_code): ts_code}"""
         try:
-            query = """
-            SELECT exchange, fut_code, ts_code
-            FROM futures_main_contract
-            WHERE trade_date = (
-                SELECT MAX(trade_date)
-                FROM futures_main_contract
-            )
-            """
-            
-            with self.db.connection.cursor() as cursor:
-                cursor.execute(query)
-                results = cursor.fetchall()
-                
-                # 创建映射字典 {(exchange, fut_code): ts_code}
-                return {(row[0], row[1]): row[2] for row in results}
+            df = self.db.get_main_contracts_for_date(compute=False)
+            if df is None:
+                return {}
+            return {(row.exchange, row.fut_code): row.ts_code for row in df.itertuples(index=False)}
                 
         except Exception as e:
             logging.error(f"获取主力合约失败: {str(e)}")
@@ -532,6 +530,8 @@ class ContractView(QWidget):
         try:
             # 更新配置
             Config.DB_CONFIG.update(new_config)
+            # 连接到其他数据库后缓存的元数据不再有效
+            DatabaseManager.metadata_cache.invalidate()
             
             # 如果当前已连接，则断开连接
             if self.db and self.db.connection:
@@ -687,7 +687,7 @@ class ContractView(QWidget):
                                         skip += 1
                                         
                                 except Exception as e:
-                                    fail_count += 1
+                                    fail += 1
                                     error_msg = f"更新合约{ts_code}失败: {str(e)}"
                                     print(f"错误: {error_msg}")  # 添加控制台输出
                                     logging.error(error_msg)
@@ -700,6 +700,9 @@ class ContractView(QWidget):
                             error_msg = str(e)
                             print(f"错误: {error_msg}")  # 添加控制台输出
                             self.finished.emit(False, error_msg)
+                        finally:
+                            # 归还本线程从连接池取出的连接
+                            self.service.db.release()
                             
                     def cancel(self):
                         self.is_cancelled = True
@@ -773,45 +776,20 @@ class ContractView(QWidget):
                         
                     def run(self):
                         try:
-                            # 获取所有交易所
-                            self.progress_updated.emit(0, "获取交易所列表...")
-                            exchanges = self.service.db.get_exchanges()
-                            if not exchanges:
-                                self.finished.emit(False, "无可用交易所")
-                                return
-                                
-                            total_steps = 0
-                            current_step = 0
-                            
-                            # 计总步骤数
-                            for exchange in exchanges:
-                                fut_codes = self.service.db.get_future_codes(exchange)
-                                total_steps += len(fut_codes)
-                            
-                            # 更新每个品种的主力合约历史行情
-                            for exchange in exchanges:
-                                fut_codes = self.service.db.get_future_codes(exchange)
-                                for fut_code in fut_codes:
-                                    try:
-                                        current_step += 1
-                                        self.progress_updated.emit(
-                                            int(current_step * 100 / total_steps),
-                                            f"更新 {exchange} {fut_code} ({current_step}/{total_steps})"
-                                        )
-                                        
-                                        # 获取主力合约
-                                        main_contract = self.service.db.get_main_contract(exchange, fut_code)
-                                        if main_contract:
-                                            # 获取最近30个交易日的行情
-                                            self.service.update_contract_quotes(main_contract, days=30)
-                                            
-                                    except Exception as e:
-                                        logging.error(f"更新{exchange} {fut_code}主力合约历史失败: {str(e)}")
-                                        
-                            self.finished.emit(True, f"更新完成，共处理{current_step}个品种")
+                            # 获取最新主力合约映射，并按合约区间并发获取各主力合约的历史行情
+                            self.progress_updated.emit(0, "获取主力合约并更新历史行情...")
+                            success, skip, fail = self.service.update_main_contract_history()
+                            self.progress_updated.emit(100, f"成功{success}, 跳过{skip}, 失败{fail}")
+                            self.finished.emit(
+                                fail == 0,
+                                f"更新完成: 成功{success}个, 无数据{skip}个, 失败{fail}个主力合约"
+                            )
                             
                         except Exception as e:
-                            self.finished.emit(False, f"更新败: {str(e)}")
+                            self.finished.emit(False, f"更新失败: {str(e)}")
+                        finally:
+                            # 归还本线程从连接池取出的连接
+                            self.service.db.release()
                 
                 # 创建并启动线程
                 self.update_main_history_thread = UpdateMainHistoryThread(service)
@@ -883,6 +861,9 @@ class ContractView(QWidget):
                             
                     except Exception as e:
                         self.finished.emit(False, str(e))
+                    finally:
+                        # 归还本线程从连接池取出的连接
+                        self.service.db.release()
                         
                 def cancel(self):
                     self.is_cancelled = True
@@ -971,6 +952,9 @@ class ContractView(QWidget):
                         error_msg = f"更新失败: {str(e)}"
                         logging.error(f"{error_msg}\n{traceback.format_exc()}")
                         self.finished.emit(False, error_msg)
+                    finally:
+                        # 归还本线程从连接池取出的连接
+                        self.db.release()
 
             try:
                 # 创建并启动线程
@@ -0,0 +1,183 @@
+import asyncio
+import time
+import logging
+from threading import Lock
+from config.config import Config
+
+class TokenBucket:
+    """
+    令牌桶
+    limit: 时间窗口内允许的最大调用次数
+    time_window: 时间窗口大小（秒）
+    burst: 桶容量（允许的突发调用次数）
+
+    补充速率取 (limit - burst) / time_window，保证任意一个时间窗口内的调用次数
+    不超过 limit（突发 burst 次 + 窗口内补充的令牌）
+    """
+    def __init__(self, limit, time_window, burst=None):
+        self.limit = limit
+        self.time_window = time_window
+        if burst is None:
+            burst = max(1, limit // 10)
+        self.burst = max(1, min(burst, limit - 1))
+        self.rate = max(limit - self.burst, 1) / time_window
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        """按经过的时间补充令牌"""
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def wait_time(self):
+        """距离下一个可用令牌的等待时间（秒）"""
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+class QuotaManager:
+    """
+    进程内唯一的Tushare接口配额管理器
+    所有接口共享一个总令牌桶，另外每个接口可以有自己的预算令牌桶，
+    一次调用需要同时从总桶和接口桶各取一个令牌。
+    等待时不持有锁，其他线程可以同时检查或获取配额。
+    """
+    _instance = None
+    _instance_lock = Lock()
+
+    @classmethod
+    def instance(cls):
+        """获取进程内唯一实例"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def __init__(self, quota=None, time_window=60):
+        quota = dict(quota or Config.TUSHARE_QUOTA)
+        total = quota.pop('total')
+        burst = quota.pop('burst', None)
+
+        self.time_window = time_window
+        self.total_bucket = TokenBucket(total, time_window, burst)
+        self.buckets = {
+            endpoint: TokenBucket(limit, time_window, burst)
+            for endpoint, limit in quota.items()
+        }
+        self.stats = {}
+        self.lock = Lock()
+        logging.info(
+            f"初始化接口配额管理器: 总计{total}次/{time_window}秒, "
+            f"接口预算: {', '.join(f'{k}={v}' for k, v in quota.items())}"
+        )
+
+    def _reserve(self, endpoint):
+        """尝试取令牌，成功返回0，否则返回需要等待的秒数"""
+        with self.lock:
+            now = time.monotonic()
+            buckets = [self.total_bucket]
+            if endpoint in self.buckets:
+                buckets.append(self.buckets[endpoint])
+
+            for bucket in buckets:
+                bucket.refill(now)
+
+            wait = max(bucket.wait_time() for bucket in buckets)
+            if wait <= 0:
+                for bucket in buckets:
+                    bucket.tokens -= 1
+            return wait
+
+    def _record(self, endpoint, waited, acquired=True, slept=False):
+        """记录调用次数和等待时间（只有确实等待过配额的调用才计入等待）"""
+        with self.lock:
+            stat = self.stats.setdefault(
+                endpoint or 'default',
+                {'calls': 0, 'waits': 0, 'wait_time': 0.0, 'rejected': 0}
+            )
+            if acquired:
+                stat['calls'] += 1
+            else:
+                stat['rejected'] += 1
+            if slept:
+                stat['waits'] += 1
+                stat['wait_time'] += waited
+
+    def try_acquire(self, endpoint=None):
+        """非阻塞获取调用许可，返回是否获取成功"""
+        acquired = self._reserve(endpoint) <= 0
+        self._record(endpoint, 0.0, acquired)
+        return acquired
+
+    def acquire(self, endpoint=None, timeout=None):
+        """
+        阻塞获取调用许可
+        timeout: 最长等待时间（秒），None 表示一直等待
+        返回: 是否获取到许可
+        """
+        start = time.monotonic()
+        slept = False
+        while True:
+            wait = self._reserve(endpoint)
+            waited = time.monotonic() - start
+            if wait <= 0:
+                self._record(endpoint, waited, slept=slept)
+                return True
+            if timeout is not None and waited + wait > timeout:
+                self._record(endpoint, waited, acquired=False, slept=slept)
+                return False
+            if wait > 1:
+                logging.info(f"达到接口配额限制({endpoint or 'default'})，等待 {wait:.2f} 秒")
+            time.sleep(wait)
+            slept = True
+
+    async def acquire_async(self, endpoint=None, timeout=None):
+        """异步获取调用许可，等待期间不阻塞事件循环"""
+        start = time.monotonic()
+        slept = False
+        while True:
+            wait = self._reserve(endpoint)
+            waited = time.monotonic() - start
+            if wait <= 0:
+                self._record(endpoint, waited, slept=slept)
+                return True
+            if timeout is not None and waited + wait > timeout:
+                self._record(endpoint, waited, acquired=False, slept=slept)
+                return False
+            await asyncio.sleep(wait)
+            slept = True
+
+    def get_status(self):
+        """获取当前配额和等待统计"""
+        with self.lock:
+            now = time.monotonic()
+            self.total_bucket.refill(now)
+            status = {
+                'total': {
+                    'limit': self.total_bucket.limit,
+                    'available': int(self.total_bucket.tokens),
+                    'time_window': self.time_window
+                },
+                'endpoints': {}
+            }
+            for endpoint in set(self.buckets) | set(self.stats):
+                stat = dict(self.stats.get(endpoint, {'calls': 0, 'waits': 0, 'wait_time': 0.0, 'rejected': 0}))
+                bucket = self.buckets.get(endpoint)
+                if bucket:
+                    bucket.refill(now)
+                    stat['limit'] = bucket.limit
+                    stat['available'] = int(bucket.tokens)
+                status['endpoints'][endpoint] = stat
+            return status
+
+    def __str__(self):
+        status = self.get_status()
+        parts = [
+            f"{endpoint}: 调用{stat['calls']}次, 等待{stat['waits']}次/{stat['wait_time']:.2f}秒"
+            for endpoint, stat in sorted(status['endpoints'].items())
+            if stat['calls'] or stat['rejected']
+        ]
+        return f"QuotaManager(总配额: {status['total']['limit']}次/{self.time_window}秒; {'; '.join(parts)})"
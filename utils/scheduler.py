@@ -4,6 +4,7 @@ import os
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from services.data_update_service import DataUpdateService
+from database.partition_maintenance import PartitionMaintainer
 import logging
 from datetime import datetime
 
@@ -35,6 +36,17 @@ def daily_update():
         logging.info("\n开始执行每日定时更新任务")
         service = DataUpdateService()
         
+        # 非交易日没有新数据，跳过（日历不可用时按工作日判断）
+        today = datetime.now().date()
+        try:
+            is_trading_day = service.calendar.is_trading_day(today)
+        except Exception as e:
+            logging.warning(f"交易日历不可用，按工作日判断是否为交易日: {str(e)}")
+            is_trading_day = today.weekday() < 5
+        if not is_trading_day:
+            logging.info("今天不是交易日，跳过每日定时更新任务")
+            return
+        
         # 1. 更新合约信息
         logging.info("1. 更新合约信息")
         if service.update_basic_info():
@@ -57,6 +69,16 @@ def daily_update():
         success, skip, fail = service.update_main_contract_history()
         logging.info(f"主力合约历史更新完成: 成功{success}, 跳过{skip}, 失败{fail}")
         
+        # 5. 增量更新主力连续行情（主力合约和行情都已入库）
+        logging.info("5. 更新主力连续行情")
+        rows = service.db.update_continuous_quotes()
+        logging.info(f"主力连续行情更新完成: {rows} 行")
+        
+        # 6. 更新持仓排名
+        logging.info("6. 更新持仓排名")
+        success, empty, fail = service.update_holding_rank()
+        logging.info(f"持仓排名更新完成: 成功{success}, 无数据{empty}, 失败{fail}")
+        
         logging.info("每日定时更新任务完成")
         
     except Exception as e:
@@ -64,12 +86,23 @@ def daily_update():
         # TODO: 添加邮件通知逻辑
         raise
 
+def partition_maintenance():
+    """分区维护任务：预建未来月份的分区，清理过期分区"""
+    try:
+        logging.info("开始执行分区维护任务")
+        PartitionMaintainer().run()
+    except Exception as e:
+        _log_error(e, "分区维护任务")
+        raise
+
 def setup_scheduler():
     """设置定时任务"""
     try:
         scheduler = BackgroundScheduler()
         # 每天17:00执行数据同步
         scheduler.add_job(daily_update, 'cron', hour=17)
+        # 每天16:30维护分区（在数据同步前确保当月及之后的分区已存在）
+        scheduler.add_job(partition_maintenance, 'cron', hour=16, minute=30)
         scheduler.start()
         logging.info("定时任务调度器启动成功")
         return scheduler
@@ -0,0 +1,56 @@
+import threading
+import time
+
+class StageStats:
+    """流水线单个阶段的吞吐统计"""
+    def __init__(self, name):
+        self.name = name
+        self.batches = 0
+        self.rows = 0
+        self.errors = 0
+        self.busy_time = 0.0     # 实际工作耗时（秒）
+        self.blocked_time = 0.0  # 因背压等待的耗时（秒）
+        self.start_time = None
+        self.end_time = None
+        self.lock = threading.Lock()
+
+    def record(self, rows, elapsed, error=False):
+        """记录一批数据的处理结果"""
+        with self.lock:
+            now = time.time()
+            if self.start_time is None:
+                self.start_time = now - elapsed
+            self.end_time = now
+            self.batches += 1
+            self.rows += rows
+            self.busy_time += elapsed
+            if error:
+                self.errors += 1
+
+    def record_blocked(self, elapsed):
+        """记录背压等待时间"""
+        with self.lock:
+            self.blocked_time += elapsed
+
+    def get_status(self):
+        """获取当前统计"""
+        with self.lock:
+            wall_time = (self.end_time - self.start_time) if self.start_time else 0.0
+            return {
+                'stage': self.name,
+                'batches': self.batches,
+                'rows': self.rows,
+                'errors': self.errors,
+                'busy_time': self.busy_time,
+                'blocked_time': self.blocked_time,
+                'rows_per_second': self.rows / wall_time if wall_time > 0 else 0.0
+            }
+
+    def __str__(self):
+        status = self.get_status()
+        return (
+            f"{status['stage']}: {status['batches']} 批 / {status['rows']} 行, "
+            f"失败 {status['errors']} 批, 工作 {status['busy_time']:.2f} 秒, "
+            f"背压等待 {status['blocked_time']:.2f} 秒, "
+            f"吞吐 {status['rows_per_second']:.1f} 行/秒"
+        )